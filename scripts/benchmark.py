@@ -5,14 +5,18 @@ Usage:
     python scripts/benchmark.py                    # 10k orders, localhost
     python scripts/benchmark.py --url https://...  # run against production
     python scripts/benchmark.py --orders 1000      # smaller run
+    python scripts/benchmark.py --engine           # in-process OrderBook only
 
-Requires server running with a valid DB connection.
+Requires server running with a valid DB connection (except --engine).
 """
 
 import argparse
 import asyncio
+import logging
 import statistics
+import sys
 import time
+from pathlib import Path
 
 import httpx
 
@@ -85,14 +89,66 @@ async def run(base_url: str, num_orders: int, concurrency: int):
     print()
 
 
+def run_engine(num_orders: int, rounds: int = 5):
+    """
+    Match the same order stream directly against an OrderBook, with
+    self-trade prevention off and on. Every order has a distinct user, so
+    the STP check runs on each resting entry but never fires — the
+    difference is the pure cost of the check in the matching loop.
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from src.models.order import Order, OrderType, SelfTradePrevention, Side
+    from src.services.order_book import OrderBook
+    from src.utils.logger import logger
+
+    logger.setLevel(logging.WARNING)
+
+    def orders():
+        return [
+            Order(
+                symbol="BTCUSDT",
+                side=Side.BUY if i % 2 == 0 else Side.SELL,
+                type=OrderType.LIMIT,
+                price=50000.0 + (i % 10) - 5,
+                quantity=0.01 * (1 + i % 3),
+                user_id=f"user-{i}",
+            )
+            for i in range(num_orders)
+        ]
+
+    def best_of(mode: SelfTradePrevention) -> float:
+        best = float("inf")
+        for _ in range(rounds):
+            book = OrderBook("BTCUSDT", stp_mode=mode)
+            batch = orders()
+            start = time.perf_counter()
+            for order in batch:
+                book.match(order)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    print(f"\nEngine benchmark: {num_orders} orders | best of {rounds}")
+    print("-" * 60)
+    off = best_of(SelfTradePrevention.NONE)
+    on = best_of(SelfTradePrevention.CANCEL_NEWEST)
+    print(f"  STP off:        {num_orders / off:.0f} orders/sec")
+    print(f"  STP on:         {num_orders / on:.0f} orders/sec")
+    print(f"  STP overhead:   {(on - off) / off * 100:+.1f}%")
+    print()
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--url", default="http://localhost:8000")
     parser.add_argument("--orders", type=int, default=10_000)
     parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--engine", action="store_true", help="benchmark OrderBook.match in-process")
     args = parser.parse_args()
 
-    asyncio.run(run(args.url, args.orders, args.concurrency))
+    if args.engine:
+        run_engine(args.orders)
+    else:
+        asyncio.run(run(args.url, args.orders, args.concurrency))
 
 
 if __name__ == "__main__":
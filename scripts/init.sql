@@ -13,12 +13,53 @@ CREATE TABLE IF NOT EXISTS orders (
     user_id UUID REFERENCES users(id),
     symbol TEXT NOT NULL,
     side TEXT CHECK (side IN ('buy', 'sell')),
-    type TEXT CHECK (type IN ('market', 'limit', 'ioc', 'fok')),
+    type TEXT CHECK (type IN ('market', 'limit', 'ioc', 'fok', 'stop', 'stop_limit')),
     price NUMERIC,
+    stop_price NUMERIC,
+    triggered_at TIMESTAMP,
+    display_qty NUMERIC,
+    time_in_force TEXT DEFAULT 'gtc' CHECK (time_in_force IN ('gtc', 'gtt', 'day')),
+    expire_at TIMESTAMP,
     quantity NUMERIC NOT NULL,
     remaining_qty NUMERIC NOT NULL,
     status TEXT DEFAULT 'open',
-    created_at TIMESTAMP DEFAULT NOW()
+    client_order_id TEXT,
+    created_at TIMESTAMP DEFAULT NOW(),
+    -- Idempotent submission; NULLs (no id, anonymous orders) never collide
+    CONSTRAINT orders_user_client_order_id_key UNIQUE (user_id, client_order_id)
+);
+
+-- Bring tables created by earlier versions of this file up to date
+-- (CREATE TABLE IF NOT EXISTS leaves existing tables untouched)
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS stop_price NUMERIC;
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS triggered_at TIMESTAMP;
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS display_qty NUMERIC;
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS time_in_force TEXT DEFAULT 'gtc';
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS expire_at TIMESTAMP;
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS client_order_id TEXT;
+
+ALTER TABLE orders DROP CONSTRAINT IF EXISTS orders_type_check;
+ALTER TABLE orders ADD CONSTRAINT orders_type_check
+    CHECK (type IN ('market', 'limit', 'ioc', 'fok', 'stop', 'stop_limit'));
+ALTER TABLE orders DROP CONSTRAINT IF EXISTS orders_time_in_force_check;
+ALTER TABLE orders ADD CONSTRAINT orders_time_in_force_check
+    CHECK (time_in_force IN ('gtc', 'gtt', 'day'));
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'orders_user_client_order_id_key') THEN
+        ALTER TABLE orders ADD CONSTRAINT orders_user_client_order_id_key UNIQUE (user_id, client_order_id);
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS balances (
+    user_id UUID REFERENCES users(id),
+    asset TEXT NOT NULL,
+    available NUMERIC NOT NULL DEFAULT 0,
+    held NUMERIC NOT NULL DEFAULT 0,
+    -- Ledger write sequence; older snapshots never overwrite newer ones
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, asset)
 );
 
 CREATE TABLE IF NOT EXISTS trades (
@@ -30,3 +71,6 @@ CREATE TABLE IF NOT EXISTS trades (
     seller_id UUID,
     timestamp TIMESTAMP DEFAULT NOW()
 );
+
+-- Keyset pagination / streaming export on (symbol, timestamp, id)
+CREATE INDEX IF NOT EXISTS idx_trades_symbol_ts ON trades (symbol, timestamp, id);
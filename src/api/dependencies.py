@@ -1,7 +1,7 @@
-from fastapi import Depends, HTTPException
+from fastapi import Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from src.services import auth_service, db
+from src.services import auth_service
 
 security = HTTPBearer()
 
@@ -9,8 +9,4 @@ security = HTTPBearer()
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> dict:
-    user_id = auth_service.decode_token(credentials.credentials)
-    user = await db.get_user_by_id(user_id)
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
+    return await auth_service.authenticate(credentials.credentials)
@@ -0,0 +1,71 @@
+"""
+Wire encodings for market-data WebSockets.
+
+Clients pick an encoding with `?encoding=json|msgpack` when connecting.
+Each broadcast is wrapped in a Frame that encodes lazily and at most once
+per format, however many clients receive it. MessagePack frames carry
+numeric prices and epoch-millisecond timestamps instead of strings.
+
+Compression is negotiated separately by the server: uvicorn's websockets
+implementation accepts permessage-deflate by default
+(--ws-per-message-deflate).
+"""
+
+import json
+from typing import Callable
+
+import msgpack
+from fastapi import WebSocket
+
+FORMATS = ("json", "msgpack")
+
+# WebSocket → negotiated format (absent means json)
+_formats: dict[WebSocket, str] = {}
+
+
+def set_format(ws: WebSocket, fmt: str):
+    if fmt != "json":
+        _formats[ws] = fmt
+
+
+def forget(ws: WebSocket):
+    _formats.pop(ws, None)
+
+
+class Frame:
+    """One outbound message, encoded on demand per format and memoized."""
+
+    __slots__ = ("_text", "_compact", "_payload", "_binary")
+
+    def __init__(self, text: str, compact: Callable[[], dict]):
+        self._text = text
+        self._compact = compact
+        self._payload: dict | None = None
+        self._binary: bytes | None = None
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def payload(self) -> dict:
+        if self._payload is None:
+            self._payload = self._compact()
+        return self._payload
+
+    @property
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = msgpack.packb(self.payload(), use_bin_type=True)
+        return self._binary
+
+    def tagged(self, channel: str, symbol: str) -> "Frame":
+        """Same message with /ws routing fields; JSON is spliced, not re-serialized."""
+        text = f'{{"channel": {json.dumps(channel)}, "symbol": {json.dumps(symbol)}, ' + self._text[1:]
+        return Frame(text, lambda: {"channel": channel, "symbol": symbol, **self.payload()})
+
+
+async def send(ws: WebSocket, frame: Frame):
+    if _formats.get(ws) == "msgpack":
+        await ws.send_bytes(frame.binary)
+    else:
+        await ws.send_text(frame.text)
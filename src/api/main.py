@@ -1,62 +1,132 @@
+import asyncio
 import json
 import socket
 from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
-from src.services import db, matching_engine
+from src.services import db, matching_engine, trade_archive
+from src.services.ledger import ledger
 from src.models.trade import Trade
 from src.services.order_book import OrderBook
+from src.services.candles import INTERVALS
 from src.utils.logger import logger
-from src.api.routes import orders, orderbook, trades, auth
+from src.api.routes import (
+    orders, orderbook, trades, auth, candles, ticker, order_entry, accounts, positions, user_stream,
+)
+from src.api.encoding import FORMATS, Frame, forget, send, set_format
+from src.api.ws_hub import CHANNELS, hub
 
 
 # ---------------------------------------------------------------------------
 # Broadcast callbacks (injected into matching_engine)
 # ---------------------------------------------------------------------------
 
+async def _send_all(clients: list, frame: Frame):
+    dead = []
+    for ws in clients:
+        try:
+            await send(ws, frame)
+        except Exception:
+            dead.append(ws)
+    for ws in dead:
+        clients.remove(ws)
+
+
+def _epoch_ms(ts) -> int:
+    return int(ts.timestamp() * 1000)
+
+
+def _depth_frame(book: OrderBook, depth: int = 10) -> Frame:
+    def compact():
+        snapshot = book.get_depth_arrays(depth)
+        return {
+            "type": "market_depth",
+            "data": {
+                "symbol": book.symbol,
+                "version": book.version,
+                "timestamp": _epoch_ms(datetime.now(timezone.utc)),
+                "bids": [list(level) for level in zip(*(a.tolist() for a in snapshot["bids"]))],
+                "asks": [list(level) for level in zip(*(a.tolist() for a in snapshot["asks"]))],
+            },
+        }
+
+    return Frame('{"type": "market_depth", "data": ' + book.get_depth_json(depth) + "}", compact)
+
+
 async def _broadcast_trade(trade: Trade):
     symbol = trade.symbol
     book = matching_engine.get_book(symbol)
     if not book:
         return
-    message = json.dumps({
-        "type": "trade",
+    data = {
+        "id": trade.id,
+        "price": trade.price,
+        "quantity": trade.quantity,
+        "symbol": trade.symbol,
+        "timestamp": trade.timestamp.isoformat() + "Z",
+        "aggressor_side": trade.aggressor_side,
+        "maker_order_id": trade.maker_order_id,
+        "taker_order_id": trade.taker_order_id,
+    }
+    frame = Frame(
+        json.dumps({"type": "trade", "data": data}, default=str),
+        lambda: {"type": "trade", "data": {**data, "timestamp": _epoch_ms(trade.timestamp)}},
+    )
+    await _send_all(book.trade_clients, frame)
+    await hub.publish("trades", symbol, frame)
+
+
+async def _broadcast_depth(book: OrderBook):
+    frame = _depth_frame(book)
+    await _send_all(book.market_clients, frame)
+    await hub.publish("depth", book.symbol, frame)
+
+
+async def _broadcast_depth_delta(book: OrderBook, delta: dict):
+    """
+    Changed levels only, each [price, new visible quantity]; 0 removes the
+    level. Levels are encoded like market_depth snapshots: strings in JSON,
+    numbers in MessagePack.
+    """
+    message = {"type": "depth_delta", "data": delta}
+    text = {
+        "type": "depth_delta",
         "data": {
-            "id": trade.id,
-            "price": trade.price,
-            "quantity": trade.quantity,
-            "symbol": trade.symbol,
-            "timestamp": trade.timestamp.isoformat() + "Z",
-            "aggressor_side": trade.aggressor_side,
-            "maker_order_id": trade.maker_order_id,
-            "taker_order_id": trade.taker_order_id,
+            **delta,
+            "bids": [[str(p), str(q)] for p, q in delta["bids"]],
+            "asks": [[str(p), str(q)] for p, q in delta["asks"]],
         },
-    }, default=str)
-    dead = []
-    for ws in book.trade_clients:
-        try:
-            await ws.send_text(message)
-        except Exception:
-            dead.append(ws)
-    for ws in dead:
-        book.trade_clients.remove(ws)
+    }
+    frame = Frame(json.dumps(text), lambda: message)
+    await _send_all(book.market_clients, frame)
+    await hub.publish("depth", book.symbol, frame)
 
 
-async def _broadcast_depth(book: OrderBook):
-    snapshot = book.get_order_book_depth()
-    message = json.dumps({"type": "market_depth", "data": snapshot})
-    dead = []
-    for ws in book.market_clients:
-        try:
-            await ws.send_text(message)
-        except Exception:
-            dead.append(ws)
-    for ws in dead:
-        book.market_clients.remove(ws)
+async def _broadcast_candles(book: OrderBook, updated: dict[str, dict]):
+    for interval, bar in updated.items():
+        channel = f"candles.{interval}"
+        clients = book.candle_clients.get(interval)
+        if not clients and not hub.subscribers(channel, book.symbol):
+            continue
+        message = {
+            "type": "candle",
+            "data": {"symbol": book.symbol, "interval": interval, **bar},
+        }
+        frame = Frame(json.dumps(message), lambda message=message: message)
+        if clients:
+            await _send_all(clients, frame)
+        await hub.publish(channel, book.symbol, frame)
+
+
+def _publish_user_event(user_id: str, event: dict):
+    """Private engine events go to /ws/user streams and to the /ws/orders session that placed the order."""
+    order_entry.publish(user_id, event)
+    user_stream.publish(user_id, event)
 
 
 # ---------------------------------------------------------------------------
@@ -81,10 +151,30 @@ async def lifespan(app: FastAPI):
     logger.info("[Startup] Database pool initialized")
 
     # Register WS broadcast callbacks into the matching engine
-    matching_engine.register_broadcast_callbacks(_broadcast_trade, _broadcast_depth)
+    matching_engine.register_broadcast_callbacks(
+        _broadcast_trade, _broadcast_depth, _broadcast_candles, _broadcast_depth_delta
+    )
+    matching_engine.register_user_callback(_publish_user_event)
+
+    # Rebuild the account ledger from persisted balances
+    ledger.load(await db.get_balances())
+    logger.info("[Startup] Ledger loaded")
+
+    # Put open orders back in their books; this also re-indexes their holds
+    await matching_engine.restore_books()
+
+    # Rebuild in-memory candles and tickers from recent trades
+    await matching_engine.backfill_market_data()
+
+    # Rebuild positions from the full trade history, archive included
+    await matching_engine.restore_positions()
+
+    # Roll old trades into the columnar archive in the background
+    archiver = asyncio.create_task(trade_archive.run_archiver(), name="trade-archiver")
 
     yield
 
+    archiver.cancel()
     logger.info("[Shutdown] Closing database pool")
 
 
@@ -108,6 +198,12 @@ app.include_router(auth.router)
 app.include_router(orders.router)
 app.include_router(orderbook.router)
 app.include_router(trades.router)
+app.include_router(candles.router)
+app.include_router(ticker.router)
+app.include_router(order_entry.router)
+app.include_router(accounts.router)
+app.include_router(positions.router)
+app.include_router(user_stream.router)
 
 
 # ---------------------------------------------------------------------------
@@ -128,9 +224,20 @@ async def serve_dashboard():
 # WebSocket endpoints
 # ---------------------------------------------------------------------------
 
-@app.websocket("/ws/market/{symbol}")
-async def market_data_stream(websocket: WebSocket, symbol: str):
+async def _accept(websocket: WebSocket, encoding: str) -> bool:
+    """Accept the socket with its negotiated encoding; reject unknown encodings."""
+    if encoding not in FORMATS:
+        await websocket.close(code=1003)
+        return False
     await websocket.accept()
+    set_format(websocket, encoding)
+    return True
+
+
+@app.websocket("/ws/market/{symbol}")
+async def market_data_stream(websocket: WebSocket, symbol: str, encoding: str = "json"):
+    if not await _accept(websocket, encoding):
+        return
     # Lazily create the book so WS clients can connect before any order is placed
     book = matching_engine._get_or_create(symbol)[1]
     book.market_clients.append(websocket)
@@ -141,11 +248,14 @@ async def market_data_stream(websocket: WebSocket, symbol: str):
     except WebSocketDisconnect:
         if websocket in book.market_clients:
             book.market_clients.remove(websocket)
+    finally:
+        forget(websocket)
 
 
 @app.websocket("/ws/trades/{symbol}")
-async def trade_feed_stream(websocket: WebSocket, symbol: str):
-    await websocket.accept()
+async def trade_feed_stream(websocket: WebSocket, symbol: str, encoding: str = "json"):
+    if not await _accept(websocket, encoding):
+        return
     book = matching_engine._get_or_create(symbol)[1]
     book.trade_clients.append(websocket)
     logger.info(f"[WS] Trade client connected: {symbol}")
@@ -155,3 +265,71 @@ async def trade_feed_stream(websocket: WebSocket, symbol: str):
     except WebSocketDisconnect:
         if websocket in book.trade_clients:
             book.trade_clients.remove(websocket)
+    finally:
+        forget(websocket)
+
+
+@app.websocket("/ws/candles/{symbol}")
+async def candle_stream(websocket: WebSocket, symbol: str, interval: str = "1m", encoding: str = "json"):
+    if interval not in INTERVALS:
+        await websocket.close(code=1008)
+        return
+    if not await _accept(websocket, encoding):
+        return
+    book = matching_engine._get_or_create(symbol)[1]
+    clients = book.candle_clients[interval]
+    clients.append(websocket)
+    logger.info(f"[WS] Candle client connected: {symbol} {interval}")
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        if websocket in clients:
+            clients.remove(websocket)
+    finally:
+        forget(websocket)
+
+
+@app.websocket("/ws")
+async def multiplexed_stream(websocket: WebSocket, encoding: str = "json"):
+    """
+    Single connection for any number of feeds. Client messages:
+        {"op": "subscribe",   "channel": "depth", "symbols": ["BTCUSDT", ...]}
+        {"op": "unsubscribe", "channel": "trades", "symbol": "BTCUSDT"}
+    Channels: depth, trades, candles.<interval>. Every pushed message carries
+    its "channel" and "symbol". Control replies are always JSON text.
+    """
+    if not await _accept(websocket, encoding):
+        return
+    logger.info("[WS] Multiplexed client connected")
+    try:
+        while True:
+            try:
+                msg = json.loads(await websocket.receive_text())
+                op = msg["op"]
+                channel = msg["channel"]
+                symbols = msg.get("symbols") or [msg["symbol"]]
+                if not isinstance(symbols, list) or not all(isinstance(s, str) and s for s in symbols):
+                    raise TypeError("symbols must be a list of strings")
+            except (ValueError, KeyError, TypeError):
+                await websocket.send_text(json.dumps({"op": "error", "detail": "Malformed message"}))
+                continue
+
+            if channel not in CHANNELS or op not in ("subscribe", "unsubscribe"):
+                await websocket.send_text(json.dumps({"op": "error", "detail": f"Unknown op/channel: {op}/{channel}"}))
+                continue
+
+            for symbol in symbols:
+                if op == "subscribe":
+                    book = matching_engine._get_or_create(symbol)[1]
+                    hub.subscribe(websocket, channel, symbol)
+                    if channel == "depth":
+                        await send(websocket, _depth_frame(book).tagged(channel, symbol))
+                else:
+                    hub.unsubscribe(websocket, channel, symbol)
+            await websocket.send_text(json.dumps({"op": f"{op}d", "channel": channel, "symbols": symbols}))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.drop(websocket)
+        forget(websocket)
@@ -0,0 +1,31 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from src.api.dependencies import get_current_user
+from src.models.user import Deposit
+from src.services import auth_service, db
+from src.services.ledger import ledger
+from src.utils.config import settings
+
+router = APIRouter(prefix="/accounts", tags=["accounts"])
+
+
+def require_service_key(x_service_key: str = Header(default="")):
+    if not settings.service_key or not hmac.compare_digest(x_service_key, settings.service_key):
+        raise HTTPException(status_code=403, detail="Invalid service key")
+
+
+@router.get("/balances")
+async def get_balances(current_user: dict = Depends(get_current_user)):
+    """Available and held balance per asset, straight from the in-memory ledger."""
+    return {"balances": ledger.snapshot(str(current_user["id"]))}
+
+
+@router.post("/deposit", dependencies=[Depends(require_service_key)])
+async def deposit(body: Deposit):
+    if not await auth_service.get_user(body.user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    bal = ledger.deposit(body.user_id, body.asset, body.amount)
+    await db.upsert_balances(ledger.drain_dirty())
+    return {"user_id": body.user_id, "asset": body.asset, "available": bal.available, "held": bal.held}
@@ -13,7 +13,7 @@ async def signup(body: UserCreate):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed = auth_service.hash_password(body.password)
+    hashed = await auth_service.hash_password(body.password)
     user = await db.create_user(body.email, hashed)
     token = auth_service.create_access_token(str(user["id"]))
 
@@ -23,7 +23,7 @@ async def signup(body: UserCreate):
 @router.post("/login", response_model=TokenResponse)
 async def login(body: UserLogin):
     user = await db.get_user_by_email(body.email)
-    if not user or not auth_service.verify_password(body.password, user["hashed_password"]):
+    if not user or not await auth_service.verify_password(body.password, user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     token = auth_service.create_access_token(str(user["id"]))
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Query
+
+from src.services import matching_engine
+from src.services.candles import INTERVALS
+
+router = APIRouter(tags=["candles"])
+
+
+@router.get("/candles/{symbol}")
+async def get_candles(
+    symbol: str,
+    interval: str = "1m",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    limit: int = Query(500, ge=1, le=2000),
+):
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {list(INTERVALS)}")
+    candles = matching_engine.get_candles(symbol)
+    if not candles:
+        return {"symbol": symbol, "interval": interval, "candles": []}
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "candles": candles.query(interval, start, end, limit),
+    }
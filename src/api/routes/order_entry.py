@@ -0,0 +1,238 @@
+"""
+Persistent order-entry WebSocket.
+
+Connect to /ws/orders?token=<JWT>; the token and user are checked once per
+session. Add &cancel_on_disconnect=true to have all of the user's resting
+orders cancelled if the session drops and does not reconnect within
+COD_GRACE_SECONDS. Then stream JSON messages, each tagged with a client_order_id:
+
+    {"op": "new",    "client_order_id": "q1", "symbol": "BTCUSDT", "side": "buy",
+                     "type": "limit", "price": 100.0, "quantity": 1.0}
+    {"op": "cancel", "client_order_id": "c1", "order_id": "<id>" | "orig_client_order_id": "q1"}
+    {"op": "amend",  "client_order_id": "a1", "order_id": "<id>", "price": 101.0, "quantity": 2.0}
+
+Replies arrive asynchronously and carry the same client_order_id:
+    {"type": "ack" | "fill" | "order" | "done" | "amended" | "cancelled" | "reject", "client_order_id": ..., ...}
+After the "ack", every fill of an order placed on this session is pushed
+as a "fill" — as taker on arrival and as maker while it rests. "order"
+reports a state change of a still-open order (partial, amended); "done"
+is sent once, with the final status (filled, cancelled, expired) and
+remaining_qty.
+
+Messages are processed concurrently (up to SESSION_MAX_INFLIGHT at a time),
+so replies to different messages may arrive in any order. A cancel or
+amend naming an order by orig_client_order_id waits until that order has
+been acked.
+"""
+
+import asyncio
+import json
+from collections import OrderedDict
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from src.models.order import OrderAmend, OrderCreate
+from src.services import auth_service, disconnect_guard, order_service
+from src.utils.logger import logger
+
+router = APIRouter(tags=["orders"])
+
+# Per-session client_order_id → order_id, for cancels by client id
+SESSION_ORDER_MEMORY = 10_000
+# Messages in flight per session before the reader stops taking more
+SESSION_MAX_INFLIGHT = 1_000
+# Statuses after which an order gets no more events
+FINAL_STATUSES = {"filled", "cancelled", "expired"}
+
+
+class OrderSession:
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.ws = websocket
+        self.user_id = user_id
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.orders: OrderedDict[str, str] = OrderedDict()
+        # client_order_id → resolved once that order's "new" is acked or rejected
+        self.pending: dict[str, asyncio.Future] = {}
+        self.inflight = asyncio.Semaphore(SESSION_MAX_INFLIGHT)
+        self.tasks: set[asyncio.Task] = set()
+        # order_id → client_order_id of this session's orders still open
+        self.open_orders: OrderedDict[str, str | None] = OrderedDict()
+
+    def emit(self, message: dict):
+        self.outbox.put_nowait(message)
+
+    async def writer(self):
+        """Single writer so asynchronous fills never interleave on the socket."""
+        while True:
+            message = await self.outbox.get()
+            await self.ws.send_text(json.dumps(message, default=str))
+
+    def remember(self, client_order_id: str | None, order_id: str):
+        if client_order_id is None:
+            return
+        self.orders[client_order_id] = order_id
+        if len(self.orders) > SESSION_ORDER_MEMORY:
+            self.orders.popitem(last=False)
+
+    def track(self, order_id: str, client_order_id: str | None):
+        self.open_orders[order_id] = client_order_id
+        if len(self.open_orders) > SESSION_ORDER_MEMORY:
+            self.open_orders.popitem(last=False)
+
+    def on_event(self, event: dict):
+        """Forward an engine order / fill event if it concerns one of this session's orders."""
+        data = event.get("data") or {}
+        order_id = data.get("order_id")
+        if order_id not in self.open_orders:
+            return
+        coid = self.open_orders[order_id]
+        if event["type"] == "fill":
+            self.emit({
+                "type": "fill",
+                "client_order_id": coid,
+                "order_id": order_id,
+                "trade_id": data["trade_id"],
+                "price": data["price"],
+                "quantity": data["quantity"],
+                "liquidity": data["liquidity"],
+            })
+        elif event["type"] == "order":
+            final = data["status"] in FINAL_STATUSES
+            if final:
+                del self.open_orders[order_id]
+            self.emit({
+                "type": "done" if final else "order",
+                "client_order_id": coid,
+                "order_id": order_id,
+                "status": data["status"],
+                "remaining_qty": data["remaining_qty"],
+            })
+
+    async def resolve(self, msg: dict) -> str:
+        order_id = msg.get("order_id")
+        if not order_id:
+            coid = msg.get("orig_client_order_id")
+            pending = self.pending.get(coid)
+            if pending is not None:
+                await pending
+            order_id = self.orders.get(coid)
+        if not order_id:
+            raise HTTPException(status_code=404, detail="Order not found")
+        return order_id
+
+    # ------------------------------------------------------------------
+    # Operations
+    # ------------------------------------------------------------------
+
+    async def new(self, msg: dict):
+        coid = msg.get("client_order_id")
+        acked = asyncio.get_running_loop().create_future()
+        if coid is not None:
+            self.pending[coid] = acked
+        try:
+            body = OrderCreate(**{k: v for k, v in msg.items() if k not in ("op", "client_order_id")})
+            order = order_service.build_order(body, self.user_id)
+            future = await order_service.enqueue_order(order)
+            self.remember(coid, order.id)
+            # Before the worker can settle it: fills and states arrive via on_event
+            self.track(order.id, coid)
+        finally:
+            if self.pending.get(coid) is acked:
+                del self.pending[coid]
+            acked.set_result(None)
+        self.emit({"type": "ack", "client_order_id": coid, "order_id": order.id})
+
+        def on_matched(fut: asyncio.Future):
+            if fut.exception():
+                self.open_orders.pop(order.id, None)
+                self.emit({"type": "reject", "client_order_id": coid, "detail": str(fut.exception())})
+
+        future.add_done_callback(on_matched)
+
+    async def cancel(self, msg: dict):
+        result = await order_service.cancel_order(await self.resolve(msg), self.user_id)
+        self.emit({"type": "cancelled", "client_order_id": msg.get("client_order_id"), **result})
+
+    async def amend(self, msg: dict):
+        """In-place amend in the symbol worker; reductions keep priority."""
+        body = OrderAmend(price=msg.get("price"), quantity=msg.get("quantity"))
+        result = await order_service.amend_order(await self.resolve(msg), body.price, body.quantity, self.user_id)
+        self.emit({"type": "amended", "client_order_id": msg.get("client_order_id"), **result})
+
+    async def handle(self, msg: dict):
+        ops = {"new": self.new, "cancel": self.cancel, "amend": self.amend}
+        op = ops.get(msg.get("op"))
+        if op is None:
+            raise HTTPException(status_code=400, detail=f"Unknown op: {msg.get('op')}")
+        await op(msg)
+
+    async def dispatch(self, raw: str):
+        """Handle one message; every failure becomes a reject, never a dropped session."""
+        msg = None
+        try:
+            msg = json.loads(raw)
+            await self.handle(msg)
+        except HTTPException as e:
+            self.emit({"type": "reject", "client_order_id": _client_order_id(msg), "detail": e.detail})
+        except (ValueError, ValidationError, AttributeError) as e:
+            self.emit({"type": "reject", "client_order_id": _client_order_id(msg), "detail": str(e)})
+        except Exception as e:
+            logger.error(f"[WS] Order session op failed: user={self.user_id}: {e}", exc_info=True)
+            self.emit({"type": "reject", "client_order_id": _client_order_id(msg), "detail": "Internal error"})
+        finally:
+            self.inflight.release()
+
+    async def submit(self, raw: str):
+        """Start handling `raw` without waiting for it; blocks while the session is at its in-flight cap."""
+        await self.inflight.acquire()
+        task = asyncio.create_task(self.dispatch(raw))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+
+# user_id → live order-entry sessions
+_sessions: dict[str, set[OrderSession]] = {}
+
+
+def publish(user_id: str, event: dict):
+    """Route an engine order / fill event to the user's sessions (called from the symbol workers)."""
+    for session in _sessions.get(user_id, ()):
+        session.on_event(event)
+
+
+def _client_order_id(msg) -> str | None:
+    return msg.get("client_order_id") if isinstance(msg, dict) else None
+
+
+@router.websocket("/ws/orders")
+async def order_entry(websocket: WebSocket, token: str, cancel_on_disconnect: bool = False):
+    try:
+        user = await auth_service.authenticate(token)
+    except HTTPException:
+        user = None
+    if not user:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    session = OrderSession(websocket, str(user["id"]))
+    writer = asyncio.create_task(session.writer())
+    _sessions.setdefault(session.user_id, set()).add(session)
+    if cancel_on_disconnect:
+        disconnect_guard.session_opened(session.user_id)
+    logger.info(f"[WS] Order session opened: user={session.user_id} cod={cancel_on_disconnect}")
+    try:
+        while True:
+            await session.submit(await websocket.receive_text())
+    except WebSocketDisconnect:
+        logger.info(f"[WS] Order session closed: user={session.user_id}")
+    finally:
+        writer.cancel()
+        sessions = _sessions.get(session.user_id)
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del _sessions[session.user_id]
+        if cancel_on_disconnect:
+            disconnect_guard.session_closed(session.user_id)
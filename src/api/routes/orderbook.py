@@ -1,21 +1,158 @@
-from fastapi import APIRouter
+import json
+import math
 
-from src.services import matching_engine
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+
+from src.services import depth_analytics, matching_engine
+from src.services.order_book import OrderBook
+from src.utils.config import settings
 
 router = APIRouter(tags=["orderbook"])
 
 
+def _etag(book: OrderBook, kind: str) -> str:
+    return f'"{book.version}-{kind}"'
+
+
+def _etag_version(etag: str | None) -> int | None:
+    """Pull the book version back out of an ETag we issued."""
+    if not etag:
+        return None
+    try:
+        return int(etag.strip().removeprefix("W/").strip('"').split("-", 1)[0])
+    except ValueError:
+        return None
+
+
+async def _conditional(
+    book: OrderBook, kind: str, if_none_match: str | None, since: int | None, wait: float
+) -> Response | None:
+    """
+    Long-poll until the book moves past the client's version (when `wait` > 0),
+    then answer 304 if the client's ETag is still current. Returns None when a
+    full body should be sent.
+    """
+    known = since if since is not None else _etag_version(if_none_match)
+    if wait > 0 and known is not None:
+        await matching_engine.wait_for_version(book, known, min(wait, settings.longpoll_max_seconds))
+
+    etag = _etag(book, kind)
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def _parse_symbols(symbols: str | None) -> list[str] | None:
+    if not symbols:
+        return None
+    return [s.strip() for s in symbols.split(",") if s.strip()]
+
+
+@router.get("/bbo")
+async def get_all_bbo(symbols: str | None = None):
+    """BBO for every symbol (or a comma-separated subset) from the consolidated table."""
+    table = matching_engine.get_bbo_table()
+    wanted = _parse_symbols(symbols)
+    if wanted is None:
+        return list(table.values())
+    return [table.get(s, {"symbol": s, "bid": None, "ask": None, "version": 0}) for s in wanted]
+
+
+@router.get("/orderbook")
+async def get_all_orderbooks(symbols: str | None = None, depth: int = Query(5, ge=1, le=50)):
+    """Top-N depth for every symbol (or a comma-separated subset) in one response."""
+    wanted = _parse_symbols(symbols)
+    names = wanted if wanted is not None else list(matching_engine.get_bbo_table())
+    parts = []
+    for name in names:
+        book = matching_engine.get_book(name)
+        if book:
+            parts.append(book.get_depth_json(depth))
+    # Splice the per-book memoized JSON instead of re-serializing
+    return Response(content="[" + ",".join(parts) + "]", media_type="application/json")
+
+
 @router.get("/orderbook/{symbol}")
-async def get_orderbook(symbol: str, depth: int = 20):
+async def get_orderbook(
+    symbol: str,
+    depth: int = 20,
+    since: int | None = None,
+    wait: float = Query(0, ge=0),
+    if_none_match: str | None = Header(None),
+):
+    """
+    Depth snapshot. Supports conditional GET (ETag / If-None-Match) and
+    long-poll: with `wait` > 0, blocks until the book version exceeds
+    `since` (or the version in If-None-Match).
+    """
     book = matching_engine.get_book(symbol)
     if not book:
         return {"symbol": symbol, "bids": [], "asks": [], "timestamp": None}
-    return book.get_order_book_depth(depth)
+
+    not_modified = await _conditional(book, f"d{depth}", if_none_match, since, wait)
+    if not_modified:
+        return not_modified
+    return Response(
+        content=book.get_depth_json(depth),
+        media_type="application/json",
+        headers={"ETag": _etag(book, f"d{depth}")},
+    )
 
 
 @router.get("/bbo/{symbol}")
-async def get_bbo(symbol: str):
+async def get_bbo(
+    symbol: str,
+    since: int | None = None,
+    wait: float = Query(0, ge=0),
+    if_none_match: str | None = Header(None),
+):
     book = matching_engine.get_book(symbol)
     if not book:
         return {"symbol": symbol, "bid": None, "ask": None}
-    return book.get_bbo()
+
+    not_modified = await _conditional(book, "bbo", if_none_match, since, wait)
+    if not_modified:
+        return not_modified
+    return Response(
+        content=json.dumps({**book.get_bbo(), "version": book.version}),
+        media_type="application/json",
+        headers={"ETag": _etag(book, "bbo")},
+    )
+
+
+@router.get("/orderbook/{symbol}/impact")
+async def get_impact(
+    symbol: str,
+    sizes: str = "1",
+    levels: int = Query(100, ge=1, le=1000),
+):
+    """
+    Estimated average fill price and slippage of market orders of each size
+    (comma-separated), plus cumulative depth, from a snapshot of the top levels.
+    """
+    try:
+        size_list = [float(s) for s in sizes.split(",") if s.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="sizes must be comma-separated numbers")
+    if not size_list or not all(math.isfinite(s) and s > 0 for s in size_list):
+        raise HTTPException(status_code=400, detail="sizes must be finite and positive")
+
+    book = matching_engine.get_book(symbol)
+    if not book:
+        raise HTTPException(status_code=404, detail="Unknown symbol")
+
+    # Snapshot is the only step that reads the live book
+    snapshot = book.get_depth_arrays(levels)
+    bid_prices, bid_qtys = snapshot["bids"]
+    ask_prices, ask_qtys = snapshot["asks"]
+
+    return {
+        "symbol": symbol,
+        "levels": levels,
+        "buy": depth_analytics.impact_cost(ask_prices, ask_qtys, size_list, "buy"),
+        "sell": depth_analytics.impact_cost(bid_prices, bid_qtys, size_list, "sell"),
+        "cumulative": {
+            "bids": depth_analytics.cumulative_depth(bid_prices, bid_qtys),
+            "asks": depth_analytics.cumulative_depth(ask_prices, ask_qtys),
+        },
+    }
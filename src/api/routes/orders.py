@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from src.models.order import Order, OrderCreate
-from src.services import auth_service, db, matching_engine
+from src.api.dependencies import get_current_user
+from src.models.order import MassQuote, OrderAmend, OrderBatch, OrderCreate
+from src.services import auth_service, order_service
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
@@ -16,8 +17,7 @@ async def get_optional_user(
     if not credentials:
         return None
     try:
-        user_id = auth_service.decode_token(credentials.credentials)
-        return await db.get_user_by_id(user_id)
+        return await auth_service.authenticate(credentials.credentials)
     except Exception:
         return None
 
@@ -28,76 +28,46 @@ async def create_order(
     current_user: dict | None = Depends(get_optional_user),
 ):
     user_id = str(current_user["id"]) if current_user else None
+    order, trades = await order_service.place_order(body, user_id)
+    return order_service.order_response(order, trades)
 
-    order = Order(
-        symbol=body.symbol,
-        side=body.side,
-        type=body.type,
-        price=body.price,
-        quantity=body.quantity,
-        user_id=user_id,
-    )
-
-    await db.insert_order({
-        "id": order.id,
-        "user_id": order.user_id,
-        "symbol": order.symbol,
-        "side": order.side.value,
-        "type": order.type.value,
-        "price": order.price,
-        "quantity": order.quantity,
-        "remaining_qty": order.remaining_qty,
-        "status": order.status.value,
-        "timestamp": order.timestamp,
-    })
-
-    trades = await matching_engine.submit_order(order)
-
-    return {
-        "order_id": order.id,
-        "status": order.status.value,
-        "symbol": order.symbol,
-        "side": order.side.value,
-        "type": order.type.value,
-        "price": order.price,
-        "quantity": order.quantity,
-        "remaining_qty": order.remaining_qty,
-        "trades_executed": len(trades),
-        "trades": [
-            {
-                "id": t.id,
-                "price": t.price,
-                "quantity": t.quantity,
-                "aggressor_side": t.aggressor_side,
-            }
-            for t in trades
-        ],
-    }
+
+@router.post("/batch", status_code=201)
+async def create_orders_batch(
+    body: OrderBatch,
+    current_user: dict | None = Depends(get_optional_user),
+):
+    user_id = str(current_user["id"]) if current_user else None
+    return {"results": await order_service.place_batch(body.orders, user_id)}
+
+
+@router.post("/mass-quote")
+async def mass_quote(body: MassQuote, current_user: dict = Depends(get_current_user)):
+    """Atomically replace the caller's quotes on a symbol; quantity 0 removes a level."""
+    return await order_service.mass_quote(body, str(current_user["id"]))
 
 
 @router.get("/{order_id}")
 async def get_order(order_id: str):
-    order = await db.get_order_by_id(order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    return order
+    return await order_service.get_order(order_id)
 
 
-@router.delete("/{order_id}")
-async def cancel_order(order_id: str):
-    order = await db.get_order_by_id(order_id)
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+@router.patch("/{order_id}")
+async def amend_order(
+    order_id: str,
+    body: OrderAmend,
+    current_user: dict = Depends(get_current_user),
+):
+    """Size reductions keep queue priority; price changes or increases re-queue."""
+    return await order_service.amend_order(order_id, body.price, body.quantity, str(current_user["id"]))
 
-    if order["status"] not in ("open", "partial"):
-        raise HTTPException(
-            status_code=400,
-            detail=f"Cannot cancel order with status '{order['status']}'"
-        )
 
-    book = matching_engine.get_book(order["symbol"])
-    removed_from_book = book.cancel_order(order_id) if book else False
+@router.delete("")
+async def cancel_all_orders(symbol: str | None = None, current_user: dict = Depends(get_current_user)):
+    """Cancel all of the caller's resting orders, optionally only on `symbol`."""
+    return await order_service.cancel_all(str(current_user["id"]), symbol)
 
-    await db.update_order(order_id, "cancelled", float(order["remaining_qty"]))
 
-    return {"cancelled": True, "order_id": order_id, "removed_from_book": removed_from_book}
+@router.delete("/{order_id}")
+async def cancel_order(order_id: str):
+    return await order_service.cancel_order(order_id)
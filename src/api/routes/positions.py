@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+
+from src.api.dependencies import get_current_user
+from src.services import matching_engine
+
+router = APIRouter(tags=["positions"])
+
+
+@router.get("/positions")
+async def get_positions(current_user: dict = Depends(get_current_user)):
+    """Open and closed positions with realized P&L, unrealized marked at the live BBO."""
+    return {"positions": matching_engine.position_snapshot(str(current_user["id"]))}
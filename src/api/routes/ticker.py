@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+
+from src.services import matching_engine
+
+router = APIRouter(tags=["ticker"])
+
+
+def _quote(symbol: str) -> dict:
+    """24h rolling stats merged with the live BBO."""
+    ticker = matching_engine.get_ticker(symbol)
+    book = matching_engine.get_book(symbol)
+    stats = ticker.snapshot() if ticker else {"symbol": symbol, "last_price": None}
+    bbo = book.get_bbo() if book else {"bid": None, "ask": None}
+    return {**stats, **bbo}
+
+
+@router.get("/ticker/{symbol}")
+async def get_ticker(symbol: str):
+    return _quote(symbol)
+
+
+@router.get("/tickers")
+async def get_tickers():
+    return [_quote(symbol) for symbol in list(matching_engine.all_tickers())]
@@ -1,10 +1,112 @@
-from fastapi import APIRouter
+import asyncio
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
 
-from src.services import db
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+
+from src.services import db, trade_archive
 
 router = APIRouter(tags=["trades"])
 
+EXPORT_CHUNK_ROWS = 500
+EXPORT_FIELDS = ["id", "symbol", "price", "quantity", "buyer_id", "seller_id", "timestamp"]
+
+
+def _encode_cursor(row: dict) -> str:
+    return f"{row['timestamp'].isoformat()}_{row['id']}"
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        ts, trade_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(ts), str(uuid.UUID(trade_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @router.get("/trades/{symbol}")
-async def get_trades(symbol: str, limit: int = 50):
-    return await db.get_trades_for_symbol(symbol, limit)
+async def get_trades(
+    symbol: str,
+    response: Response,
+    limit: int = Query(50, ge=1, le=1000),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+):
+    """
+    Newest-first trades. Pass the `X-Next-Cursor` header of a page back
+    as `cursor` to fetch the next (older) page.
+    """
+    before = _decode_cursor(cursor) if cursor else None
+    rows = await db.get_trades_for_symbol(symbol, limit, start=start, end=end, before=before)
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    return rows
+
+
+@router.get("/trades/{symbol}/export")
+async def export_trades(
+    symbol: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+):
+    """Stream every trade in [start, end) oldest-first as NDJSON or CSV."""
+
+    async def ndjson_chunks():
+        lines = []
+        async for row in db.stream_trades(symbol, start, end, prefetch=EXPORT_CHUNK_ROWS):
+            lines.append(json.dumps({k: row[k] for k in EXPORT_FIELDS}, default=str))
+            if len(lines) >= EXPORT_CHUNK_ROWS:
+                yield "\n".join(lines) + "\n"
+                lines.clear()
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    async def csv_chunks():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(EXPORT_FIELDS)
+        rows = 0
+        async for row in db.stream_trades(symbol, start, end, prefetch=EXPORT_CHUNK_ROWS):
+            writer.writerow([row[k] for k in EXPORT_FIELDS])
+            rows += 1
+            if rows >= EXPORT_CHUNK_ROWS:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+                rows = 0
+        if buf.tell():
+            yield buf.getvalue()
+
+    if format == "csv":
+        return StreamingResponse(
+            csv_chunks(),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{symbol}-trades.csv"'},
+        )
+    return StreamingResponse(ndjson_chunks(), media_type="application/x-ndjson")
+
+
+# ---------------------------------------------------------------------------
+# Archived history (columnar files, never touches the primary DB)
+# ---------------------------------------------------------------------------
+
+@router.get("/trades/{symbol}/history")
+async def get_archived_trades(
+    symbol: str,
+    start: datetime,
+    end: datetime,
+    limit: int = Query(1000, ge=1, le=10_000),
+):
+    return await asyncio.to_thread(trade_archive.query_history, symbol, start, end, limit)
+
+
+@router.get("/trades/{symbol}/stats")
+async def get_archived_stats(symbol: str, start: datetime, end: datetime):
+    """Volume, VWAP, high and low over archived trades in [start, end)."""
+    return await asyncio.to_thread(trade_archive.query_stats, symbol, start, end)
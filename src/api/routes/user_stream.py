@@ -0,0 +1,159 @@
+"""
+Private per-user WebSocket.
+
+Connect to /ws/user?token=<JWT>[&since=<seq>]. Every push carries a
+per-user, strictly increasing "seq":
+
+    {"seq": 7, "type": "order",    "data": {"order_id", "symbol", "side", "price",
+                                            "status", "remaining_qty"}}
+    {"seq": 8, "type": "fill",     "data": {"trade_id", "order_id", "symbol", "side",
+                                            "price", "quantity", "liquidity", "timestamp"}}
+    {"seq": 9, "type": "position", "data": <entry of GET /positions>}
+
+Order "status" is the order's new state (open = accepted, partial, filled,
+cancelled, expired) or "amended" for an in-place size / price change.
+All of it is emitted by the matching workers from in-memory state.
+
+A fresh session starts with {"type": "snapshot", "seq": <last seq>,
+"positions": [...]}. To resume after a drop, reconnect with
+since=<last seq seen>: missed messages are replayed from a bounded
+buffer. If they have already left the buffer the session gets
+{"type": "reset"} followed by a snapshot and must re-sync over REST.
+
+Only users with a live session, or one dropped less than
+USER_STREAM_IDLE_SECONDS ago, are buffered; after that the buffer is
+evicted and a resume gets a reset.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+
+from src.services import auth_service, matching_engine
+from src.utils.config import settings
+from src.utils.logger import logger
+
+router = APIRouter(tags=["user"])
+
+# Idle streams are looked for at most this often
+SWEEP_INTERVAL_SECONDS = 5.0
+
+
+class UserSession:
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.ws = websocket
+        self.user_id = user_id
+        self.outbox: asyncio.Queue = asyncio.Queue()
+
+    def emit(self, message: dict):
+        self.outbox.put_nowait(message)
+
+    async def writer(self):
+        """Single writer so pushes from several symbol workers never interleave."""
+        while True:
+            message = await self.outbox.get()
+            await self.ws.send_text(json.dumps(message, default=str))
+
+
+class UserStream:
+    """Sequence counter, replay buffer and live sessions of one user."""
+
+    def __init__(self):
+        # Starts past any earlier stream of this user (evicted, or before a
+        # restart), so a stale `since` can never alias into this one
+        self.seq = time.time_ns() // 1000
+        self.replay: deque[dict] = deque(maxlen=settings.user_stream_replay)
+        self.sessions: set[UserSession] = set()
+        self.idle_since: float | None = None   # monotonic time the last session left
+
+    def publish(self, message: dict):
+        self.seq += 1
+        message["seq"] = self.seq
+        self.replay.append(message)
+        for session in self.sessions:
+            session.emit(message)
+
+    def missed(self, since: int) -> list[dict] | None:
+        """Messages after `since`, or None if some were already evicted."""
+        if since == self.seq:
+            return []
+        if since > self.seq:
+            return None
+        oldest = self.replay[0]["seq"] if self.replay else self.seq + 1
+        if since + 1 < oldest:
+            return None
+        return [m for m in self.replay if m["seq"] > since]
+
+
+# user_id → stream, only for users with a live or recently dropped session
+_streams: dict[str, UserStream] = {}
+_last_sweep = 0.0
+
+
+def publish(user_id: str, message: dict):
+    """Sequence, buffer and queue `message` for `user_id` (called from the symbol workers)."""
+    stream = _streams.get(user_id)
+    if stream is not None:
+        stream.publish(message)
+    _evict_idle()
+
+
+def _evict_idle(now: float | None = None):
+    global _last_sweep
+    now = time.monotonic() if now is None else now
+    if now - _last_sweep < SWEEP_INTERVAL_SECONDS:
+        return
+    _last_sweep = now
+    cutoff = now - settings.user_stream_idle_seconds
+    for user_id in [u for u, s in _streams.items() if s.idle_since is not None and s.idle_since <= cutoff]:
+        del _streams[user_id]
+
+
+def _snapshot(stream: UserStream, user_id: str) -> dict:
+    return {"type": "snapshot", "seq": stream.seq, "positions": matching_engine.position_snapshot(user_id)}
+
+
+@router.websocket("/ws/user")
+async def user_stream(websocket: WebSocket, token: str, since: int | None = None):
+    try:
+        user = await auth_service.authenticate(token)
+    except HTTPException:
+        user = None
+    if not user:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    session = UserSession(websocket, str(user["id"]))
+    _evict_idle()
+    stream = _streams.get(session.user_id)
+    if stream is None:
+        stream = _streams[session.user_id] = UserStream()
+
+    # Replay and registration happen without awaiting, so nothing is missed or doubled
+    missed = stream.missed(since) if since is not None else None
+    if missed is None:
+        if since is not None:
+            session.emit({"type": "reset"})
+        session.emit(_snapshot(stream, session.user_id))
+    else:
+        for message in missed:
+            session.emit(message)
+    stream.sessions.add(session)
+    stream.idle_since = None
+
+    writer = asyncio.create_task(session.writer())
+    logger.info(f"[WS] User stream opened: user={session.user_id} since={since}")
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        logger.info(f"[WS] User stream closed: user={session.user_id}")
+    finally:
+        writer.cancel()
+        stream.sessions.discard(session)
+        if not stream.sessions:
+            stream.idle_since = time.monotonic()
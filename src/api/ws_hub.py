@@ -0,0 +1,64 @@
+"""
+Subscription index for the multiplexed /ws endpoint.
+
+One WebSocket can subscribe to any number of (channel, symbol) pairs.
+Fan-out looks up subscribers by key, so publishing costs O(subscribers)
+regardless of how many connections are open.
+"""
+
+from collections import defaultdict
+
+from fastapi import WebSocket
+
+from src.api.encoding import Frame, send
+from src.services.candles import INTERVALS
+
+CHANNELS = {"depth", "trades"} | {f"candles.{i}" for i in INTERVALS}
+
+
+class SubscriptionHub:
+    def __init__(self):
+        # (channel, symbol) → sockets
+        self._subs: dict[tuple[str, str], set[WebSocket]] = defaultdict(set)
+        # socket → its keys, for O(own subscriptions) cleanup on disconnect
+        self._by_ws: dict[WebSocket, set[tuple[str, str]]] = defaultdict(set)
+
+    def subscribe(self, ws: WebSocket, channel: str, symbol: str):
+        key = (channel, symbol)
+        self._subs[key].add(ws)
+        self._by_ws[ws].add(key)
+
+    def unsubscribe(self, ws: WebSocket, channel: str, symbol: str):
+        key = (channel, symbol)
+        subs = self._subs.get(key)
+        if subs:
+            subs.discard(ws)
+            if not subs:
+                del self._subs[key]
+        keys = self._by_ws.get(ws)
+        if keys:
+            keys.discard(key)
+
+    def drop(self, ws: WebSocket):
+        for channel, symbol in self._by_ws.pop(ws, set()):
+            self.unsubscribe(ws, channel, symbol)
+
+    def subscribers(self, channel: str, symbol: str) -> set[WebSocket]:
+        return self._subs.get((channel, symbol), set())
+
+    async def publish(self, channel: str, symbol: str, frame: Frame):
+        subs = self._subs.get((channel, symbol))
+        if not subs:
+            return
+        tagged = frame.tagged(channel, symbol)
+        dead = []
+        for ws in list(subs):
+            try:
+                await send(ws, tagged)
+            except Exception:
+                dead.append(ws)
+        for ws in dead:
+            self.drop(ws)
+
+
+hub = SubscriptionHub()
@@ -1,9 +1,26 @@
 from pydantic import BaseModel
 from datetime import datetime
 
+from src.models.order import SelfTradePrevention, Side, TimeInForce
+
 
 class OrderBookEntry(BaseModel):
     order_id: str
-    quantity: float
+    price: float
+    side: Side
+    quantity: float             # visible (displayed) quantity
     timestamp: datetime
     user_id: str | None = None
+    hidden: float = 0.0         # iceberg reserve, not shown in depth
+    display_qty: float | None = None
+    filled: float = 0.0         # executed so far, across re-queues
+    # Carried over when an amend re-queues the order
+    stp: SelfTradePrevention | None = None
+    time_in_force: TimeInForce = TimeInForce.GTC
+    expire_at: datetime | None = None
+    client_order_id: str | None = None
+
+    @property
+    def remaining(self) -> float:
+        """Open quantity, visible plus hidden."""
+        return self.quantity + self.hidden
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from uuid import uuid4
 from enum import Enum
 from datetime import datetime, timezone
@@ -14,6 +14,8 @@ class OrderType(str, Enum):
     MARKET = "market"
     IOC = "ioc"
     FOK = "fok"
+    STOP = "stop"              # market order armed at stop_price
+    STOP_LIMIT = "stop_limit"  # limit order at price, armed at stop_price
 
 
 class OrderStatus(str, Enum):
@@ -21,6 +23,22 @@ class OrderStatus(str, Enum):
     PARTIAL = "partial"
     FILLED = "filled"
     CANCELLED = "cancelled"
+    EXPIRED = "expired"
+
+
+class SelfTradePrevention(str, Enum):
+    """What happens when an incoming order would match the same user's resting order."""
+    CANCEL_NEWEST = "cancel_newest"  # cancel the incoming remainder
+    CANCEL_OLDEST = "cancel_oldest"  # cancel the resting order, keep matching
+    CANCEL_BOTH = "cancel_both"
+    DECREMENT = "decrement"          # shrink both by the overlap, no trade
+    NONE = "none"                    # allow self-trades
+
+
+class TimeInForce(str, Enum):
+    GTC = "gtc"  # good till cancelled
+    GTT = "gtt"  # good till expire_at
+    DAY = "day"  # good till the next session close
 
 
 class OrderCreate(BaseModel):
@@ -30,6 +48,68 @@ class OrderCreate(BaseModel):
     type: OrderType
     price: float = 0.0
     quantity: float
+    stop_price: float | None = None
+    # Iceberg: only this much rests visibly; the rest is a hidden reserve
+    display_qty: float | None = Field(default=None, gt=0)
+    time_in_force: TimeInForce = TimeInForce.GTC
+    expire_at: datetime | None = None
+    # Defaults to the engine-wide settings.stp_mode
+    stp: SelfTradePrevention | None = None
+    # Idempotency key: a retry with the same id returns the original result
+    client_order_id: str | None = Field(default=None, min_length=1, max_length=64)
+
+    @model_validator(mode="after")
+    def _check_expire_at(self):
+        if self.time_in_force == TimeInForce.GTT:
+            if self.expire_at is None:
+                raise ValueError("expire_at is required for gtt orders")
+            expire_at = self.expire_at if self.expire_at.tzinfo else self.expire_at.replace(tzinfo=timezone.utc)
+            if expire_at <= datetime.now(timezone.utc):
+                raise ValueError("expire_at must be in the future")
+        elif self.expire_at is not None:
+            raise ValueError("expire_at is only allowed for gtt orders")
+        return self
+
+    @model_validator(mode="after")
+    def _check_stop_price(self):
+        if self.type in (OrderType.STOP, OrderType.STOP_LIMIT) and not self.stop_price:
+            raise ValueError("stop_price is required for stop and stop_limit orders")
+        # Once fired a stop_limit rests as a limit order at `price`
+        if self.type == OrderType.STOP_LIMIT and self.price <= 0:
+            raise ValueError("price must be positive for stop_limit orders")
+        return self
+
+    @model_validator(mode="after")
+    def _check_display_qty(self):
+        if self.display_qty is not None:
+            if self.type not in (OrderType.LIMIT, OrderType.STOP_LIMIT):
+                raise ValueError("display_qty is only allowed on limit and stop_limit orders")
+            if self.display_qty >= self.quantity:
+                raise ValueError("display_qty must be less than quantity")
+        return self
+
+
+class OrderAmend(BaseModel):
+    """New price and/or new open (remaining) quantity for a resting order."""
+    price: float | None = Field(default=None, gt=0)
+    quantity: float | None = Field(default=None, gt=0)
+
+
+class OrderBatch(BaseModel):
+    """Many orders in one request."""
+    orders: list[OrderCreate] = Field(min_length=1, max_length=1000)
+
+
+class QuoteLevel(BaseModel):
+    price: float = Field(gt=0)
+    quantity: float = Field(ge=0)
+
+
+class MassQuote(BaseModel):
+    """Full replacement of a user's two-sided quotes on one symbol."""
+    symbol: str
+    bids: list[QuoteLevel] = Field(default_factory=list, max_length=500)
+    asks: list[QuoteLevel] = Field(default_factory=list, max_length=500)
 
 
 class Order(BaseModel):
@@ -44,6 +124,12 @@ class Order(BaseModel):
     quantity: float
     remaining_qty: float = 0.0
     status: OrderStatus = OrderStatus.OPEN
+    stop_price: float | None = None
+    display_qty: float | None = None
+    time_in_force: TimeInForce = TimeInForce.GTC
+    expire_at: datetime | None = None
+    stp: SelfTradePrevention | None = None
+    client_order_id: str | None = None
 
     def model_post_init(self, __context):
         if self.remaining_qty == 0.0:
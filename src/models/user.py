@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 
 class UserCreate(BaseModel):
@@ -16,3 +16,10 @@ class TokenResponse(BaseModel):
     token_type: str = "bearer"
     user_id: str
     email: str
+
+
+class Deposit(BaseModel):
+    """Credit an asset to a user's available balance (service-to-service)."""
+    user_id: str
+    asset: str
+    amount: float = Field(gt=0)
@@ -1,18 +1,74 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 import bcrypt
 from jose import JWTError, jwt
 from fastapi import HTTPException
 
+from src.services import db
 from src.utils.config import settings
 
+# bcrypt is deliberately slow (~100–300 ms); it runs here so the event loop
+# and the symbol workers on it never stall behind a login.
+_bcrypt_pool = ThreadPoolExecutor(max_workers=settings.bcrypt_workers, thread_name_prefix="bcrypt")
 
-def hash_password(plain: str) -> str:
-    return bcrypt.hashpw(plain.encode(), bcrypt.gensalt()).decode()
 
+class TTLCache:
+    """LRU-bounded mapping whose entries also expire after a per-entry TTL."""
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.checkpw(plain.encode(), hashed.encode())
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        self._entries.clear()
+
+
+# token → user_id, never kept past the token's own expiry
+_tokens = TTLCache(settings.auth_cache_size, settings.auth_cache_ttl_seconds)
+# user_id → users row
+_users = TTLCache(settings.auth_cache_size, settings.auth_cache_ttl_seconds)
+
+
+async def hash_password(plain: str) -> str:
+    loop = asyncio.get_running_loop()
+    hashed = await loop.run_in_executor(_bcrypt_pool, bcrypt.hashpw, plain.encode(), bcrypt.gensalt())
+    return hashed.decode()
+
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_pool, bcrypt.checkpw, plain.encode(), hashed.encode())
 
 
 def create_access_token(user_id: str) -> str:
@@ -23,11 +79,43 @@ def create_access_token(user_id: str) -> str:
 
 def decode_token(token: str) -> str:
     """Returns user_id from token, raises 401 if invalid."""
+    user_id = _tokens.get(token)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
         user_id: str = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    exp = payload.get("exp")
+    _tokens.put(token, user_id, exp - time.time() if exp is not None else None)
+    return user_id
+
+
+async def get_user(user_id: str) -> dict | None:
+    """Users row by id, cached; missing users are not cached."""
+    user = _users.get(user_id)
+    if user is None:
+        user = await db.get_user_by_id(user_id)
+        if user is not None:
+            _users.put(user_id, user)
+    return user
+
+
+async def authenticate(token: str) -> dict:
+    """Users row for a bearer token, raises 401 if the token or user is invalid."""
+    user = await get_user(decode_token(token))
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
+def invalidate_user(user_id: str):
+    """Drop a cached user record, e.g. after it changes or is disabled."""
+    _users.pop(user_id)
+
+
+def invalidate_token(token: str):
+    _tokens.pop(token)
@@ -0,0 +1,108 @@
+"""
+Incremental OHLCV candles. Fully synchronous — no I/O.
+
+Each symbol owns a CandleAggregator holding one CandleSeries per interval.
+The matching worker feeds every Trade in; each update is O(1) per interval.
+Bars are kept in start-time order so a range query is a bisect plus a
+slice — O(log n + bars returned), never O(trades).
+"""
+
+from bisect import bisect_left
+from datetime import datetime, timezone
+
+from src.models.trade import Trade
+
+# interval name → bucket width in seconds
+INTERVALS: dict[str, int] = {"1s": 1, "1m": 60, "5m": 300, "1h": 3600}
+
+
+def _epoch(ts: datetime) -> float:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class CandleSeries:
+    def __init__(self, interval: str, max_bars: int):
+        self.interval = interval
+        self.seconds = INTERVALS[interval]
+        self.max_bars = max_bars
+        # Parallel lists: bucket start (epoch seconds) and bar dict
+        self._starts: list[int] = []
+        self._bars: list[dict] = []
+
+    def update(self, price: float, qty: float, ts: float) -> dict:
+        """Fold one trade into its bucket. Returns the updated bar."""
+        start = int(ts // self.seconds) * self.seconds
+
+        if self._starts and self._starts[-1] == start:
+            bar = self._bars[-1]
+        elif not self._starts or start > self._starts[-1]:
+            bar = self._new_bar(start, price)
+            self._starts.append(start)
+            self._bars.append(bar)
+            self._trim()
+        else:
+            # Late trade (only during backfill) — locate or insert its bucket
+            i = bisect_left(self._starts, start)
+            if i < len(self._starts) and self._starts[i] == start:
+                bar = self._bars[i]
+            else:
+                bar = self._new_bar(start, price)
+                self._starts.insert(i, start)
+                self._bars.insert(i, bar)
+
+        bar["high"] = max(bar["high"], price)
+        bar["low"] = min(bar["low"], price)
+        bar["close"] = price
+        bar["volume"] += qty
+        bar["trades"] += 1
+        return bar
+
+    def query(self, start: float | None = None, end: float | None = None, limit: int = 500) -> list[dict]:
+        """Bars with bucket start in [start, end), oldest first, at most `limit` (newest kept)."""
+        lo = bisect_left(self._starts, start) if start is not None else 0
+        hi = bisect_left(self._starts, end) if end is not None else len(self._starts)
+        lo = max(lo, hi - limit)
+        return [dict(b) for b in self._bars[lo:hi]]
+
+    @staticmethod
+    def _new_bar(start: int, price: float) -> dict:
+        return {
+            "start": start,
+            "open": price,
+            "high": price,
+            "low": price,
+            "close": price,
+            "volume": 0.0,
+            "trades": 0,
+        }
+
+    def _trim(self):
+        # Drop in bulk once we overshoot by 2x so trimming stays O(1) amortized
+        if len(self._starts) > 2 * self.max_bars:
+            del self._starts[: -self.max_bars]
+            del self._bars[: -self.max_bars]
+
+
+class CandleAggregator:
+    def __init__(self, symbol: str, max_bars: int = 2000):
+        self.symbol = symbol
+        self.series: dict[str, CandleSeries] = {
+            name: CandleSeries(name, max_bars) for name in INTERVALS
+        }
+
+    def on_trade(self, trade: Trade) -> dict[str, dict]:
+        """Apply a trade to every interval. Returns interval → updated bar."""
+        return self.add(trade.price, trade.quantity, trade.timestamp)
+
+    def add(self, price: float, qty: float, timestamp: datetime) -> dict[str, dict]:
+        ts = _epoch(timestamp)
+        return {name: s.update(price, qty, ts) for name, s in self.series.items()}
+
+    def query(self, interval: str, start: datetime | None = None, end: datetime | None = None, limit: int = 500) -> list[dict]:
+        return self.series[interval].query(
+            _epoch(start) if start else None,
+            _epoch(end) if end else None,
+            limit,
+        )
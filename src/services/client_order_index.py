@@ -0,0 +1,71 @@
+"""
+Idempotency index for client order ids. Fully synchronous — no I/O.
+
+Each user's most recent client_order_ids map to a future of the original
+submission's (order, trades) result. A retry, concurrent or later, awaits
+that future instead of placing the order again. Retention is bounded per
+user (LRU); ids that fall out are still caught by the unique
+(user_id, client_order_id) constraint in the DB.
+
+A submission that fails is dropped from the index so it can be retried.
+Anyone already waiting on it gets the same error.
+"""
+
+import asyncio
+from collections import OrderedDict
+
+from src.utils.config import settings
+
+
+def _retrieve(fut: asyncio.Future):
+    # Failures nobody else awaited must not be logged as "never retrieved"
+    if not fut.cancelled():
+        fut.exception()
+
+
+class ClientOrderIndex:
+    def __init__(self, max_per_user: int):
+        self.max_per_user = max_per_user
+        # user_id → client_order_id → future of (Order, list[Trade])
+        self._users: dict[str, OrderedDict[str, asyncio.Future]] = {}
+
+    def get(self, user_id: str, client_order_id: str) -> asyncio.Future | None:
+        ids = self._users.get(user_id)
+        if ids is None:
+            return None
+        fut = ids.get(client_order_id)
+        if fut is not None:
+            ids.move_to_end(client_order_id)
+        return fut
+
+    def claim(self, user_id: str, client_order_id: str) -> asyncio.Future:
+        """Register a first submission; its outcome goes through resolve / fail."""
+        fut = asyncio.get_running_loop().create_future()
+        fut.add_done_callback(_retrieve)
+        ids = self._users.get(user_id)
+        if ids is None:
+            ids = self._users[user_id] = OrderedDict()
+        ids[client_order_id] = fut
+        if len(ids) > self.max_per_user:
+            ids.popitem(last=False)
+        return fut
+
+    def resolve(self, fut: asyncio.Future, result: tuple):
+        if not fut.done():
+            fut.set_result(result)
+
+    def fail(self, user_id: str, client_order_id: str, fut: asyncio.Future, exc: BaseException):
+        ids = self._users.get(user_id)
+        if ids is not None and ids.get(client_order_id) is fut:
+            del ids[client_order_id]
+            if not ids:
+                del self._users[user_id]
+        if fut.done():
+            return
+        if isinstance(exc, asyncio.CancelledError):
+            fut.cancel()
+        else:
+            fut.set_exception(exc)
+
+
+client_orders = ClientOrderIndex(settings.client_order_ids_per_user)
@@ -1,5 +1,6 @@
 import asyncpg
-from datetime import datetime, timezone
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
 from src.utils.config import settings
 
 
@@ -32,26 +33,97 @@ async def get_pool() -> asyncpg.Pool:
 # Orders
 # ---------------------------------------------------------------------------
 
-async def insert_order(order_data: dict) -> dict:
-    async with _pool.acquire() as conn:
-        row = await conn.fetchrow(
-            """
-            INSERT INTO orders (id, user_id, symbol, side, type, price, quantity, remaining_qty, status, created_at)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-            RETURNING *
-            """,
-            order_data["id"],
-            order_data.get("user_id"),
-            order_data["symbol"],
-            order_data["side"],
-            order_data["type"],
-            order_data["price"],
-            order_data["quantity"],
-            order_data["remaining_qty"],
-            order_data["status"],
-            _naive_utc(order_data["timestamp"]),
-        )
-        return dict(row)
+CLIENT_ORDER_ID_CONSTRAINT = "orders_user_client_order_id_key"
+
+
+class DuplicateClientOrderId(Exception):
+    """The user already has an order with this client_order_id."""
+
+
+@contextmanager
+def _client_order_id_conflicts():
+    try:
+        yield
+    except asyncpg.UniqueViolationError as e:
+        if e.constraint_name == CLIENT_ORDER_ID_CONSTRAINT:
+            raise DuplicateClientOrderId(e.detail) from e
+        raise
+
+
+async def insert_order(order_data: dict, balances: list[tuple[str, str, float, float, int]] = ()) -> dict:
+    """
+    Insert the order together with the ledger rows drained after taking its
+    hold (one transaction). Raises DuplicateClientOrderId if the user
+    already used its client_order_id.
+    """
+    with _client_order_id_conflicts():
+        async with _pool.acquire() as conn, conn.transaction():
+            row = await conn.fetchrow(
+                """
+                INSERT INTO orders (id, user_id, symbol, side, type, price, quantity, remaining_qty, status, created_at,
+                                    stop_price, display_qty, time_in_force, expire_at, client_order_id)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15)
+                RETURNING *
+                """,
+                order_data["id"],
+                order_data.get("user_id"),
+                order_data["symbol"],
+                order_data["side"],
+                order_data["type"],
+                order_data["price"],
+                order_data["quantity"],
+                order_data["remaining_qty"],
+                order_data["status"],
+                _naive_utc(order_data["timestamp"]),
+                order_data.get("stop_price"),
+                order_data.get("display_qty"),
+                order_data.get("time_in_force", "gtc"),
+                _naive_utc(order_data.get("expire_at")),
+                order_data.get("client_order_id"),
+            )
+            if balances:
+                await _upsert_balances(conn, balances)
+            return dict(row)
+
+
+async def insert_orders(orders: list[dict], balances: list[tuple[str, str, float, float, int]] = ()) -> None:
+    """
+    Bulk insert in a single statement (one round trip), in one transaction
+    with the ledger rows drained after taking the holds. All or nothing:
+    raises DuplicateClientOrderId if any client_order_id is already taken.
+    """
+    if not orders and not balances:
+        return
+    with _client_order_id_conflicts():
+        async with _pool.acquire() as conn, conn.transaction():
+            await conn.execute(
+                """
+                INSERT INTO orders (id, user_id, symbol, side, type, price, quantity, remaining_qty, status, created_at,
+                                    stop_price, display_qty, time_in_force, expire_at, client_order_id)
+                SELECT * FROM unnest(
+                    $1::uuid[], $2::uuid[], $3::text[], $4::text[], $5::text[],
+                    $6::numeric[], $7::numeric[], $8::numeric[], $9::text[], $10::timestamp[], $11::numeric[], $12::numeric[], $13::text[], $14::timestamp[],
+                    $15::text[]
+                )
+                """,
+                [o["id"] for o in orders],
+                [o.get("user_id") for o in orders],
+                [o["symbol"] for o in orders],
+                [o["side"] for o in orders],
+                [o["type"] for o in orders],
+                [o["price"] for o in orders],
+                [o["quantity"] for o in orders],
+                [o["remaining_qty"] for o in orders],
+                [o["status"] for o in orders],
+                [_naive_utc(o["timestamp"]) for o in orders],
+                [o.get("stop_price") for o in orders],
+                [o.get("display_qty") for o in orders],
+                [o.get("time_in_force", "gtc") for o in orders],
+                [_naive_utc(o.get("expire_at")) for o in orders],
+                [o.get("client_order_id") for o in orders],
+            )
+            if balances:
+                await _upsert_balances(conn, balances)
 
 
 async def get_order_by_id(order_id: str) -> dict | None:
@@ -60,6 +132,16 @@ async def get_order_by_id(order_id: str) -> dict | None:
         return dict(row) if row else None
 
 
+async def get_orders_by_client_ids(user_id: str, client_order_ids: list[str]) -> list[dict]:
+    async with _pool.acquire() as conn:
+        rows = await conn.fetch(
+            "SELECT * FROM orders WHERE user_id = $1 AND client_order_id = ANY($2::text[])",
+            user_id,
+            client_order_ids,
+        )
+        return [dict(r) for r in rows]
+
+
 async def update_order(order_id: str, status: str, remaining_qty: float) -> None:
     async with _pool.acquire() as conn:
         await conn.execute(
@@ -79,6 +161,112 @@ async def get_open_orders_for_symbol(symbol: str) -> list[dict]:
         return [dict(r) for r in rows]
 
 
+async def get_open_order_symbols() -> list[str]:
+    async with _pool.acquire() as conn:
+        rows = await conn.fetch("SELECT DISTINCT symbol FROM orders WHERE status IN ('open', 'partial')")
+        return [r["symbol"] for r in rows]
+
+
+async def persist_batch(
+    new_orders: list[dict] = (),
+    trades: list[dict] = (),
+    resized: list[tuple[str, float, float]] = (),
+    updates: list[tuple[str, str, float]] = (),
+    triggered: list[str] = (),
+    balances: list[tuple[str, str, float, float, int]] = (),
+) -> None:
+    """
+    One transaction for everything a matching step produced:
+      new_orders — rows to insert (orders created inside the worker)
+      trades     — rows to insert
+      resized    — (order_id, new remaining, price) for amends / quote
+                   updates; quantity moves by the same delta as remaining
+      updates    — (order_id, status, remaining_qty)
+      triggered  — ids of stop orders that fired (stamps triggered_at)
+      balances   — (user_id, asset, available, held, version) ledger rows
+    """
+    async with _pool.acquire() as conn:
+        async with conn.transaction():
+            if new_orders:
+                await conn.executemany(
+                    """
+                    INSERT INTO orders (id, user_id, symbol, side, type, price, quantity, remaining_qty, status, created_at,
+                                        stop_price, display_qty, time_in_force, expire_at, client_order_id)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15)
+                    """,
+                    [
+                        (o["id"], o.get("user_id"), o["symbol"], o["side"], o["type"], o["price"],
+                         o["quantity"], o["remaining_qty"], o["status"], _naive_utc(o["timestamp"]),
+                         o.get("stop_price"), o.get("display_qty"),
+                         o.get("time_in_force", "gtc"), _naive_utc(o.get("expire_at")),
+                         o.get("client_order_id"))
+                        for o in new_orders
+                    ],
+                )
+            if trades:
+                await conn.executemany(
+                    """
+                    INSERT INTO trades (id, symbol, price, quantity, buyer_id, seller_id, timestamp)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                    """,
+                    [
+                        (t["id"], t["symbol"], t["price"], t["quantity"], t.get("buyer_id"),
+                         t.get("seller_id"), _naive_utc(t["timestamp"]))
+                        for t in trades
+                    ],
+                )
+            if resized:
+                await conn.executemany(
+                    """
+                    UPDATE orders SET quantity = quantity - remaining_qty + $2, remaining_qty = $2, price = $3
+                    WHERE id = $1
+                    """,
+                    resized,
+                )
+            if updates:
+                await conn.executemany(
+                    "UPDATE orders SET status = $2, remaining_qty = $3 WHERE id = $1",
+                    updates,
+                )
+            if triggered:
+                await conn.execute(
+                    "UPDATE orders SET triggered_at = NOW() WHERE id = ANY($1::uuid[])",
+                    list(triggered),
+                )
+            if balances:
+                await _upsert_balances(conn, balances)
+
+
+# ---------------------------------------------------------------------------
+# Balances
+# ---------------------------------------------------------------------------
+
+async def _upsert_balances(conn, rows: list[tuple[str, str, float, float, int]]) -> None:
+    await conn.executemany(
+        """
+        INSERT INTO balances (user_id, asset, available, held, version)
+        VALUES ($1, $2, $3, $4, $5)
+        ON CONFLICT (user_id, asset) DO UPDATE
+        SET available = EXCLUDED.available, held = EXCLUDED.held, version = EXCLUDED.version
+        WHERE balances.version < EXCLUDED.version
+        """,
+        rows,
+    )
+
+
+async def upsert_balances(rows: list[tuple[str, str, float, float, int]]) -> None:
+    if not rows:
+        return
+    async with _pool.acquire() as conn:
+        await _upsert_balances(conn, rows)
+
+
+async def get_balances() -> list[dict]:
+    async with _pool.acquire() as conn:
+        rows = await conn.fetch("SELECT user_id, asset, available, held, version FROM balances")
+        return [dict(r) for r in rows]
+
+
 # ---------------------------------------------------------------------------
 # Trades
 # ---------------------------------------------------------------------------
@@ -102,16 +290,102 @@ async def insert_trade(trade_data: dict) -> dict:
         return dict(row)
 
 
-async def get_trades_for_symbol(symbol: str, limit: int = 50) -> list[dict]:
+async def get_trades_for_symbol(
+    symbol: str,
+    limit: int = 50,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    before: tuple[datetime, str] | None = None,
+) -> list[dict]:
+    """
+    Newest-first page of trades.
+    `before` is a keyset cursor (timestamp, id) — the last row of the previous page.
+    """
+    clauses = ["symbol = $1"]
+    args: list = [symbol]
+    if start is not None:
+        args.append(_naive_utc(start))
+        clauses.append(f"timestamp >= ${len(args)}")
+    if end is not None:
+        args.append(_naive_utc(end))
+        clauses.append(f"timestamp < ${len(args)}")
+    if before is not None:
+        args.append(_naive_utc(before[0]))
+        args.append(before[1])
+        clauses.append(f"(timestamp, id) < (${len(args) - 1}, ${len(args)}::uuid)")
+    args.append(limit)
+
     async with _pool.acquire() as conn:
         rows = await conn.fetch(
-            "SELECT * FROM trades WHERE symbol = $1 ORDER BY timestamp DESC LIMIT $2",
-            symbol,
-            limit,
+            f"SELECT * FROM trades WHERE {' AND '.join(clauses)} "
+            f"ORDER BY timestamp DESC, id DESC LIMIT ${len(args)}",
+            *args,
         )
         return [dict(r) for r in rows]
 
 
+async def stream_trades(
+    symbol: str,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    prefetch: int = 1000,
+):
+    """
+    Oldest-first async iterator over trades using a server-side cursor.
+    Only `prefetch` rows are held in memory at a time.
+    """
+    async with _pool.acquire() as conn:
+        async with conn.transaction():
+            cursor = conn.cursor(
+                """
+                SELECT * FROM trades
+                WHERE symbol = $1
+                  AND ($2::timestamp IS NULL OR timestamp >= $2)
+                  AND ($3::timestamp IS NULL OR timestamp < $3)
+                ORDER BY timestamp ASC, id ASC
+                """,
+                symbol,
+                _naive_utc(start),
+                _naive_utc(end),
+                prefetch=prefetch,
+            )
+            async for row in cursor:
+                yield dict(row)
+
+
+async def get_trade_symbols(since: datetime) -> list[str]:
+    async with _pool.acquire() as conn:
+        rows = await conn.fetch(
+            "SELECT DISTINCT symbol FROM trades WHERE timestamp >= $1",
+            _naive_utc(since),
+        )
+        return [r["symbol"] for r in rows]
+
+
+async def get_archivable_trade_days(cutoff: datetime) -> list[tuple[str, date]]:
+    """Distinct (symbol, day) pairs with trades strictly before `cutoff`."""
+    async with _pool.acquire() as conn:
+        rows = await conn.fetch(
+            """
+            SELECT DISTINCT symbol, timestamp::date AS day
+            FROM trades WHERE timestamp < $1
+            ORDER BY day, symbol
+            """,
+            _naive_utc(cutoff),
+        )
+        return [(r["symbol"], r["day"]) for r in rows]
+
+
+async def delete_trades(symbol: str, start: datetime, end: datetime) -> None:
+    async with _pool.acquire() as conn:
+        await conn.execute(
+            "DELETE FROM trades WHERE symbol = $1 AND timestamp >= $2 AND timestamp < $3",
+            symbol,
+            _naive_utc(start),
+            _naive_utc(end),
+        )
+
+
 # ---------------------------------------------------------------------------
 # Users
 # ---------------------------------------------------------------------------
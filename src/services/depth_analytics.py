@@ -0,0 +1,61 @@
+"""
+Vectorized depth analytics over an array snapshot of the book.
+
+All functions are pure NumPy over (prices, quantities) arrays taken from
+OrderBook.get_depth_arrays(); the book itself is never touched here.
+"""
+
+import numpy as np
+
+
+def cumulative_depth(prices: np.ndarray, qtys: np.ndarray) -> list[list[float]]:
+    """[[price, cumulative qty], ...] from best level outwards."""
+    return np.column_stack((prices, np.cumsum(qtys))).tolist()
+
+
+def impact_cost(prices: np.ndarray, qtys: np.ndarray, sizes: np.ndarray, side: str) -> list[dict]:
+    """
+    Cost of a market order of each size walking one side of the book.
+
+    `prices`/`qtys` are the contra side ordered best-first (asks for a buy,
+    bids for a sell). All sizes are evaluated in a single pass using
+    cumulative sums and searchsorted.
+    """
+    sizes = np.asarray(sizes, dtype=np.float64)
+    if prices.size == 0:
+        return [
+            {"size": float(s), "filled": 0.0, "avg_price": None, "cost": 0.0,
+             "worst_price": None, "levels": 0, "slippage_bps": None}
+            for s in sizes
+        ]
+
+    cum_qty = np.cumsum(qtys)
+    cum_notional = np.cumsum(prices * qtys)
+    total = cum_qty[-1]
+
+    filled = np.minimum(sizes, total)
+    # Level at which each size is completed (n when the book runs out)
+    idx = np.searchsorted(cum_qty, filled, side="left")
+    idx = np.minimum(idx, prices.size - 1)
+    prev_qty = np.where(idx > 0, cum_qty[idx - 1], 0.0)
+    prev_notional = np.where(idx > 0, cum_notional[idx - 1], 0.0)
+    cost = prev_notional + (filled - prev_qty) * prices[idx]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = np.where(filled > 0, cost / filled, np.nan)
+    best = prices[0]
+    direction = 1.0 if side == "buy" else -1.0
+    slippage = direction * (avg - best) / best * 1e4 + 0.0  # normalise -0.0
+
+    return [
+        {
+            "size": float(sizes[i]),
+            "filled": float(filled[i]),
+            "avg_price": None if np.isnan(avg[i]) else float(avg[i]),
+            "cost": float(cost[i]),
+            "worst_price": float(prices[idx[i]]) if filled[i] > 0 else None,
+            "levels": int(idx[i]) + 1 if filled[i] > 0 else 0,
+            "slippage_bps": None if np.isnan(slippage[i]) else float(slippage[i]),
+        }
+        for i in range(sizes.size)
+    ]
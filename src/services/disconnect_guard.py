@@ -0,0 +1,52 @@
+"""
+Cancel-on-disconnect for trading sessions.
+
+Sessions opt in when connecting. When a user's last opted-in session
+drops, a sweep is scheduled after `cod_grace_seconds`; reconnecting inside
+the grace period cancels the sweep. The sweep itself is a per-user mass
+cancel in each symbol worker that holds the user's orders, so no book is
+scanned.
+"""
+
+import asyncio
+
+from src.services import order_service
+from src.utils.config import settings
+from src.utils.logger import logger
+
+# user_id → number of live opted-in sessions
+_live: dict[str, int] = {}
+# user_id → scheduled sweep
+_pending: dict[str, asyncio.Task] = {}
+
+
+def session_opened(user_id: str):
+    _live[user_id] = _live.get(user_id, 0) + 1
+    sweep = _pending.pop(user_id, None)
+    if sweep is not None:
+        sweep.cancel()
+        logger.info(f"[COD] user={user_id} reconnected, sweep cancelled")
+
+
+def session_closed(user_id: str):
+    remaining = _live.get(user_id, 0) - 1
+    if remaining > 0:
+        _live[user_id] = remaining
+        return
+    _live.pop(user_id, None)
+    if user_id not in _pending:
+        _pending[user_id] = asyncio.create_task(_sweep(user_id), name=f"cod-{user_id}")
+
+
+async def _sweep(user_id: str):
+    try:
+        await asyncio.sleep(settings.cod_grace_seconds)
+        result = await order_service.cancel_all(user_id)
+        logger.info(f"[COD] user={user_id} disconnected: cancelled {result['cancelled']} orders")
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"[COD] sweep failed for user={user_id}: {e}", exc_info=True)
+    finally:
+        if _pending.get(user_id) is asyncio.current_task():
+            del _pending[user_id]
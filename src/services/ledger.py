@@ -0,0 +1,251 @@
+"""
+In-memory account ledger. Fully synchronous — no I/O.
+
+Per user and asset it keeps `available` and `held` balances. A resting
+order holds what it could still spend (quote for buys, base for sells),
+so a pre-trade check is a couple of dict lookups. Everything runs on the
+event loop thread without awaiting, so each call is atomic with respect
+to the symbol workers that settle fills.
+
+Order flow only goes through the ledger when settings.risk_checks is on;
+otherwise orders take no holds and fills move no balances.
+
+Durability goes through the worker's write path: touched accounts are
+marked dirty and drained into the next persist_batch as absolute rows
+carrying a per-account version, so a stale write can never overwrite a
+newer one. A new order's hold is drained into the transaction that
+inserts the order instead.
+"""
+
+from src.models.book_entry import OrderBookEntry
+from src.models.order import Order, OrderType, Side
+from src.models.trade import Trade
+from src.utils.config import settings
+
+
+class LedgerError(Exception):
+    pass
+
+
+class InsufficientBalance(LedgerError):
+    pass
+
+
+def split_symbol(symbol: str) -> tuple[str, str]:
+    """'BTCUSDT' → ('BTC', 'USDT') using the configured quote assets."""
+    for quote in settings.quote_assets:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[: -len(quote)], quote
+    raise LedgerError(f"Unknown quote asset in symbol {symbol}")
+
+
+class Balance:
+    __slots__ = ("available", "held", "version")
+
+    def __init__(self, available: float = 0.0, held: float = 0.0, version: int = 0):
+        self.available = available
+        self.held = held
+        self.version = version
+
+
+class Ledger:
+    def __init__(self):
+        # user_id → asset → Balance
+        self._accounts: dict[str, dict[str, Balance]] = {}
+        # order_id → (user_id, asset, amount held for it)
+        self._holds: dict[str, tuple[str, str, float]] = {}
+        self._dirty: set[tuple[str, str]] = set()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def balance(self, user_id: str, asset: str) -> Balance:
+        account = self._accounts.get(user_id)
+        if account is None:
+            account = self._accounts[user_id] = {}
+        bal = account.get(asset)
+        if bal is None:
+            bal = account[asset] = Balance()
+        return bal
+
+    def available(self, user_id: str, asset: str) -> float:
+        bal = self._accounts.get(user_id, {}).get(asset)
+        return bal.available if bal else 0.0
+
+    def snapshot(self, user_id: str) -> dict[str, dict]:
+        return {
+            asset: {"available": bal.available, "held": bal.held}
+            for asset, bal in self._accounts.get(user_id, {}).items()
+        }
+
+    def held_for(self, order_id: str) -> float:
+        hold = self._holds.get(order_id)
+        return hold[2] if hold else 0.0
+
+    # ------------------------------------------------------------------
+    # Holds
+    # ------------------------------------------------------------------
+
+    def hold_order(self, order: Order, reference_price: float | None = None):
+        """
+        Pre-trade check and hold for a new order. Buys hold price × qty of
+        the quote asset; market and stop buys, which have no limit price,
+        hold at `reference_price` (stop price for stops) plus
+        settings.market_hold_collar. Raises LedgerError. Anonymous orders
+        are not checked.
+        """
+        if order.user_id is None or not settings.risk_checks:
+            return
+        asset, amount = self._hold_amount(order, order.quantity, reference_price)
+        self.hold(order.id, order.user_id, asset, amount)
+
+    def adopt_order(self, order: Order):
+        """Index the hold of a restored order; its amount is already in `held`."""
+        if order.user_id is None or not settings.risk_checks:
+            return
+        asset, amount = self._hold_amount(order, order.remaining_qty, None)
+        self._holds[order.id] = (order.user_id, asset, amount)
+
+    @staticmethod
+    def _hold_amount(order: Order, qty: float, reference_price: float | None) -> tuple[str, float]:
+        base, quote = split_symbol(order.symbol)
+        if order.side == Side.SELL:
+            return base, qty
+        if order.type in (OrderType.MARKET, OrderType.STOP):
+            reference_price = order.stop_price or reference_price
+            if reference_price is None:
+                raise LedgerError("No reference price to size the market order hold")
+            return quote, reference_price * (1 + settings.market_hold_collar) * qty
+        return quote, order.price * qty
+
+    def hold(self, order_id: str, user_id: str, asset: str, amount: float):
+        bal = self.balance(user_id, asset)
+        if bal.available < amount:
+            raise InsufficientBalance(
+                f"Insufficient {asset}: available {bal.available}, required {amount}"
+            )
+        self._move(user_id, asset, bal, -amount, amount)
+        self._holds[order_id] = (user_id, asset, amount)
+
+    def check_increase(self, user_id: str, asset: str, amount: float):
+        """Raise unless `amount` more can be held (amends / requotes)."""
+        if amount > 0 and self.available(user_id, asset) < amount:
+            raise InsufficientBalance(f"Insufficient {asset} for the increase")
+
+    def set_hold(self, order_id: str, amount: float):
+        """Adjust an order's hold to `amount`; 0 releases it."""
+        hold = self._holds.get(order_id)
+        if hold is None:
+            return
+        user_id, asset, current = hold
+        bal = self.balance(user_id, asset)
+        delta = amount - current
+        self._move(user_id, asset, bal, -delta, delta)
+        if amount > 0:
+            self._holds[order_id] = (user_id, asset, amount)
+        else:
+            del self._holds[order_id]
+
+    def release(self, order_id: str):
+        self.set_hold(order_id, 0.0)
+
+    def sync_entry(self, order_id: str, entry: OrderBookEntry | None, symbol: str):
+        """
+        Make an order's hold match what its resting entry can still spend:
+        price × remaining for bids, remaining for asks, nothing once gone.
+        Orders that rest without a prior hold (mass quotes) are held now.
+        """
+        if not settings.risk_checks:
+            return
+        if entry is None:
+            self.release(order_id)
+            return
+        amount = entry.price * entry.remaining if entry.side == Side.BUY else entry.remaining
+        if order_id in self._holds:
+            self.set_hold(order_id, amount)
+        elif entry.user_id is not None:
+            base, quote = split_symbol(symbol)
+            asset = quote if entry.side == Side.BUY else base
+            bal = self.balance(entry.user_id, asset)
+            self._move(entry.user_id, asset, bal, -amount, amount)
+            self._holds[order_id] = (entry.user_id, asset, amount)
+
+    def required_increase(self, entry: OrderBookEntry, price: float, qty: float, symbol: str) -> tuple[str, float]:
+        """(asset, extra amount) an amend of `entry` to price / qty would need to hold."""
+        base, quote = split_symbol(symbol)
+        if entry.side == Side.BUY:
+            return quote, price * qty - self.held_for(entry.order_id)
+        return base, qty - self.held_for(entry.order_id)
+
+    # ------------------------------------------------------------------
+    # Fills and transfers
+    # ------------------------------------------------------------------
+
+    def apply_trade(self, trade: Trade, base: str, quote: str):
+        """Move assets for one fill; spent amounts come out of the order's hold first."""
+        notional = trade.price * trade.quantity
+        if trade.aggressor_side == Side.BUY.value:
+            buy_order, sell_order = trade.taker_order_id, trade.maker_order_id
+        else:
+            buy_order, sell_order = trade.maker_order_id, trade.taker_order_id
+
+        if trade.buyer_id is not None:
+            self._spend(trade.buyer_id, quote, buy_order, notional)
+            self._credit(trade.buyer_id, base, trade.quantity)
+        if trade.seller_id is not None:
+            self._spend(trade.seller_id, base, sell_order, trade.quantity)
+            self._credit(trade.seller_id, quote, notional)
+
+    def deposit(self, user_id: str, asset: str, amount: float) -> Balance:
+        self._credit(user_id, asset, amount)
+        return self.balance(user_id, asset)
+
+    def _spend(self, user_id: str, asset: str, order_id: str, amount: float):
+        bal = self.balance(user_id, asset)
+        hold = self._holds.get(order_id)
+        from_hold = min(amount, hold[2]) if hold else 0.0
+        if hold:
+            self._holds[order_id] = (user_id, asset, hold[2] - from_hold)
+        # Anything beyond the hold (e.g. a market buy past its collar) is taken from available
+        self._move(user_id, asset, bal, -(amount - from_hold), -from_hold)
+
+    def _credit(self, user_id: str, asset: str, amount: float):
+        bal = self.balance(user_id, asset)
+        self._move(user_id, asset, bal, amount, 0.0)
+
+    def _move(self, user_id: str, asset: str, bal: Balance, d_available: float, d_held: float):
+        bal.available += d_available
+        bal.held += d_held
+        bal.version += 1
+        self._dirty.add((user_id, asset))
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def drain_dirty(self) -> list[tuple[str, str, float, float, int]]:
+        """(user_id, asset, available, held, version) rows touched since the last drain."""
+        rows = []
+        for user_id, asset in self._dirty:
+            bal = self._accounts[user_id][asset]
+            rows.append((user_id, asset, bal.available, bal.held, bal.version))
+        self._dirty.clear()
+        return rows
+
+    def mark_dirty(self, rows: list[tuple[str, str, float, float, int]]):
+        """Queue drained rows again after their write failed."""
+        self._dirty.update((user_id, asset) for user_id, asset, *_ in rows)
+
+    def load(self, rows: list[dict]):
+        """Rebuild from the balances table on startup."""
+        self._accounts.clear()
+        self._holds.clear()
+        self._dirty.clear()
+        for row in rows:
+            self._accounts.setdefault(str(row["user_id"]), {})[row["asset"]] = Balance(
+                float(row["available"]), float(row["held"]), int(row["version"])
+            )
+
+
+ledger = Ledger()
@@ -11,14 +11,24 @@ Flow:
 """
 
 import asyncio
+import time
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING
 
-from src.models.order import Order
+from datetime import datetime, timedelta, timezone
+
+from src.models.order import Order, OrderStatus, OrderType, SelfTradePrevention, Side
 from src.models.trade import Trade
+from src.services.candles import CandleAggregator
+from src.services.ledger import ledger, split_symbol
+from src.services.order_registry import registry
+from src.services.positions import positions
+from src.services.ticker import RollingTicker
+from src.utils.config import settings
 from src.utils.logger import logger
 
 if TYPE_CHECKING:
+    from src.models.book_entry import OrderBookEntry
     from src.services.order_book import OrderBook
 
 
@@ -28,31 +38,125 @@ class OrderTask:
     future: asyncio.Future
 
 
+@dataclass
+class CancelTask:
+    """Cancel specific order ids, or every order of `user_id` when order_ids is None."""
+    order_ids: list[str] | None
+    user_id: str | None
+    future: asyncio.Future
+
+
+@dataclass
+class AmendTask:
+    order_id: str
+    price: float | None
+    quantity: float | None
+    future: asyncio.Future
+
+
+@dataclass
+class MassQuoteTask:
+    user_id: str
+    bids: list[tuple[float, float]]
+    asks: list[tuple[float, float]]
+    future: asyncio.Future
+
+
 # Per-symbol state
 _queues: dict[str, asyncio.Queue] = {}
 _books: dict[str, "OrderBook"] = {}
 _workers: dict[str, asyncio.Task] = {}
+_candles: dict[str, CandleAggregator] = {}
+_tickers: dict[str, RollingTicker] = {}
+# Set (and replaced) whenever a book's version moves — wakes long-pollers
+_change_events: dict[str, asyncio.Event] = {}
+# Cross-symbol BBO table, refreshed by each symbol's worker after a mutation
+_bbo_table: dict[str, dict] = {}
 
 # Callbacks set by main.py so the engine can broadcast without importing FastAPI
 _broadcast_trade_cb = None
 _broadcast_depth_cb = None
+_broadcast_candles_cb = None
+_broadcast_depth_delta_cb = None
+# Private per-user pushes: sync (user_id, message) → queued on that user's sessions
+_user_event_cb = None
+# Order event status for an in-place size / price change of a resting order
+AMENDED = "amended"
 
 
-def register_broadcast_callbacks(trade_cb, depth_cb):
-    global _broadcast_trade_cb, _broadcast_depth_cb
+def register_broadcast_callbacks(trade_cb, depth_cb, candles_cb=None, depth_delta_cb=None):
+    global _broadcast_trade_cb, _broadcast_depth_cb, _broadcast_candles_cb, _broadcast_depth_delta_cb
     _broadcast_trade_cb = trade_cb
     _broadcast_depth_cb = depth_cb
+    _broadcast_candles_cb = candles_cb
+    _broadcast_depth_delta_cb = depth_delta_cb
+
+
+def register_user_callback(user_cb):
+    global _user_event_cb
+    _user_event_cb = user_cb
 
 
 def get_book(symbol: str) -> "OrderBook | None":
     return _books.get(symbol)
 
 
+def get_candles(symbol: str) -> CandleAggregator | None:
+    return _candles.get(symbol)
+
+
+def get_ticker(symbol: str) -> RollingTicker | None:
+    return _tickers.get(symbol)
+
+
+def all_tickers() -> dict[str, RollingTicker]:
+    return _tickers
+
+
+def get_bbo_table() -> dict[str, dict]:
+    return _bbo_table
+
+
+def position_snapshot(user_id: str) -> list[dict]:
+    """The user's positions, unrealized P&L marked at each symbol's live BBO."""
+    result = []
+    for symbol, position in positions.for_user(user_id).items():
+        book = _books.get(symbol)
+        result.append(position.to_dict(symbol, book.get_bbo() if book else None, book.last_price if book else None))
+    return result
+
+
+def notify_book_changed(book: "OrderBook"):
+    _bbo_table[book.symbol] = {"symbol": book.symbol, **book.get_bbo(), "version": book.version}
+    event = _change_events.get(book.symbol)
+    if event is not None:
+        event.set()
+        del _change_events[book.symbol]
+
+
+async def wait_for_version(book: "OrderBook", version: int, timeout: float) -> bool:
+    """Long-poll: wait until book.version > version. Returns False on timeout."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while book.version <= version:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return False
+        event = _change_events.setdefault(book.symbol, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), remaining)
+        except asyncio.TimeoutError:
+            return False
+    return True
+
+
 def _get_or_create(symbol: str) -> tuple[asyncio.Queue, "OrderBook"]:
     if symbol not in _queues:
         from src.services.order_book import OrderBook
         _queues[symbol] = asyncio.Queue()
-        _books[symbol] = OrderBook(symbol)
+        _books[symbol] = OrderBook(symbol, SelfTradePrevention(settings.stp_mode))
+        _candles[symbol] = CandleAggregator(symbol, settings.candle_max_bars)
+        _tickers[symbol] = RollingTicker(symbol)
         _workers[symbol] = asyncio.create_task(
             _worker(symbol), name=f"worker-{symbol}"
         )
@@ -61,15 +165,46 @@ def _get_or_create(symbol: str) -> tuple[asyncio.Queue, "OrderBook"]:
 
 
 async def _worker(symbol: str):
-    """Single worker per symbol — serializes all matching for that symbol."""
+    """
+    Single worker per symbol — serializes all matching for that symbol.
+    Also owns the book's expiry heap: it sleeps on the queue only until the
+    next expiry is due, and interleaves queued work between expiry batches.
+    """
     queue = _queues[symbol]
     book = _books[symbol]
 
     while True:
-        task: OrderTask = await queue.get()
+        next_expiry = book.next_expiry()
+        delay = None if next_expiry is None else next_expiry - time.time()
+        if delay is not None and delay <= 0:
+            try:
+                await _process_expiry(book)
+            except Exception as e:
+                logger.error(f"[Worker:{symbol}] expiry error: {e}", exc_info=True)
+            if queue.empty():
+                continue
+            delay = None
+        if delay is None:
+            task = await queue.get()
+        else:
+            try:
+                task = await asyncio.wait_for(queue.get(), delay)
+            except asyncio.TimeoutError:
+                continue
+        if task is None:
+            # Wake-up only (restore_symbol scheduled expiries): re-read the heap
+            queue.task_done()
+            continue
         try:
-            trades = await _process(book, task.order)
-            task.future.set_result(trades)
+            if isinstance(task, CancelTask):
+                result = await _process_cancel(book, task)
+            elif isinstance(task, AmendTask):
+                result = await _process_amend(book, task)
+            elif isinstance(task, MassQuoteTask):
+                result = await _process_mass_quote(book, task)
+            else:
+                result = await _process(book, task.order)
+            task.future.set_result(result)
         except Exception as e:
             logger.error(f"[Worker:{symbol}] error: {e}", exc_info=True)
             if not task.future.done():
@@ -78,69 +213,379 @@ async def _worker(symbol: str):
             queue.task_done()
 
 
-async def _process(book: "OrderBook", order: Order) -> list[Trade]:
-    from src.services import db
+def _trade_row(trade: Trade) -> dict:
+    return {
+        "id": trade.id,
+        "symbol": trade.symbol,
+        "price": trade.price,
+        "quantity": trade.quantity,
+        "buyer_id": trade.buyer_id,
+        "seller_id": trade.seller_id,
+        "timestamp": trade.timestamp,
+    }
 
-    trades = book.match(order)
 
-    # Track how much was filled per maker order
-    maker_filled: dict[str, float] = {}
+def _final_status(book: "OrderBook", order: Order) -> OrderStatus:
+    if order.status == OrderStatus.CANCELLED:
+        return order.status
+    if order.remaining_qty <= 0:
+        return OrderStatus.FILLED
+    if order.remaining_qty < order.quantity:
+        return OrderStatus.PARTIAL
+    if not book.has_order(order.id):
+        # Unfilled remainder that never rested (market / IOC with no liquidity)
+        return OrderStatus.CANCELLED
+    return OrderStatus.OPEN
+
+
+async def _settle(
+    book: "OrderBook",
+    takers: list[Order],
+    trades: list[Trade],
+    new_orders: list[Order] = (),
+    resized: list[tuple[str, float, float]] = (),
+    extra_updates: list[tuple[str, str, float]] = (),
+):
+    """Fold trades into market data, persist everything in one batch, then broadcast."""
+    from src.services.order_service import order_row
+
+    # Fold trades into candles, ticker and positions before persisting (pure in-memory)
+    position_users: set[str] = set()
+    if trades:
+        candles = _candles[book.symbol]
+        ticker = _tickers[book.symbol]
+        updated: dict[str, dict] = {}
+        for trade in trades:
+            updated = candles.on_trade(trade)
+            ticker.on_trade(trade)
+            position_users.update(positions.on_trade(trade))
+        if _broadcast_candles_cb:
+            asyncio.create_task(_broadcast_candles_cb(book, updated))
+
+    updates: list[tuple[str, str, float]] = list(extra_updates)
+
+    # Stops fired by this step's trades are takers too (a stop that fired on
+    # arrival already is one)
+    triggered = book.drain_triggered()
+    submitted = {o.id for o in takers}
+    takers = [*takers, *(o for o in triggered if o.id not in submitted)]
+
+    # Maker state comes straight from the book: still resting → partial, gone → filled
+    taker_ids = {o.id for o in takers}
+    events: list[tuple] = []
+    makers = {
+        t.maker_order_id: (t.seller_id, Side.SELL, t.price) if t.aggressor_side == Side.BUY.value
+        else (t.buyer_id, Side.BUY, t.price)
+        for t in trades
+    }
+    for maker_id, (user_id, side, price) in makers.items():
+        if maker_id in taker_ids:
+            continue
+        entry = book.get_entry(maker_id)
+        if entry is None:
+            updates.append((maker_id, OrderStatus.FILLED.value, 0.0))
+        else:
+            updates.append((maker_id, OrderStatus.PARTIAL.value, entry.remaining))
+        events.append((user_id, maker_id, side, price, *updates[-1][1:]))
+
+    # Resting orders pulled (or shrunk, for decrement) by self-trade prevention
+    resized = list(resized)
+    traded_makers = {t.maker_order_id for t in trades}
+    prevented = {e.order_id: e for e in book.drain_self_trade_prevented()}
+    for order_id, entry in prevented.items():
+        if book.get_entry(order_id) is not entry:
+            updates.append((order_id, OrderStatus.CANCELLED.value, entry.remaining))
+            events.append((entry.user_id, order_id, entry.side, entry.price, OrderStatus.CANCELLED.value, entry.remaining))
+        elif order_id not in traded_makers:
+            resized.append((order_id, entry.remaining, entry.price))
+            events.append((entry.user_id, order_id, entry.side, entry.price, AMENDED, entry.remaining))
+
+    # A taker that rested may since have been hit by a fired stop
+    maker_fills: dict[str, float] = {}
     for trade in trades:
-        maker_filled[trade.maker_order_id] = maker_filled.get(trade.maker_order_id, 0) + trade.quantity
+        if trade.maker_order_id in taker_ids:
+            maker_fills[trade.maker_order_id] = maker_fills.get(trade.maker_order_id, 0.0) + trade.quantity
+
+    for order in takers:
+        order.remaining_qty -= maker_fills.get(order.id, 0.0)
+        order.status = _final_status(book, order)
+        updates.append((order.id, order.status.value, order.remaining_qty))
+        events.append((order.user_id, order.id, order.side, order.price, order.status.value, order.remaining_qty))
+
+    _apply_to_ledger(book, trades, [u[0] for u in updates] + [r[0] for r in resized])
+
+    await _persist(
+        new_orders=[order_row(o) for o in new_orders],
+        trades=[_trade_row(t) for t in trades],
+        resized=resized,
+        updates=updates,
+        triggered=[o.id for o in triggered],
+        balances=ledger.drain_dirty(),
+    )
+
+    if _broadcast_trade_cb:
+        for trade in trades:
+            asyncio.create_task(_broadcast_trade_cb(trade))
 
-    # Persist trades
-    for trade in trades:
-        await db.insert_trade({
-            "id": trade.id,
-            "symbol": trade.symbol,
-            "price": trade.price,
-            "quantity": trade.quantity,
-            "buyer_id": trade.buyer_id,
-            "seller_id": trade.seller_id,
-            "timestamp": trade.timestamp,
+    notify_book_changed(book)
+    if _broadcast_depth_cb:
+        asyncio.create_task(_broadcast_depth_cb(book))
+
+    # Private pushes from in-memory state: fills, then the order states they
+    # produced, then positions
+    _emit_fills(trades)
+    for event in events:
+        _emit_order(event[0], book.symbol, *event[1:])
+    if _user_event_cb and position_users:
+        bbo = book.get_bbo()
+        for user_id in position_users:
+            position = positions.get(user_id, book.symbol)
+            _user_event_cb(user_id, {"type": "position", "data": position.to_dict(book.symbol, bbo, book.last_price)})
+
+
+def _emit_order(user_id: str | None, symbol: str, order_id: str, side: Side, price: float, status: str, remaining: float):
+    if _user_event_cb and user_id is not None:
+        _user_event_cb(user_id, {
+            "type": "order",
+            "data": {
+                "order_id": order_id,
+                "symbol": symbol,
+                "side": side.value,
+                "price": price,
+                "status": status,
+                "remaining_qty": remaining,
+            },
         })
-        if _broadcast_trade_cb:
-            asyncio.create_task(_broadcast_trade_cb(trade))
 
-    # Update maker orders in DB
-    for maker_id, filled_qty in maker_filled.items():
-        maker_row = await db.get_order_by_id(maker_id)
-        if maker_row:
-            new_remaining = float(maker_row["remaining_qty"]) - filled_qty
-            new_remaining = max(new_remaining, 0.0)
-            new_status = "filled" if new_remaining <= 0 else "partial"
-            await db.update_order(maker_id, new_status, new_remaining)
-
-    # Update incoming order status in DB
-    filled = order.quantity - order.remaining_qty
-    if order.remaining_qty <= 0:
-        status = "filled"
-    elif filled > 0:
-        status = "partial"
-    else:
-        status = order.status.value
 
-    await db.update_order(order.id, status, order.remaining_qty)
+def _emit_fills(trades: list[Trade]):
+    if not _user_event_cb:
+        return
+    for trade in trades:
+        taker_side = trade.aggressor_side
+        for user_id, side in ((trade.buyer_id, "buy"), (trade.seller_id, "sell")):
+            if user_id is None:
+                continue
+            taker = side == taker_side
+            _user_event_cb(user_id, {
+                "type": "fill",
+                "data": {
+                    "trade_id": trade.id,
+                    "order_id": trade.taker_order_id if taker else trade.maker_order_id,
+                    "symbol": trade.symbol,
+                    "side": side,
+                    "price": trade.price,
+                    "quantity": trade.quantity,
+                    "liquidity": "taker" if taker else "maker",
+                    "timestamp": trade.timestamp,
+                },
+            })
+
+
+async def _persist(**batch):
+    """persist_batch, then mirror the same changes into the live order registry."""
+    from src.services import db
+    await db.persist_batch(**batch)
+    registry.apply(**batch)
+
+
+def _apply_to_ledger(book: "OrderBook", trades: list[Trade], order_ids: list[str]):
+    """Move assets for each fill, then true up the hold of every order touched."""
+    if not settings.risk_checks:
+        return
+    pair = None
+    for trade in trades:
+        if trade.buyer_id is None and trade.seller_id is None:
+            continue
+        pair = pair or split_symbol(book.symbol)
+        ledger.apply_trade(trade, *pair)
+    for order_id in dict.fromkeys(order_ids):
+        entry = book.get_entry(order_id)
+        if entry is None and book.has_order(order_id):
+            continue  # armed stop keeps its hold until it fires
+        ledger.sync_entry(order_id, entry, book.symbol)
 
-    if _broadcast_depth_cb:
-        asyncio.create_task(_broadcast_depth_cb(book))
 
+async def _process(book: "OrderBook", order: Order) -> list[Trade]:
+    trades = book.match(order)
+    await _settle(book, [order], trades)
     return trades
 
 
+async def _process_cancel(book: "OrderBook", task: CancelTask) -> list["OrderBookEntry"]:
+    if task.order_ids is None:
+        cancelled = book.cancel_user_orders(task.user_id)
+    else:
+        cancelled = []
+        for order_id in task.order_ids:
+            entry = book.find_order(order_id)
+            if entry is not None and book.cancel_order(order_id):
+                cancelled.append(entry)
+
+    if cancelled:
+        for entry in cancelled:
+            ledger.release(entry.order_id)
+        await _persist(
+            updates=[(e.order_id, OrderStatus.CANCELLED.value, e.remaining) for e in cancelled],
+            balances=ledger.drain_dirty(),
+        )
+        for e in cancelled:
+            _emit_order(e.user_id, book.symbol, e.order_id, e.side, e.price, OrderStatus.CANCELLED.value, e.remaining)
+        notify_book_changed(book)
+        if _broadcast_depth_cb:
+            asyncio.create_task(_broadcast_depth_cb(book))
+    return cancelled
+
+
+async def _process_amend(book: "OrderBook", task: AmendTask) -> dict | None:
+    entry = book.get_entry(task.order_id)
+    if settings.risk_checks and entry is not None and entry.user_id is not None:
+        asset, extra = ledger.required_increase(
+            entry,
+            entry.price if task.price is None else task.price,
+            entry.remaining if task.quantity is None else task.quantity,
+            book.symbol,
+        )
+        ledger.check_increase(entry.user_id, asset, extra)
+
+    result = book.amend_order(task.order_id, task.price, task.quantity)
+    if result is None:
+        return None
+
+    order: Order | None = result["order"]
+    if order is None:
+        # In-place reduction — a single row update
+        ledger.sync_entry(task.order_id, result["entry"], book.symbol)
+        e = result["entry"]
+        await _persist(
+            resized=[(task.order_id, e.remaining, e.price)],
+            balances=ledger.drain_dirty(),
+        )
+        _emit_order(e.user_id, book.symbol, e.order_id, e.side, e.price, AMENDED, e.remaining)
+        notify_book_changed(book)
+        if _broadcast_depth_cb:
+            asyncio.create_task(_broadcast_depth_cb(book))
+        return result
+
+    # Re-queued: one batch carrying the resize (to the new open quantity, before
+    # any re-match fills) plus anything the re-match did
+    open_qty = order.quantity - entry.filled
+    await _settle(book, [order], result["trades"], resized=[(order.id, open_qty, order.price)])
+    return result
+
+
+async def _process_mass_quote(book: "OrderBook", task: MassQuoteTask) -> dict:
+    if settings.risk_checks:
+        # Risk-check the whole quote set against what the user's quotes hold now
+        base, quote = split_symbol(book.symbol)
+        held = {base: 0.0, quote: 0.0}
+        for entry in book.user_entries(task.user_id):
+            held[quote if entry.side == Side.BUY else base] += ledger.held_for(entry.order_id)
+        ledger.check_increase(task.user_id, quote, sum(p * q for p, q in task.bids) - held[quote])
+        ledger.check_increase(task.user_id, base, sum(q for _, q in task.asks) - held[base])
+
+    result = book.mass_quote(task.user_id, task.bids, task.asks)
+    new_orders: list[Order] = result["new"]
+    await _settle(
+        book,
+        new_orders,
+        result["trades"],
+        new_orders=new_orders,
+        resized=[(e.order_id, e.remaining, e.price) for e in result["resized"]],
+        extra_updates=[
+            (e.order_id, OrderStatus.CANCELLED.value, e.remaining) for e in result["cancelled"]
+        ],
+    )
+    for e in result["cancelled"]:
+        _emit_order(e.user_id, book.symbol, e.order_id, e.side, e.price, OrderStatus.CANCELLED.value, e.remaining)
+    for e in result["resized"]:
+        _emit_order(e.user_id, book.symbol, e.order_id, e.side, e.price, AMENDED, e.remaining)
+    return result
+
+
+async def _process_expiry(book: "OrderBook") -> list["OrderBookEntry"]:
+    """Expire one batch of due orders: one bulk update, one depth delta."""
+    expired, delta = book.expire_due(time.time(), settings.expiry_batch_size)
+    if not expired:
+        return expired
+
+    for entry in expired:
+        ledger.release(entry.order_id)
+    await _persist(
+        updates=[(e.order_id, OrderStatus.EXPIRED.value, e.remaining) for e in expired],
+        balances=ledger.drain_dirty(),
+    )
+    logger.info(f"[Engine:{book.symbol}] expired {len(expired)} orders")
+    for e in expired:
+        _emit_order(e.user_id, book.symbol, e.order_id, e.side, e.price, OrderStatus.EXPIRED.value, e.remaining)
+    notify_book_changed(book)
+    if delta is not None and _broadcast_depth_delta_cb:
+        asyncio.create_task(_broadcast_depth_delta_cb(book, delta))
+    return expired
+
+
+def enqueue_order(order: Order) -> asyncio.Future:
+    """Enqueue order; the returned Future resolves to its trades once matched."""
+    queue, _ = _get_or_create(order.symbol)
+    future = asyncio.get_running_loop().create_future()
+    queue.put_nowait(OrderTask(order=order, future=future))
+    return future
+
+
 async def submit_order(order: Order) -> list[Trade]:
     """Enqueue order and wait for matching result."""
-    queue, _ = _get_or_create(order.symbol)
-    loop = asyncio.get_running_loop()
-    future = loop.create_future()
-    await queue.put(OrderTask(order=order, future=future))
+    return await enqueue_order(order)
+
+
+def locate_order(order_id: str) -> str | None:
+    """Symbol whose book currently holds `order_id`, resting or armed (O(symbols) dict lookups, no DB)."""
+    for symbol, book in _books.items():
+        if book.has_order(order_id):
+            return symbol
+    return None
+
+
+def symbols_with_orders(user_id: str) -> list[str]:
+    return [symbol for symbol, book in _books.items() if book.has_user_orders(user_id)]
+
+
+async def submit_cancel(
+    symbol: str, order_ids: list[str] | None = None, user_id: str | None = None
+) -> list["OrderBookEntry"]:
+    """Cancel inside the symbol's worker, sequenced with matching. Returns removed entries."""
+    queue, _ = _get_or_create(symbol)
+    future = asyncio.get_running_loop().create_future()
+    queue.put_nowait(CancelTask(order_ids=order_ids, user_id=user_id, future=future))
+    return await future
+
+
+async def submit_amend(
+    symbol: str, order_id: str, price: float | None, quantity: float | None
+) -> dict | None:
+    """Amend inside the symbol's worker. Returns None if the order is not resting."""
+    queue, _ = _get_or_create(symbol)
+    future = asyncio.get_running_loop().create_future()
+    queue.put_nowait(AmendTask(order_id=order_id, price=price, quantity=quantity, future=future))
+    return await future
+
+
+async def submit_mass_quote(
+    symbol: str,
+    user_id: str,
+    bids: list[tuple[float, float]],
+    asks: list[tuple[float, float]],
+) -> dict:
+    """Replace a user's quotes on `symbol` atomically inside its worker."""
+    queue, _ = _get_or_create(symbol)
+    future = asyncio.get_running_loop().create_future()
+    queue.put_nowait(MassQuoteTask(user_id=user_id, bids=bids, asks=asks, future=future))
     return await future
 
 
 async def restore_symbol(symbol: str):
     """Load open/partial orders from DB into in-memory book on startup."""
     from src.services import db
-    _, book = _get_or_create(symbol)
+    queue, book = _get_or_create(symbol)
     orders = await db.get_open_orders_for_symbol(symbol)
     for row in orders:
         order = Order(
@@ -154,6 +599,83 @@ async def restore_symbol(symbol: str):
             remaining_qty=float(row["remaining_qty"]),
             status=row["status"],
             timestamp=row["created_at"],
+            stop_price=float(row["stop_price"]) if row.get("stop_price") else None,
+            display_qty=float(row["display_qty"]) if row.get("display_qty") else None,
+            time_in_force=row.get("time_in_force") or "gtc",
+            expire_at=row["expire_at"].replace(tzinfo=timezone.utc) if row.get("expire_at") else None,
+            client_order_id=row.get("client_order_id"),
         )
-        book.restore_order(order)
+        armed = order.type in (OrderType.STOP, OrderType.STOP_LIMIT) and row.get("triggered_at") is None
+        book.restore_order(order, armed=armed)
+        ledger.adopt_order(order)
+    notify_book_changed(book)
+    if book.next_expiry() is not None:
+        # The worker may already be blocked on an empty queue with no deadline
+        queue.put_nowait(None)
     logger.info(f"[Engine] Restored {len(orders)} open orders for {symbol}")
+
+
+async def restore_books():
+    """Restore every symbol that has open/partial orders, re-indexing their ledger holds."""
+    from src.services import db
+    for symbol in await db.get_open_order_symbols():
+        await restore_symbol(symbol)
+
+
+async def restore_positions():
+    """
+    Rebuild positions on startup by replaying every stored trade, oldest
+    first: archived days, then the trades table. Days present in the
+    archive are skipped in the table (left behind by an archiver crash
+    between write and delete).
+    """
+    from src.services import db, trade_archive
+    positions.clear()
+    since = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    symbols = set(trade_archive.archived_symbols()) | set(await db.get_trade_symbols(since))
+    for symbol in sorted(symbols):
+        days = trade_archive.archived_days(symbol)
+        count = 0
+        for day in days:
+            cols = await asyncio.to_thread(trade_archive.load_day, symbol, day)
+            for price, qty, buyer_id, seller_id in zip(
+                cols["price"].tolist(), cols["quantity"].tolist(),
+                cols["buyer_id"].tolist(), cols["seller_id"].tolist(),
+            ):
+                positions.add(symbol, buyer_id or None, seller_id or None, price, qty)
+            count += len(cols["price"])
+        archived = set(days)
+        async for row in db.stream_trades(symbol):
+            if row["timestamp"].date() in archived:
+                continue
+            positions.add(
+                symbol,
+                str(row["buyer_id"]) if row["buyer_id"] else None,
+                str(row["seller_id"]) if row["seller_id"] else None,
+                float(row["price"]),
+                float(row["quantity"]),
+            )
+            count += 1
+        logger.info(f"[Engine] Rebuilt positions for {symbol} from {count} trades")
+
+
+async def backfill_market_data():
+    """Rebuild in-memory candles and 24h tickers from recent stored trades on startup."""
+    from src.services import db
+    since = datetime.now(timezone.utc) - timedelta(hours=max(settings.candle_backfill_hours, 24))
+    candle_since = datetime.now(timezone.utc) - timedelta(hours=settings.candle_backfill_hours)
+    for symbol in await db.get_trade_symbols(since):
+        _get_or_create(symbol)
+        candles = _candles[symbol]
+        ticker = _tickers[symbol]
+        count = 0
+        async for row in db.stream_trades(symbol, start=since):
+            price, qty, ts = float(row["price"]), float(row["quantity"]), row["timestamp"]
+            ticker.add(price, qty, ts)
+            if ts.replace(tzinfo=timezone.utc) >= candle_since:
+                candles.add(price, qty, ts)
+            count += 1
+        if count:
+            # Stops armed after a restart compare against the last traded price
+            _books[symbol].last_price = price
+        logger.info(f"[Engine] Backfilled market data for {symbol} from {count} trades")
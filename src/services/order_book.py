@@ -3,32 +3,99 @@ In-memory order book. Fully synchronous — no I/O.
 All DB writes and WebSocket broadcasts happen in the matching_engine worker.
 """
 
-from collections import deque
+import heapq
+import json
+from collections import OrderedDict, defaultdict, deque
 from datetime import datetime, timezone
+from itertools import islice
 from typing import List
 
+import numpy as np
 from sortedcontainers import SortedDict
 
 from src.models.book_entry import OrderBookEntry
-from src.models.order import Order, OrderStatus, Side, OrderType
+from src.models.order import Order, OrderStatus, Side, OrderType, SelfTradePrevention
 from src.models.trade import Trade
 from src.utils.logger import logger
 
 
+class PriceLevel:
+    """
+    FIFO queue of the resting entries at one price. Keyed by order id so
+    cancel / amend / expiry remove an entry in O(1) wherever it sits,
+    without comparing it against the entries ahead of it.
+    """
+
+    __slots__ = ("_entries",)
+
+    def __init__(self):
+        self._entries: OrderedDict[str, OrderBookEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries.values())
+
+    def __getitem__(self, index: int) -> OrderBookEntry:
+        if index == 0 and self._entries:
+            return next(iter(self._entries.values()))
+        return list(self._entries.values())[index]
+
+    def append(self, entry: OrderBookEntry):
+        self._entries[entry.order_id] = entry
+
+    def popleft(self) -> OrderBookEntry:
+        return self._entries.popitem(last=False)[1]
+
+    def remove(self, entry: OrderBookEntry):
+        del self._entries[entry.order_id]
+
+
 class OrderBook:
-    def __init__(self, symbol: str):
+    def __init__(self, symbol: str, stp_mode: SelfTradePrevention = SelfTradePrevention.CANCEL_NEWEST):
         self.symbol = symbol
+        # Self-trade prevention for orders that don't choose their own
+        self.stp_mode = stp_mode
         # bids: highest price first
         self.bids: SortedDict = SortedDict(lambda x: -x)
         # asks: lowest price first
         self.asks: SortedDict = SortedDict()
 
-        # order_id → (price, side) for O(1) cancel lookup
-        self._order_index: dict[str, tuple[float, Side]] = {}
+        # order_id → resting entry for O(1) cancel / amend lookup
+        self._order_index: dict[str, OrderBookEntry] = {}
+        # user_id → resting order ids, for per-user quote / cancel operations
+        self._user_orders: dict[str, set[str]] = defaultdict(set)
+
+        # Trigger book: stop_price → FIFO of armed stop / stop-limit orders.
+        # Buy stops fire when the market trades at or above their stop price,
+        # sell stops at or below — each side is one range query per trade burst.
+        self.buy_stops: SortedDict = SortedDict()
+        self.sell_stops: SortedDict = SortedDict()
+        self._stop_index: dict[str, Order] = {}
+        self._user_stops: dict[str, set[str]] = defaultdict(set)
+        self.last_price: float | None = None
+        # Stops fired since the last drain_triggered() — settled by the worker
+        self._triggered: list[Order] = []
+
+        # (expire_at epoch seconds, order_id) min-heap for GTT / DAY orders.
+        # Entries for orders that filled or were cancelled are skipped lazily.
+        self._expiries: list[tuple[float, str]] = []
+
+        # Resting entries cancelled or decremented by self-trade prevention
+        # since the last drain_self_trade_prevented() — settled by the worker
+        self._stp_affected: list[OrderBookEntry] = []
+
+        # Bumped on every mutation; serialized snapshots are memoized per version
+        self.version = 0
+        self._depth_cache: dict[int, str] = {}
+        self._bbo_cache: dict | None = None
 
         # WebSocket clients (managed by main.py)
         self.market_clients: list = []
         self.trade_clients: list = []
+        # interval → WebSocket clients
+        self.candle_clients: dict[str, list] = defaultdict(list)
 
     # ------------------------------------------------------------------
     # Public interface called by matching_engine worker
@@ -42,11 +109,390 @@ class OrderBook:
         """
         logger.info(f"[OrderBook:{self.symbol}] matching {order.type} {order.side} qty={order.quantity} price={order.price}")
 
-        if order.type == OrderType.MARKET:
+        if order.type in (OrderType.STOP, OrderType.STOP_LIMIT):
+            if not self._is_triggered(order):
+                self._add_stop(order)
+                self._schedule_expiry(order)
+                return []
+            # Already crossed on arrival: it fires now, like a stop from the trigger book
+            logger.info(f"[OrderBook:{self.symbol}] stop triggered on arrival {order.id} stop={order.stop_price} last={self.last_price}")
+            self._triggered.append(order)
+
+        trades = self._execute(order)
+        if trades:
+            trades.extend(self._run_triggers(trades))
+        self._schedule_expiry(order)
+
+        if trades or order.id in self._order_index or self._stp_affected:
+            self._touch()
+        return trades
+
+    def drain_self_trade_prevented(self) -> list[OrderBookEntry]:
+        """Resting entries hit by self-trade prevention, in order. Clears the list."""
+        affected, self._stp_affected = self._stp_affected, []
+        return affected
+
+    def drain_triggered(self) -> list[Order]:
+        """Stops fired by the last match() calls, in firing order. Clears the list."""
+        fired, self._triggered = self._triggered, []
+        return fired
+
+    def cancel_order(self, order_id: str) -> bool:
+        """Remove a resting or armed stop order. Returns True if found."""
+        entry = self._order_index.get(order_id)
+        if entry is None:
+            stop = self._stop_index.get(order_id)
+            if stop is None:
+                return False
+            self._remove_stop(stop)
+            logger.info(f"[OrderBook:{self.symbol}] cancelled stop order {order_id}")
+            return True
+
+        self._remove_entry(entry)
+        self._touch()
+        logger.info(f"[OrderBook:{self.symbol}] cancelled order {order_id}")
+        return True
+
+    def cancel_user_orders(self, user_id: str) -> list[OrderBookEntry]:
+        """Remove every resting and armed stop order owned by `user_id` — O(user's orders)."""
+        entries = self.user_entries(user_id)
+        for entry in entries:
+            self._remove_entry(entry)
+        if entries:
+            self._touch()
+        stops = [self._stop_index[oid] for oid in self._user_stops.get(user_id, ())]
+        for stop in stops:
+            self._remove_stop(stop)
+        entries.extend(self._stop_entry(stop) for stop in stops)
+        if entries:
+            logger.info(f"[OrderBook:{self.symbol}] cancelled {len(entries)} orders for user {user_id}")
+        return entries
+
+    def amend_order(self, order_id: str, price: float | None = None, quantity: float | None = None) -> dict | None:
+        """
+        Modify a resting order's open quantity and/or price.
+        A pure size reduction is applied in place and keeps queue priority.
+        A price change or size increase pulls the order and re-matches it as
+        a fresh limit order under the same id (it may trade, and any
+        remainder joins the back of its level).
+
+        Returns None if the order is not resting, else
+        {"entry": OrderBookEntry | None, "order": Order | None, "trades": [Trade], "priority_kept": bool}.
+        """
+        entry = self._order_index.get(order_id)
+        if entry is None:
+            return None
+
+        new_price = entry.price if price is None else price
+        new_qty = entry.remaining if quantity is None else quantity
+
+        if new_price == entry.price and new_qty <= entry.remaining:
+            # Iceberg reductions come out of the hidden reserve first
+            if new_qty >= entry.quantity:
+                entry.hidden = new_qty - entry.quantity
+            else:
+                entry.quantity, entry.hidden = new_qty, 0.0
+            self._touch()
+            logger.info(f"[OrderBook:{self.symbol}] amended {order_id} in place qty={new_qty}")
+            return {"entry": entry, "order": None, "trades": [], "priority_kept": True}
+
+        self._remove_entry(entry)
+        # Same order, new open quantity: earlier fills stay in `quantity` so
+        # its status stays partial
+        order = Order(
+            id=order_id,
+            symbol=self.symbol,
+            side=entry.side,
+            type=OrderType.LIMIT,
+            price=new_price,
+            quantity=entry.filled + new_qty,
+            remaining_qty=new_qty,
+            display_qty=entry.display_qty,
+            stp=entry.stp,
+            time_in_force=entry.time_in_force,
+            expire_at=entry.expire_at,
+            client_order_id=entry.client_order_id,
+            user_id=entry.user_id,
+        )
+        trades = self.match(order)
+        self._touch()
+        logger.info(f"[OrderBook:{self.symbol}] amended {order_id} re-queued price={new_price} qty={new_qty}")
+        return {"entry": self._order_index.get(order_id), "order": order, "trades": trades, "priority_kept": False}
+
+    def get_entry(self, order_id: str) -> OrderBookEntry | None:
+        return self._order_index.get(order_id)
+
+    def find_order(self, order_id: str) -> OrderBookEntry | None:
+        """Resting entry, or a snapshot entry for an armed stop order."""
+        entry = self._order_index.get(order_id)
+        if entry is None:
+            stop = self._stop_index.get(order_id)
+            if stop is not None:
+                return self._stop_entry(stop)
+        return entry
+
+    def has_order(self, order_id: str) -> bool:
+        return order_id in self._order_index or order_id in self._stop_index
+
+    def has_user_orders(self, user_id: str) -> bool:
+        return bool(self._user_orders.get(user_id) or self._user_stops.get(user_id))
+
+    def user_entries(self, user_id: str) -> list[OrderBookEntry]:
+        """Resting entries owned by `user_id` — O(user's orders)."""
+        return [self._order_index[oid] for oid in self._user_orders.get(user_id, ())]
+
+    def mass_quote(
+        self,
+        user_id: str,
+        bids: list[tuple[float, float]],
+        asks: list[tuple[float, float]],
+    ) -> dict:
+        """
+        Atomically replace `user_id`'s resting quotes with the given
+        (price, qty) levels. Same-price levels are updated in place: a size
+        reduction keeps queue priority, an increase moves to the back of the
+        level. Stale levels are cancelled first, then new levels are matched
+        as limit orders.
+
+        Returns {"new": [Order], "trades": [Trade], "resized": [entry],
+        "cancelled": [entry]}.
+        """
+        resized: list[OrderBookEntry] = []
+        cancelled: list[OrderBookEntry] = []
+        to_place: list[tuple[Side, float, float]] = []
+
+        for side, levels in ((Side.BUY, bids), (Side.SELL, asks)):
+            wanted = {price: qty for price, qty in levels if qty > 0}
+            for entry in self.user_entries(user_id):
+                if entry.side != side:
+                    continue
+                qty = wanted.pop(entry.price, None)
+                if qty is None:
+                    self._remove_entry(entry)
+                    cancelled.append(entry)
+                elif qty != entry.remaining:
+                    self._resize_entry(entry, qty)
+                    resized.append(entry)
+            to_place.extend((side, price, qty) for price, qty in wanted.items())
+
+        new_orders: list[Order] = []
+        trades: list[Trade] = []
+        for side, price, qty in to_place:
+            order = Order(
+                symbol=self.symbol,
+                side=side,
+                type=OrderType.LIMIT,
+                price=price,
+                quantity=qty,
+                user_id=user_id,
+            )
+            trades.extend(self.match(order))
+            new_orders.append(order)
+
+        if resized or cancelled:
+            self._touch()
+        logger.info(
+            f"[OrderBook:{self.symbol}] mass quote user={user_id}: "
+            f"new={len(new_orders)} resized={len(resized)} cancelled={len(cancelled)}"
+        )
+        return {"new": new_orders, "trades": trades, "resized": resized, "cancelled": cancelled}
+
+    def restore_order(self, order: Order, armed: bool = False):
+        """
+        Add an order directly to the book without matching (for recovery on
+        startup). `armed` stops go back into the trigger book instead.
+        """
+        if armed:
+            self._add_stop(order)
+        else:
+            self._add_to_book(order)
+            self._touch()
+        self._schedule_expiry(order)
+
+    # ------------------------------------------------------------------
+    # Expiry
+    # ------------------------------------------------------------------
+
+    def next_expiry(self) -> float | None:
+        """Epoch seconds of the earliest scheduled expiry, if any."""
+        return self._expiries[0][0] if self._expiries else None
+
+    def expire_due(self, now: float, limit: int) -> tuple[list[OrderBookEntry], dict | None]:
+        """
+        Remove up to `limit` orders whose expiry is <= `now` — O(k log n),
+        never scans the book. Returns the expired entries and a depth delta
+        for the levels they left (None if only armed stops expired).
+        """
+        expired: list[OrderBookEntry] = []
+        levels: set[tuple[Side, float]] = set()
+        while self._expiries and self._expiries[0][0] <= now and len(expired) < limit:
+            _, order_id = heapq.heappop(self._expiries)
+            entry = self._order_index.get(order_id)
+            if entry is not None:
+                self._remove_entry(entry)
+                levels.add((entry.side, entry.price))
+                expired.append(entry)
+                continue
+            stop = self._stop_index.get(order_id)
+            if stop is not None:
+                self._remove_stop(stop)
+                expired.append(self._stop_entry(stop))
+
+        if not levels:
+            return expired, None
+        self._touch()
+        delta = {"symbol": self.symbol, "version": self.version, "bids": [], "asks": []}
+        for side, price in sorted(levels, key=lambda level: (level[0].value, level[1])):
+            book = self.bids if side == Side.BUY else self.asks
+            # 0.0 means the level is gone
+            total = sum((e.quantity for e in book.get(price, ())), 0.0)
+            delta["bids" if side == Side.BUY else "asks"].append([price, total])
+        return expired, delta
+
+    def _schedule_expiry(self, order: Order):
+        if order.expire_at is not None and self.has_order(order.id):
+            heapq.heappush(self._expiries, (order.expire_at.timestamp(), order.id))
+
+    def _resize_entry(self, entry: OrderBookEntry, qty: float):
+        """
+        In-place size change. Reductions keep priority; increases go to the
+        back of the level. A quote level is fully displayed (no reserve).
+        """
+        if qty > entry.remaining:
+            queue = (self.bids if entry.side == Side.BUY else self.asks)[entry.price]
+            queue.remove(entry)
+            entry.timestamp = datetime.now(timezone.utc)
+            queue.append(entry)
+        entry.quantity, entry.hidden = qty, 0.0
+
+    @staticmethod
+    def _replenish(entry: OrderBookEntry):
+        """Refill an exhausted iceberg slice from its reserve; caller requeues it at the back."""
+        refill = min(entry.display_qty, entry.hidden)
+        entry.hidden -= refill
+        entry.quantity = refill
+        entry.timestamp = datetime.now(timezone.utc)
+
+    def _remove_entry(self, entry: OrderBookEntry):
+        book = self.bids if entry.side == Side.BUY else self.asks
+        queue = book.get(entry.price)
+        if queue is not None:
+            queue.remove(entry)
+            if not queue:
+                del book[entry.price]
+        self._unindex(entry)
+
+    def _unindex(self, entry: OrderBookEntry):
+        self._order_index.pop(entry.order_id, None)
+        if entry.user_id is not None:
+            owned = self._user_orders.get(entry.user_id)
+            if owned is not None:
+                owned.discard(entry.order_id)
+                if not owned:
+                    del self._user_orders[entry.user_id]
+
+    def _touch(self):
+        """Record a mutation: bump version and drop memoized snapshots."""
+        self.version += 1
+        self._depth_cache.clear()
+        self._bbo_cache = None
+
+    # ------------------------------------------------------------------
+    # Stop triggers
+    # ------------------------------------------------------------------
+
+    def _is_triggered(self, order: Order) -> bool:
+        if self.last_price is None:
+            return False
+        if order.side == Side.BUY:
+            return self.last_price >= order.stop_price
+        return self.last_price <= order.stop_price
+
+    def _add_stop(self, order: Order):
+        stops = self.buy_stops if order.side == Side.BUY else self.sell_stops
+        if order.stop_price not in stops:
+            stops[order.stop_price] = deque()
+        stops[order.stop_price].append(order)
+        self._stop_index[order.id] = order
+        if order.user_id is not None:
+            self._user_stops[order.user_id].add(order.id)
+        logger.info(f"[OrderBook:{self.symbol}] armed {order.type} {order.side} stop={order.stop_price} id={order.id}")
+
+    def _remove_stop(self, order: Order):
+        stops = self.buy_stops if order.side == Side.BUY else self.sell_stops
+        queue = stops.get(order.stop_price)
+        if queue is not None:
+            queue.remove(order)
+            if not queue:
+                del stops[order.stop_price]
+        self._unindex_stop(order)
+
+    def _unindex_stop(self, order: Order):
+        self._stop_index.pop(order.id, None)
+        if order.user_id is not None:
+            owned = self._user_stops.get(order.user_id)
+            if owned is not None:
+                owned.discard(order.id)
+                if not owned:
+                    del self._user_stops[order.user_id]
+
+    def _stop_entry(self, order: Order) -> OrderBookEntry:
+        return OrderBookEntry(
+            order_id=order.id,
+            price=order.price,
+            side=order.side,
+            quantity=order.remaining_qty,
+            timestamp=order.timestamp,
+            user_id=order.user_id,
+        )
+
+    def _pop_triggered(self, low: float, high: float) -> list[Order]:
+        """
+        Detach every stop crossed by trades in [low, high]. Range queries
+        only touch fired levels. Deterministic order: buy stops by ascending
+        stop price, then sell stops by descending stop price — i.e. in the
+        order the market reached them — FIFO within a level.
+        """
+        fired: list[Order] = []
+        for stops, prices in (
+            (self.buy_stops, list(self.buy_stops.irange(maximum=high))),
+            (self.sell_stops, list(self.sell_stops.irange(minimum=low, reverse=True))),
+        ):
+            for price in prices:
+                queue = stops.pop(price)
+                for order in queue:
+                    self._unindex_stop(order)
+                fired.extend(queue)
+        return fired
+
+    def _run_triggers(self, trades: list[Trade]) -> list[Trade]:
+        """
+        Fire stops crossed by `trades`, then any stops crossed by the trades
+        those produce, until the cascade settles — all within this call.
+        """
+        produced: list[Trade] = []
+        while trades:
+            prices = [t.price for t in trades]
+            fired = self._pop_triggered(min(prices), max(prices))
+            trades = []
+            for order in fired:
+                logger.info(f"[OrderBook:{self.symbol}] stop triggered {order.id} stop={order.stop_price} last={self.last_price}")
+                self._triggered.append(order)
+                trades.extend(self._execute(order))
+            produced.extend(trades)
+        return produced
+
+    # ------------------------------------------------------------------
+    # Matching internals
+    # ------------------------------------------------------------------
+
+    def _execute(self, order: Order) -> list[Trade]:
+        """Match by execution type; a fired STOP behaves as MARKET, STOP_LIMIT as LIMIT."""
+        if order.type in (OrderType.MARKET, OrderType.STOP):
             trades = self._match_market(order)
-        elif order.type == OrderType.LIMIT:
+        elif order.type in (OrderType.LIMIT, OrderType.STOP_LIMIT):
             trades = self._match_limit(order)
-            if order.remaining_qty > 0:
+            if order.remaining_qty > 0 and order.status != OrderStatus.CANCELLED:
                 self._add_to_book(order)
         elif order.type == OrderType.IOC:
             trades = self._match_limit(order)
@@ -60,38 +506,15 @@ class OrderBook:
                 trades = []
         else:
             trades = []
-
         return trades
 
-    def cancel_order(self, order_id: str) -> bool:
-        """Remove a resting order from the book. Returns True if found."""
-        if order_id not in self._order_index:
-            return False
-
-        price, side = self._order_index.pop(order_id)
-        book = self.bids if side == Side.BUY else self.asks
-
-        if price in book:
-            book[price] = deque(
-                e for e in book[price] if e.order_id != order_id
-            )
-            if not book[price]:
-                del book[price]
-
-        logger.info(f"[OrderBook:{self.symbol}] cancelled order {order_id}")
-        return True
-
-    def restore_order(self, order: Order):
-        """Add an order directly to the book without matching (for recovery on startup)."""
-        self._add_to_book(order)
-
-    # ------------------------------------------------------------------
-    # Matching internals
-    # ------------------------------------------------------------------
-
     def _match_market(self, order: Order) -> list[Trade]:
         contra = self.asks if order.side == Side.BUY else self.bids
         trades = []
+        stp = order.stp or self.stp_mode
+        # One identity compare per resting entry; None disables the check
+        uid = order.user_id if stp is not SelfTradePrevention.NONE else None
+        halted = False
 
         while order.remaining_qty > 0 and contra:
             best_price = next(iter(contra))
@@ -99,25 +522,41 @@ class OrderBook:
 
             while queue and order.remaining_qty > 0:
                 top = queue[0]
+                if uid is not None and top.user_id == uid:
+                    halted = self._prevent_self_trade(order, top, queue, stp)
+                    if halted:
+                        break
+                    continue
                 traded_qty = min(order.remaining_qty, top.quantity)
                 trade = self._make_trade(order, top, best_price, traded_qty)
                 trades.append(trade)
 
                 top.quantity -= traded_qty
+                top.filled += traded_qty
                 order.remaining_qty -= traded_qty
 
                 if top.quantity <= 0:
                     queue.popleft()
-                    self._order_index.pop(top.order_id, None)
+                    if top.hidden > 0:
+                        self._replenish(top)
+                        queue.append(top)
+                    else:
+                        self._unindex(top)
 
             if not queue:
                 del contra[best_price]
+            if halted:
+                break
 
         return trades
 
     def _match_limit(self, order: Order) -> list[Trade]:
         contra = self.asks if order.side == Side.BUY else self.bids
         trades = []
+        stp = order.stp or self.stp_mode
+        # One identity compare per resting entry; None disables the check
+        uid = order.user_id if stp is not SelfTradePrevention.NONE else None
+        halted = False
 
         def crosses(price: float) -> bool:
             if order.side == Side.BUY:
@@ -132,22 +571,69 @@ class OrderBook:
             queue = contra[best_price]
             while queue and order.remaining_qty > 0:
                 top = queue[0]
+                if uid is not None and top.user_id == uid:
+                    halted = self._prevent_self_trade(order, top, queue, stp)
+                    if halted:
+                        break
+                    continue
                 traded_qty = min(order.remaining_qty, top.quantity)
                 trade = self._make_trade(order, top, best_price, traded_qty)
                 trades.append(trade)
 
                 top.quantity -= traded_qty
+                top.filled += traded_qty
                 order.remaining_qty -= traded_qty
 
                 if top.quantity <= 0:
                     queue.popleft()
-                    self._order_index.pop(top.order_id, None)
+                    if top.hidden > 0:
+                        self._replenish(top)
+                        queue.append(top)
+                    else:
+                        self._unindex(top)
 
             if not queue:
                 del contra[best_price]
+            if halted:
+                break
 
         return trades
 
+    def _prevent_self_trade(
+        self, order: Order, top: OrderBookEntry, queue: PriceLevel, stp: SelfTradePrevention
+    ) -> bool:
+        """
+        Resolve `order` meeting its owner's resting `top` (the head of
+        `queue`) without trading. Returns True if `order` must stop matching.
+        """
+        logger.info(f"[OrderBook:{self.symbol}] self-trade prevented ({stp.value}): {order.id} vs {top.order_id}")
+        if stp is SelfTradePrevention.DECREMENT:
+            overlap = min(order.remaining_qty, top.quantity)
+            order.remaining_qty -= overlap
+            top.quantity -= overlap
+            self._stp_affected.append(top)
+            if top.quantity <= 0:
+                queue.popleft()
+                if top.hidden > 0:
+                    self._replenish(top)
+                    queue.append(top)
+                else:
+                    self._unindex(top)
+            if order.remaining_qty <= 0:
+                order.status = OrderStatus.CANCELLED
+                return True
+            return False
+
+        if stp is not SelfTradePrevention.CANCEL_NEWEST:
+            # cancel_oldest / cancel_both: pull the resting order
+            queue.popleft()
+            self._unindex(top)
+            self._stp_affected.append(top)
+        if stp is SelfTradePrevention.CANCEL_OLDEST:
+            return False
+        order.status = OrderStatus.CANCELLED
+        return True
+
     def _make_trade(self, incoming: Order, resting: OrderBookEntry, price: float, qty: float) -> Trade:
         buyer_id = incoming.user_id if incoming.side == Side.BUY else resting.user_id
         seller_id = resting.user_id if incoming.side == Side.BUY else incoming.user_id
@@ -162,32 +648,63 @@ class OrderBook:
             taker_order_id=incoming.id,
             aggressor_side=incoming.side.value,
         )
+        self.last_price = price
         logger.info(f"[OrderBook:{self.symbol}] trade: price={price} qty={qty} aggressor={incoming.side.value}")
         return trade
 
     def _add_to_book(self, order: Order):
         book = self.bids if order.side == Side.BUY else self.asks
         if order.price not in book:
-            book[order.price] = deque()
+            book[order.price] = PriceLevel()
+        visible, hidden = order.remaining_qty, 0.0
+        if order.display_qty and visible > order.display_qty:
+            visible, hidden = order.display_qty, visible - order.display_qty
         entry = OrderBookEntry(
             order_id=order.id,
-            quantity=order.remaining_qty,
+            price=order.price,
+            side=order.side,
+            quantity=visible,
             timestamp=order.timestamp,
             user_id=order.user_id,
+            hidden=hidden,
+            display_qty=order.display_qty,
+            filled=order.quantity - order.remaining_qty,
+            stp=order.stp,
+            time_in_force=order.time_in_force,
+            expire_at=order.expire_at,
+            client_order_id=order.client_order_id,
         )
         book[order.price].append(entry)
-        self._order_index[order.id] = (order.price, order.side)
+        self._order_index[order.id] = entry
+        if order.user_id is not None:
+            self._user_orders[order.user_id].add(order.id)
 
     def _can_fully_match(self, order: Order) -> bool:
+        """Dry run of _match_limit, including what self-trade prevention would do to the walk."""
         contra = self.asks if order.side == Side.BUY else self.bids
+        stp = order.stp or self.stp_mode
+        uid = order.user_id if stp is not SelfTradePrevention.NONE else None
+        # cancel_newest / cancel_both stop the walk at the first own entry
+        halts = stp in (SelfTradePrevention.CANCEL_NEWEST, SelfTradePrevention.CANCEL_BOTH)
         total = 0.0
         for price, queue in contra.items():
             if order.side == Side.BUY and price > order.price:
                 break
             if order.side == Side.SELL and price < order.price:
                 break
+            # Before a halting own entry, icebergs only show their visible slice:
+            # their replenished reserve re-queues behind it
+            own_here = halts and uid is not None and any(e.user_id == uid for e in queue)
             for entry in queue:
-                total += entry.quantity
+                if uid is not None and entry.user_id == uid:
+                    if halts:
+                        return False
+                    if stp is SelfTradePrevention.CANCEL_OLDEST:
+                        continue  # pulled from the book, never fills it
+                    # decrement: the overlap shrinks the order instead of filling it
+                    total += entry.remaining
+                else:
+                    total += entry.quantity if own_here else entry.remaining  # hidden reserve is executable
                 if total >= order.remaining_qty:
                     return True
         return False
@@ -207,11 +724,39 @@ class OrderBook:
         return {
             "timestamp": datetime.now(timezone.utc).isoformat() + "Z",
             "symbol": self.symbol,
+            "version": self.version,
             "bids": format_side(self.bids),
             "asks": format_side(self.asks),
         }
 
+    def get_depth_json(self, depth: int = 10) -> str:
+        """Serialized depth snapshot, built at most once per (version, depth)."""
+        cached = self._depth_cache.get(depth)
+        if cached is None:
+            if len(self._depth_cache) >= 16:
+                self._depth_cache.clear()
+            cached = json.dumps(self.get_order_book_depth(depth))
+            self._depth_cache[depth] = cached
+        return cached
+
+    def get_depth_arrays(self, levels: int = 100) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+        """
+        Copy the top `levels` of each side into (prices, quantities) arrays,
+        best price first. Bounded work; callers analyse the copy off-book.
+        """
+        def side_arrays(side_dict):
+            top = list(islice(side_dict.items(), levels))
+            prices = np.fromiter((p for p, _ in top), dtype=np.float64, count=len(top))
+            qtys = np.fromiter(
+                (sum(e.quantity for e in q) for _, q in top), dtype=np.float64, count=len(top)
+            )
+            return prices, qtys
+
+        return {"bids": side_arrays(self.bids), "asks": side_arrays(self.asks)}
+
     def get_bbo(self) -> dict:
-        best_bid = next(iter(self.bids), None)
-        best_ask = next(iter(self.asks), None)
-        return {"bid": best_bid, "ask": best_ask}
+        if self._bbo_cache is None:
+            best_bid = next(iter(self.bids), None)
+            best_ask = next(iter(self.asks), None)
+            self._bbo_cache = {"bid": best_bid, "ask": best_ask}
+        return dict(self._bbo_cache)
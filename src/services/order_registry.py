@@ -0,0 +1,89 @@
+"""
+Live order registry. Fully synchronous — no I/O.
+
+Mirrors the `orders` row of open and recently completed orders so status
+polls are answered from memory. It is fed from the same values the write
+path persists (order entry inserts, worker persist batches), so it never
+runs ahead of the database. Retention is bounded: least recently used
+orders are evicted and served from the DB again.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from src.utils.config import settings
+
+
+def _naive_utc(dt: datetime | None) -> datetime | None:
+    """Same shape as the TIMESTAMP columns read back from the DB."""
+    if dt is not None and dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+class OrderRegistry:
+    def __init__(self, max_orders: int):
+        self.max_orders = max_orders
+        self._rows: OrderedDict[str, dict] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, order_id: str) -> dict | None:
+        row = self._rows.get(order_id)
+        if row is not None:
+            self._rows.move_to_end(order_id)
+            return dict(row)
+        return None
+
+    def add(self, order_row: dict):
+        """Register a freshly inserted order (an order_service.order_row dict)."""
+        row = {k: v for k, v in order_row.items() if k != "timestamp"}
+        row["created_at"] = _naive_utc(order_row["timestamp"])
+        row["expire_at"] = _naive_utc(row.get("expire_at"))
+        row.setdefault("triggered_at", None)
+        self._rows[row["id"]] = row
+        self._rows.move_to_end(row["id"])
+        if len(self._rows) > self.max_orders:
+            self._rows.popitem(last=False)
+
+    def apply(
+        self,
+        new_orders: list[dict] = (),
+        resized: list[tuple[str, float, float]] = (),
+        updates: list[tuple[str, str, float]] = (),
+        triggered: list[str] = (),
+        **_,
+    ):
+        """Fold in a persist_batch, with the same semantics as its SQL. Unknown ids are skipped."""
+        for row in new_orders:
+            self.add(row)
+        for order_id, remaining, price in resized:
+            row = self._touch(order_id)
+            if row is not None:
+                row["quantity"] = row["quantity"] - row["remaining_qty"] + remaining
+                row["remaining_qty"] = remaining
+                row["price"] = price
+        for order_id, status, remaining in updates:
+            self.update(order_id, status, remaining)
+        if triggered:
+            now = _naive_utc(datetime.now(timezone.utc))
+            for order_id in triggered:
+                row = self._touch(order_id)
+                if row is not None:
+                    row["triggered_at"] = now
+
+    def update(self, order_id: str, status: str, remaining_qty: float):
+        row = self._touch(order_id)
+        if row is not None:
+            row["status"] = status
+            row["remaining_qty"] = remaining_qty
+
+    def _touch(self, order_id: str) -> dict | None:
+        row = self._rows.get(order_id)
+        if row is not None:
+            self._rows.move_to_end(order_id)
+        return row
+
+
+registry = OrderRegistry(settings.order_registry_size)
@@ -0,0 +1,419 @@
+"""
+Order entry shared by the HTTP routes and the /ws/orders session.
+"""
+
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+
+from fastapi import HTTPException
+
+from src.models.order import MassQuote, Order, OrderCreate, OrderStatus, OrderType, Side, TimeInForce
+from src.models.trade import Trade
+from src.services import db, matching_engine
+from src.services.client_order_index import client_orders
+from src.services.ledger import LedgerError, ledger
+from src.services.order_registry import registry
+from src.utils.config import settings
+
+
+def next_session_close(now: datetime | None = None) -> datetime:
+    """The next `settings.session_close_utc` strictly after `now`."""
+    now = now or datetime.now(timezone.utc)
+    close = datetime.combine(now.date(), time.fromisoformat(settings.session_close_utc), timezone.utc)
+    return close if close > now else close + timedelta(days=1)
+
+
+def build_order(body: OrderCreate, user_id: str | None) -> Order:
+    if body.client_order_id is not None and user_id is None:
+        raise HTTPException(status_code=400, detail="client_order_id requires an authenticated user")
+    expire_at = body.expire_at
+    if body.time_in_force == TimeInForce.DAY:
+        expire_at = next_session_close()
+    elif expire_at is not None and expire_at.tzinfo is None:
+        expire_at = expire_at.replace(tzinfo=timezone.utc)
+    return Order(
+        symbol=body.symbol,
+        side=body.side,
+        type=body.type,
+        price=body.price,
+        quantity=body.quantity,
+        stop_price=body.stop_price,
+        display_qty=body.display_qty,
+        time_in_force=body.time_in_force,
+        expire_at=expire_at,
+        stp=body.stp,
+        client_order_id=body.client_order_id,
+        user_id=user_id,
+    )
+
+
+def order_row(order: Order) -> dict:
+    return {
+        "id": order.id,
+        "user_id": order.user_id,
+        "symbol": order.symbol,
+        "side": order.side.value,
+        "type": order.type.value,
+        "price": order.price,
+        "quantity": order.quantity,
+        "remaining_qty": order.remaining_qty,
+        "status": order.status.value,
+        "timestamp": order.timestamp,
+        "stop_price": order.stop_price,
+        "display_qty": order.display_qty,
+        "time_in_force": order.time_in_force.value,
+        "expire_at": order.expire_at,
+        "client_order_id": order.client_order_id,
+    }
+
+
+def _order_from_row(row: dict) -> Order:
+    """Rebuild an Order from its `orders` row (a duplicate submission's original)."""
+    expire_at = row.get("expire_at")
+    order = Order(
+        id=str(row["id"]),
+        timestamp=row["created_at"].replace(tzinfo=timezone.utc),
+        user_id=str(row["user_id"]) if row["user_id"] else None,
+        symbol=row["symbol"],
+        side=Side(row["side"]),
+        type=OrderType(row["type"]),
+        price=float(row["price"] or 0),
+        quantity=float(row["quantity"]),
+        status=OrderStatus(row["status"]),
+        stop_price=float(row["stop_price"]) if row.get("stop_price") is not None else None,
+        display_qty=float(row["display_qty"]) if row.get("display_qty") is not None else None,
+        time_in_force=TimeInForce(row.get("time_in_force") or "gtc"),
+        expire_at=expire_at.replace(tzinfo=timezone.utc) if expire_at else None,
+        client_order_id=row.get("client_order_id"),
+    )
+    # Set after construction: a zero remaining_qty would otherwise default to quantity
+    order.remaining_qty = float(row["remaining_qty"])
+    return order
+
+
+def order_response(order: Order, trades: list[Trade]) -> dict:
+    return {
+        "order_id": order.id,
+        "status": order.status.value,
+        "symbol": order.symbol,
+        "side": order.side.value,
+        "type": order.type.value,
+        "price": order.price,
+        "stop_price": order.stop_price,
+        "display_qty": order.display_qty,
+        "time_in_force": order.time_in_force.value,
+        "expire_at": order.expire_at.isoformat() if order.expire_at else None,
+        "quantity": order.quantity,
+        "remaining_qty": order.remaining_qty,
+        "client_order_id": order.client_order_id,
+        "trades_executed": len(trades),
+        "trades": [
+            {
+                "id": t.id,
+                "price": t.price,
+                "quantity": t.quantity,
+                "aggressor_side": t.aggressor_side,
+            }
+            for t in trades
+        ],
+    }
+
+
+def _reference_price(order: Order) -> float | None:
+    """Best opposite price (else last trade) used to size a market buy's hold."""
+    if order.type != OrderType.MARKET:
+        return None
+    book = matching_engine.get_book(order.symbol)
+    if book is None:
+        return None
+    return book.get_bbo()["ask"] or book.last_price
+
+
+def _hold(order: Order):
+    """Pre-trade balance check; takes the order's hold or raises 400."""
+    try:
+        ledger.hold_order(order, _reference_price(order))
+    except LedgerError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def enqueue_order(order: Order) -> asyncio.Future:
+    """Check and hold balance, persist the order as open and hand it to its symbol worker without waiting for the match."""
+    _hold(order)
+    row = order_row(order)
+    # The hold is written with the order: a crash can't leave an open order
+    # whose hold never reached the balances table
+    balances = ledger.drain_dirty()
+    try:
+        await db.insert_order(row, balances)
+    except Exception:
+        ledger.mark_dirty(balances)
+        ledger.release(order.id)
+        raise
+    registry.add(row)
+    return matching_engine.enqueue_order(order)
+
+
+async def place_order(body: OrderCreate, user_id: str | None) -> tuple[Order, list[Trade]]:
+    """
+    Place and wait for the match. A repeated client_order_id returns the
+    original submission's result; nothing is re-inserted or re-matched.
+    """
+    order = build_order(body, user_id)
+    coid = order.client_order_id
+    if coid is None:
+        return order, await (await enqueue_order(order))
+
+    original = client_orders.get(user_id, coid)
+    if original is not None:
+        return await asyncio.shield(original)
+    claim = client_orders.claim(user_id, coid)
+    try:
+        result = await _place_new(order)
+    except BaseException as e:
+        client_orders.fail(user_id, coid, claim, e)
+        raise
+    client_orders.resolve(claim, result)
+    return result
+
+
+async def _place_new(order: Order) -> tuple[Order, list[Trade]]:
+    try:
+        future = await enqueue_order(order)
+    except db.DuplicateClientOrderId:
+        # No longer in the index (evicted, or placed before a restart): the DB
+        # row is the original. Its fills are not kept per order, so none are listed.
+        rows = await db.get_orders_by_client_ids(order.user_id, [order.client_order_id])
+        return _order_from_row(rows[0]), []
+    return order, await future
+
+
+async def place_batch(bodies: list[OrderCreate], user_id: str | None) -> list[dict]:
+    """
+    Insert every order with one bulk write, enqueue them grouped by symbol
+    (preserving submission order within a symbol) and return per-order
+    results in request order. Orders failing the balance check are
+    rejected individually and never written. Orders repeating a known
+    client_order_id return the original result, as in place_order.
+    """
+    orders = [build_order(body, user_id) for body in bodies]
+    results: list = [None] * len(orders)
+    originals: dict[int, asyncio.Future] = {}
+    claims: dict[int, asyncio.Future] = {}
+    accepted: list[int] = []
+    for i, order in enumerate(orders):
+        coid = order.client_order_id
+        if coid is not None:
+            original = client_orders.get(user_id, coid)
+            if original is not None:
+                originals[i] = original
+                continue
+        try:
+            _hold(order)
+        except HTTPException as e:
+            results[i] = ValueError(e.detail)
+            continue
+        if coid is not None:
+            claims[i] = client_orders.claim(user_id, coid)
+        accepted.append(i)
+
+    try:
+        rows = await _insert_batch(orders, accepted, results, user_id)
+    except BaseException as e:
+        for i in accepted:
+            ledger.release(orders[i].id)
+        for i, claim in claims.items():
+            client_orders.fail(user_id, orders[i].client_order_id, claim, e)
+        raise
+    for row in rows:
+        registry.add(row)
+
+    by_symbol: dict[str, list[int]] = {}
+    for i in accepted:
+        by_symbol.setdefault(orders[i].symbol, []).append(i)
+
+    futures: dict[int, asyncio.Future] = {}
+    for indexes in by_symbol.values():
+        for i in indexes:
+            futures[i] = matching_engine.enqueue_order(orders[i])
+
+    matched = await asyncio.gather(*futures.values(), return_exceptions=True)
+    for i, result in zip(futures, matched):
+        results[i] = result
+    for i, claim in claims.items():
+        if isinstance(results[i], BaseException):
+            client_orders.fail(user_id, orders[i].client_order_id, claim, results[i])
+        else:
+            client_orders.resolve(claim, (orders[i], results[i]))
+    for i, original in originals.items():
+        try:
+            orders[i], results[i] = await asyncio.shield(original)
+        except HTTPException as e:
+            results[i] = ValueError(e.detail)
+        except Exception as e:
+            results[i] = e
+    return [
+        {"order_id": order.id, "error": str(result)}
+        if isinstance(result, Exception)
+        else order_response(order, result)
+        for order, result in zip(orders, results)
+    ]
+
+
+async def _insert_batch(orders: list[Order], accepted: list[int], results: list, user_id: str | None) -> list[dict]:
+    """
+    Bulk insert orders[accepted] and return the rows written. Orders whose
+    client_order_id is already in the DB resolve to the stored order
+    instead: their hold is released and they are dropped from `accepted`.
+    """
+    while True:
+        rows = [order_row(orders[i]) for i in accepted]
+        balances = ledger.drain_dirty()
+        try:
+            await db.insert_orders(rows, balances)
+            return rows
+        except db.DuplicateClientOrderId:
+            ledger.mark_dirty(balances)
+            coids = [orders[i].client_order_id for i in accepted if orders[i].client_order_id is not None]
+            existing = {row["client_order_id"]: row for row in await db.get_orders_by_client_ids(user_id, coids)}
+            duplicates = [i for i in accepted if orders[i].client_order_id in existing]
+            if not duplicates:
+                raise
+            for i in duplicates:
+                ledger.release(orders[i].id)
+                orders[i] = _order_from_row(existing[orders[i].client_order_id])
+                results[i] = []
+            accepted[:] = [i for i in accepted if i not in duplicates]
+        except BaseException:
+            ledger.mark_dirty(balances)
+            raise
+
+
+async def mass_quote(body: MassQuote, user_id: str) -> dict:
+    try:
+        result = await matching_engine.submit_mass_quote(
+            body.symbol,
+            user_id,
+            [(q.price, q.quantity) for q in body.bids],
+            [(q.price, q.quantity) for q in body.asks],
+        )
+    except LedgerError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "symbol": body.symbol,
+        "new": [order_response(o, [t for t in result["trades"] if t.taker_order_id == o.id]) for o in result["new"]],
+        "resized": [{"order_id": e.order_id, "price": e.price, "side": e.side.value, "remaining_qty": e.remaining} for e in result["resized"]],
+        "cancelled": [e.order_id for e in result["cancelled"]],
+        "trades_executed": len(result["trades"]),
+    }
+
+
+async def cancel_order(order_id: str, user_id: str | None = None) -> dict:
+    """
+    Cancel a resting order through its symbol worker, so it is sequenced
+    with matching. When `user_id` is given the order must belong to that user.
+    The DB is only read when the order is not resting in any book.
+    """
+    row = None
+    symbol = matching_engine.locate_order(order_id)
+    if symbol is not None:
+        entry = matching_engine.get_book(symbol).find_order(order_id)
+        if entry is not None and user_id is not None and entry.user_id != user_id:
+            raise HTTPException(status_code=403, detail="Not your order")
+    else:
+        row = await db.get_order_by_id(order_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if user_id is not None and str(row["user_id"]) != user_id:
+            raise HTTPException(status_code=403, detail="Not your order")
+        _ensure_cancellable(row)
+        # May still be queued behind earlier work in its worker
+        symbol = row["symbol"]
+
+    cancelled = await matching_engine.submit_cancel(symbol, order_ids=[order_id])
+    if cancelled:
+        return {"cancelled": True, "order_id": order_id, "removed_from_book": True}
+
+    # Not in the book once the worker got to it: filled meanwhile, or never rested
+    row = await db.get_order_by_id(order_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Order not found")
+    _ensure_cancellable(row)
+    await db.update_order(order_id, "cancelled", float(row["remaining_qty"]))
+    registry.update(order_id, "cancelled", float(row["remaining_qty"]))
+    # Whatever it still held is free now, even if the hold outlived the book entry
+    ledger.release(order_id)
+    await db.upsert_balances(ledger.drain_dirty())
+    return {"cancelled": True, "order_id": order_id, "removed_from_book": False}
+
+
+def _ensure_cancellable(row: dict, action: str = "cancel"):
+    if row["status"] not in ("open", "partial"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot {action} order with status '{row['status']}'"
+        )
+
+
+async def amend_order(
+    order_id: str, price: float | None, quantity: float | None, user_id: str | None = None
+) -> dict:
+    """Amend a resting order inside its symbol worker (see OrderBook.amend_order)."""
+    if price is None and quantity is None:
+        raise HTTPException(status_code=400, detail="Nothing to amend")
+
+    symbol = matching_engine.locate_order(order_id)
+    if symbol is not None:
+        entry = matching_engine.get_book(symbol).find_order(order_id)
+        if entry is not None and user_id is not None and entry.user_id != user_id:
+            raise HTTPException(status_code=403, detail="Not your order")
+    else:
+        row = await db.get_order_by_id(order_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if user_id is not None and str(row["user_id"]) != user_id:
+            raise HTTPException(status_code=403, detail="Not your order")
+        _ensure_cancellable(row, "amend")
+        symbol = row["symbol"]
+
+    try:
+        result = await matching_engine.submit_amend(symbol, order_id, price, quantity)
+    except LedgerError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=400, detail="Order is no longer resting")
+
+    order = result["order"]
+    entry = result["entry"]
+    trades = result["trades"]
+    return {
+        "order_id": order_id,
+        "price": entry.price if entry else order.price,
+        "remaining_qty": entry.remaining if entry else 0.0,
+        "priority_kept": result["priority_kept"],
+        "trades_executed": len(trades),
+        "trades": [
+            {"id": t.id, "price": t.price, "quantity": t.quantity, "aggressor_side": t.aggressor_side}
+            for t in trades
+        ],
+    }
+
+
+async def get_order(order_id: str) -> dict:
+    """Live / recent orders from the engine's registry; the DB only on a miss."""
+    order = registry.get(order_id)
+    if order is None:
+        order = await db.get_order_by_id(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order
+
+
+async def cancel_all(user_id: str, symbol: str | None = None) -> dict:
+    """Cancel every resting order of `user_id` (optionally on one symbol); one write per symbol."""
+    symbols = [symbol] if symbol else matching_engine.symbols_with_orders(user_id)
+    results = await asyncio.gather(
+        *(matching_engine.submit_cancel(s, user_id=user_id) for s in symbols)
+    )
+    cancelled = [e.order_id for entries in results for e in entries]
+    return {"cancelled": len(cancelled), "order_ids": cancelled}
@@ -0,0 +1,95 @@
+"""
+Per-user, per-symbol positions. Fully synchronous — no I/O.
+
+Each Trade is folded in O(1) as it is produced: signed quantity, average
+entry price of the open position, and realized P&L from any reduction.
+Unrealized P&L is marked at read time against the live BBO — longs at
+the bid, shorts at the ask — falling back to the last trade price.
+On startup the book is rebuilt by replaying every stored trade
+(matching_engine.restore_positions).
+"""
+
+from src.models.trade import Trade
+
+
+class Position:
+    __slots__ = ("quantity", "avg_price", "realized_pnl")
+
+    def __init__(self):
+        self.quantity = 0.0      # > 0 long, < 0 short
+        self.avg_price = 0.0
+        self.realized_pnl = 0.0
+
+    def apply(self, signed_qty: float, price: float):
+        qty = self.quantity
+        if qty == 0 or (qty > 0) == (signed_qty > 0):
+            # Opening or adding: volume-weighted entry price
+            new_qty = qty + signed_qty
+            self.avg_price = (abs(qty) * self.avg_price + abs(signed_qty) * price) / abs(new_qty)
+            self.quantity = new_qty
+            return
+
+        closed = min(abs(qty), abs(signed_qty))
+        direction = 1.0 if qty > 0 else -1.0
+        self.realized_pnl += closed * (price - self.avg_price) * direction
+        self.quantity = qty + signed_qty
+        if self.quantity == 0:
+            self.avg_price = 0.0
+        elif (self.quantity > 0) != (qty > 0):
+            # Flipped through flat: the remainder opens at this price
+            self.avg_price = price
+
+    def mark(self, bbo: dict | None, last_price: float | None) -> float | None:
+        if self.quantity == 0:
+            return None
+        return (bbo or {}).get("bid" if self.quantity > 0 else "ask") or last_price
+
+    def to_dict(self, symbol: str, bbo: dict | None = None, last_price: float | None = None) -> dict:
+        mark = self.mark(bbo, last_price)
+        unrealized = (mark - self.avg_price) * self.quantity if mark is not None else 0.0
+        return {
+            "symbol": symbol,
+            "quantity": self.quantity,
+            "avg_price": self.avg_price,
+            "realized_pnl": self.realized_pnl,
+            "mark_price": mark,
+            "unrealized_pnl": unrealized,
+        }
+
+
+class PositionBook:
+    def __init__(self):
+        # user_id → symbol → Position
+        self._positions: dict[str, dict[str, Position]] = {}
+
+    def get(self, user_id: str, symbol: str) -> Position | None:
+        return self._positions.get(user_id, {}).get(symbol)
+
+    def for_user(self, user_id: str) -> dict[str, Position]:
+        return self._positions.get(user_id, {})
+
+    def on_trade(self, trade: Trade) -> list[str]:
+        """Fold one fill into both sides' positions. Returns the user ids touched."""
+        return self.add(trade.symbol, trade.buyer_id, trade.seller_id, trade.price, trade.quantity)
+
+    def add(self, symbol: str, buyer_id: str | None, seller_id: str | None, price: float, qty: float) -> list[str]:
+        """Fold one fill given as plain values (startup replay of stored trades)."""
+        touched = []
+        for user_id, signed_qty in ((buyer_id, qty), (seller_id, -qty)):
+            if user_id is None:
+                continue
+            account = self._positions.get(user_id)
+            if account is None:
+                account = self._positions[user_id] = {}
+            position = account.get(symbol)
+            if position is None:
+                position = account[symbol] = Position()
+            position.apply(signed_qty, price)
+            touched.append(user_id)
+        return touched
+
+    def clear(self):
+        self._positions.clear()
+
+
+positions = PositionBook()
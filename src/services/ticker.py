@@ -0,0 +1,120 @@
+"""
+Rolling 24h ticker statistics. Fully synchronous — no I/O.
+
+Trades are folded into fixed-width time buckets. Volume / notional / count
+are running sums adjusted as buckets enter and leave the window; high and
+low come from monotonic deques over bucket extremes. Every update and
+expiry is O(1) amortized per trade.
+"""
+
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from src.models.trade import Trade
+
+
+def _epoch(ts: datetime) -> float:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class RollingTicker:
+    def __init__(self, symbol: str, window_seconds: int = 24 * 3600, bucket_seconds: int = 60):
+        self.symbol = symbol
+        self.window = window_seconds
+        self.bucket_seconds = bucket_seconds
+
+        # Each bucket: [start, open, high, low, volume, notional, trades]
+        self._buckets: deque[list] = deque()
+        # (bucket start, value) — non-increasing highs / non-decreasing lows
+        self._highs: deque[tuple[int, float]] = deque()
+        self._lows: deque[tuple[int, float]] = deque()
+
+        self.volume = 0.0
+        self.notional = 0.0
+        self.trades = 0
+        self.last_price: float | None = None
+        self.last_qty: float | None = None
+        self.last_ts: float | None = None
+
+    def on_trade(self, trade: Trade):
+        self.add(trade.price, trade.quantity, trade.timestamp)
+
+    def add(self, price: float, qty: float, timestamp: datetime):
+        ts = _epoch(timestamp)
+        start = int(ts // self.bucket_seconds) * self.bucket_seconds
+
+        if self._buckets and self._buckets[-1][0] == start:
+            bucket = self._buckets[-1]
+            bucket[2] = max(bucket[2], price)
+            bucket[3] = min(bucket[3], price)
+        elif not self._buckets or start > self._buckets[-1][0]:
+            bucket = [start, price, price, price, 0.0, 0.0, 0]
+            self._buckets.append(bucket)
+        else:
+            # Out-of-order trade older than the current bucket — fold into the newest
+            # bucket so the deques stay monotonic in time.
+            bucket = self._buckets[-1]
+            bucket[2] = max(bucket[2], price)
+            bucket[3] = min(bucket[3], price)
+            start = bucket[0]
+
+        bucket[4] += qty
+        bucket[5] += price * qty
+        bucket[6] += 1
+
+        while self._highs and self._highs[-1][1] <= price:
+            self._highs.pop()
+        self._highs.append((start, price))
+        while self._lows and self._lows[-1][1] >= price:
+            self._lows.pop()
+        self._lows.append((start, price))
+
+        self.volume += qty
+        self.notional += price * qty
+        self.trades += 1
+        if self.last_ts is None or ts >= self.last_ts:
+            self.last_price, self.last_qty, self.last_ts = price, qty, ts
+
+        self._expire(ts)
+
+    def _expire(self, now: float):
+        cutoff = now - self.window
+        while self._buckets and self._buckets[0][0] + self.bucket_seconds <= cutoff:
+            start, _, _, _, vol, notional, count = self._buckets.popleft()
+            self.volume -= vol
+            self.notional -= notional
+            self.trades -= count
+            while self._highs and self._highs[0][0] <= start:
+                self._highs.popleft()
+            while self._lows and self._lows[0][0] <= start:
+                self._lows.popleft()
+        if not self._buckets:
+            # Clamp float drift once the window is empty
+            self.volume = self.notional = 0.0
+            self.trades = 0
+
+    def snapshot(self, now: float | None = None) -> dict:
+        self._expire(time.time() if now is None else now)
+        open_price = self._buckets[0][1] if self._buckets else None
+        change = (
+            self.last_price - open_price
+            if self._buckets and self.last_price is not None
+            else None
+        )
+        return {
+            "symbol": self.symbol,
+            "last_price": self.last_price,
+            "last_qty": self.last_qty,
+            "open": open_price,
+            "high": self._highs[0][1] if self._highs else None,
+            "low": self._lows[0][1] if self._lows else None,
+            "volume": self.volume,
+            "quote_volume": self.notional,
+            "vwap": self.notional / self.volume if self.volume > 0 else None,
+            "trades": self.trades,
+            "change": change,
+            "change_pct": change / open_price * 100 if change is not None and open_price else None,
+        }
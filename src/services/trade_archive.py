@@ -0,0 +1,204 @@
+"""
+Columnar archive for historical trades.
+
+Trades older than `archive_after_days` are rolled out of the `trades` table
+into one compressed column file per (symbol, UTC day):
+
+    {archive_dir}/{symbol}/{YYYY-MM-DD}.npz
+
+Each file holds parallel arrays (ts, price, quantity, id, buyer_id, seller_id)
+so history / VWAP / volume queries are vectorized NumPy scans that never
+touch the primary database.
+"""
+
+import asyncio
+import os
+from datetime import date, datetime, time, timedelta, timezone
+
+import numpy as np
+
+from src.utils.config import settings
+from src.utils.logger import logger
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _to_micros(dt: datetime) -> int:
+    """Naive-UTC (or aware) datetime → integer microseconds since epoch."""
+    return (_naive_utc(dt) - _EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(us))
+
+
+def _day_path(symbol: str, day: date, root: str | None = None) -> str:
+    return os.path.join(root or settings.archive_dir, symbol, f"{day.isoformat()}.npz")
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def write_day(symbol: str, day: date, rows: list[dict], root: str | None = None) -> str:
+    """
+    Write one day of trades as a compressed column file.
+    Merges with an existing file for the same day (deduplicated by id) so
+    a crash between write and delete never loses or doubles trades.
+    """
+    path = _day_path(symbol, day, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    columns = {
+        "ts": np.fromiter((_to_micros(r["timestamp"]) for r in rows), dtype=np.int64, count=len(rows)),
+        "price": np.fromiter((float(r["price"]) for r in rows), dtype=np.float64, count=len(rows)),
+        "quantity": np.fromiter((float(r["quantity"]) for r in rows), dtype=np.float64, count=len(rows)),
+        "id": np.array([str(r["id"]) for r in rows], dtype="U36"),
+        "buyer_id": np.array([str(r["buyer_id"]) if r.get("buyer_id") else "" for r in rows], dtype="U36"),
+        "seller_id": np.array([str(r["seller_id"]) if r.get("seller_id") else "" for r in rows], dtype="U36"),
+    }
+
+    if os.path.exists(path):
+        existing = load_day(symbol, day, root)
+        columns = {k: np.concatenate([existing[k], columns[k]]) for k in columns}
+        _, keep = np.unique(columns["id"], return_index=True)
+        columns = {k: v[keep] for k, v in columns.items()}
+
+    order = np.argsort(columns["ts"], kind="stable")
+    columns = {k: v[order] for k, v in columns.items()}
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, **columns)
+    os.replace(tmp, path)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def load_day(symbol: str, day: date, root: str | None = None) -> dict[str, np.ndarray]:
+    with np.load(_day_path(symbol, day, root)) as data:
+        return {k: data[k] for k in data.files}
+
+
+def archived_symbols(root: str | None = None) -> list[str]:
+    root = root or settings.archive_dir
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+
+
+def archived_days(symbol: str, root: str | None = None) -> list[date]:
+    """Archived UTC days for `symbol`, oldest first."""
+    directory = os.path.join(root or settings.archive_dir, symbol)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(date.fromisoformat(name[:-4]) for name in os.listdir(directory) if name.endswith(".npz"))
+
+
+def _scan(symbol: str, start: datetime, end: datetime, root: str | None = None):
+    """Yield (columns, mask) for every archived day overlapping [start, end)."""
+    start, end = _naive_utc(start), _naive_utc(end)
+    lo, hi = _to_micros(start), _to_micros(end)
+    day = start.date()
+    while day <= end.date():
+        if os.path.exists(_day_path(symbol, day, root)):
+            cols = load_day(symbol, day, root)
+            ts = cols["ts"]
+            mask = (ts >= lo) & (ts < hi)
+            if mask.any():
+                yield cols, mask
+        day += timedelta(days=1)
+
+
+def query_history(
+    symbol: str, start: datetime, end: datetime, limit: int = 1000, root: str | None = None
+) -> list[dict]:
+    """Archived trades in [start, end), oldest first."""
+    result = []
+    for cols, mask in _scan(symbol, start, end, root):
+        idx = np.flatnonzero(mask)[: limit - len(result)]
+        for i in idx:
+            result.append({
+                "id": str(cols["id"][i]),
+                "symbol": symbol,
+                "price": float(cols["price"][i]),
+                "quantity": float(cols["quantity"][i]),
+                "buyer_id": str(cols["buyer_id"][i]) or None,
+                "seller_id": str(cols["seller_id"][i]) or None,
+                "timestamp": _from_micros(cols["ts"][i]),
+            })
+        if len(result) >= limit:
+            break
+    return result
+
+
+def query_stats(symbol: str, start: datetime, end: datetime, root: str | None = None) -> dict:
+    """Trade count, volume, notional, VWAP, high and low over archived trades in [start, end)."""
+    count = 0
+    volume = 0.0
+    notional = 0.0
+    high = None
+    low = None
+    for cols, mask in _scan(symbol, start, end, root):
+        price = cols["price"][mask]
+        qty = cols["quantity"][mask]
+        count += int(price.size)
+        volume += float(qty.sum())
+        notional += float(np.dot(price, qty))
+        high = float(price.max()) if high is None else max(high, float(price.max()))
+        low = float(price.min()) if low is None else min(low, float(price.min()))
+
+    return {
+        "symbol": symbol,
+        "start": start,
+        "end": end,
+        "trades": count,
+        "volume": volume,
+        "notional": notional,
+        "vwap": notional / volume if volume else None,
+        "high": high,
+        "low": low,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Background archiver
+# ---------------------------------------------------------------------------
+
+async def archive_once() -> int:
+    """Move every full (symbol, day) older than the cutoff out of Postgres. Returns days archived."""
+    from src.services import db
+
+    cutoff = datetime.combine(
+        datetime.now(timezone.utc).date() - timedelta(days=settings.archive_after_days), time.min
+    )
+    archived = 0
+    for symbol, day in await db.get_archivable_trade_days(cutoff):
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        rows = [row async for row in db.stream_trades(symbol, start, end)]
+        if rows:
+            await asyncio.to_thread(write_day, symbol, day, rows)
+            await db.delete_trades(symbol, start, end)
+            logger.info(f"[Archive] {symbol} {day}: archived {len(rows)} trades")
+        archived += 1
+    return archived
+
+
+async def run_archiver():
+    """Periodic archiver task started from the app lifespan."""
+    while True:
+        try:
+            await archive_once()
+        except Exception as e:
+            logger.error(f"[Archive] run failed: {e}", exc_info=True)
+        await asyncio.sleep(settings.archive_interval_seconds)
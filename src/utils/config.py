@@ -8,6 +8,53 @@ class Settings(BaseSettings):
     jwt_algorithm: str = "HS256"
     jwt_expire_minutes: int = 60 * 24  # 24 hours
 
+    # Validated tokens and user records are cached (LRU, per-entry TTL);
+    # bcrypt runs on a dedicated pool of this many threads
+    auth_cache_size: int = 10_000
+    auth_cache_ttl_seconds: float = 60.0
+    bcrypt_workers: int = 2
+
+    # Columnar trade archive
+    archive_dir: str = "data/archive"
+    archive_after_days: int = 7
+    archive_interval_seconds: int = 60 * 60
+
+    # OHLCV candles
+    candle_max_bars: int = 2000
+    candle_backfill_hours: int = 24
+
+    # Long-poll cap for GET /orderbook and /bbo
+    longpoll_max_seconds: float = 30.0
+
+    # Cancel-on-disconnect grace period for /ws/orders sessions
+    cod_grace_seconds: float = 5.0
+
+    # Order expiry: DAY orders expire at this UTC time; due expiries are
+    # cancelled by the symbol worker in batches of at most this many
+    session_close_utc: str = "00:00"
+    expiry_batch_size: int = 500
+
+    # Default self-trade prevention mode (see SelfTradePrevention)
+    stp_mode: str = "cancel_newest"
+
+    # Account ledger (opt-in): with risk checks on, orders hold balance up
+    # front and fills settle against it. Symbols split as <base><quote> on
+    # these suffixes; market / stop buys hold reference price × (1 + collar)
+    risk_checks: bool = False
+    quote_assets: list[str] = ["USDT", "USDC", "USD", "BTC", "ETH"]
+    market_hold_collar: float = 0.05
+
+    # Per-user /ws/user replay buffer (messages kept for resume); a user's
+    # buffer is dropped this long after their last session disconnects
+    user_stream_replay: int = 1000
+    user_stream_idle_seconds: float = 300.0
+
+    # Live order registry behind GET /orders/{id} (LRU-bounded)
+    order_registry_size: int = 100_000
+
+    # Idempotent POST /orders: recent client_order_ids remembered per user
+    client_order_ids_per_user: int = 10_000
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from src.services import auth_service, db
+from src.services.auth_service import TTLCache
+
+
+def test_ttl_cache_expires_and_evicts(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_size=2, ttl=10.0)
+
+    cache.put("a", 1)
+    cache.put("b", 2, ttl=1.0)       # shorter than the cache TTL
+    cache.get("a")
+    cache.put("c", 3)                # evicts b, the least recently used
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    now[0] += 10.0
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+def test_decode_token_is_cached_until_token_expiry():
+    token = auth_service.create_access_token("user-1")
+    assert auth_service.decode_token(token) == "user-1"
+    assert auth_service._tokens.get(token) == "user-1"
+
+    auth_service.invalidate_token(token)
+    assert auth_service._tokens.get(token) is None
+
+    with pytest.raises(HTTPException):
+        auth_service.decode_token("not-a-token")
+    assert auth_service._tokens.get("not-a-token") is None
+
+
+@pytest.mark.asyncio
+async def test_user_lookup_is_cached_and_invalidated(monkeypatch):
+    calls = []
+
+    async def get_user_by_id(user_id):
+        calls.append(user_id)
+        return {"id": user_id} if user_id == "u1" else None
+
+    monkeypatch.setattr(db, "get_user_by_id", get_user_by_id)
+    auth_service._users.clear()
+
+    token = auth_service.create_access_token("u1")
+    assert (await auth_service.authenticate(token))["id"] == "u1"
+    await auth_service.authenticate(token)
+    assert calls == ["u1"]
+
+    auth_service.invalidate_user("u1")
+    await auth_service.get_user("u1")
+    assert calls == ["u1", "u1"]
+
+    # Unknown users are not cached
+    with pytest.raises(HTTPException):
+        await auth_service.authenticate(auth_service.create_access_token("ghost"))
+    await auth_service.get_user("ghost")
+    assert calls.count("ghost") == 2
+
+
+@pytest.mark.asyncio
+async def test_bcrypt_runs_off_the_event_loop():
+    hashed = await auth_service.hash_password("s3cret")
+    assert await auth_service.verify_password("s3cret", hashed)
+    assert not await auth_service.verify_password("wrong", hashed)
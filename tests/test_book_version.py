@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from src.models.order import Order, OrderType, Side
+from src.services.order_book import OrderBook
+
+
+def limit(side, price, qty):
+    return Order(symbol="BTCUSDT", side=side, type=OrderType.LIMIT, price=price, quantity=qty)
+
+
+def test_version_bumps_on_mutation_only():
+    book = OrderBook("BTCUSDT")
+    assert book.version == 0
+
+    resting = limit(Side.SELL, 100.0, 1.0)
+    book.match(resting)
+    assert book.version == 1
+
+    # Non-crossing IOC changes nothing
+    book.match(Order(symbol="BTCUSDT", side=Side.BUY, type=OrderType.IOC, price=90.0, quantity=1.0))
+    assert book.version == 1
+
+    book.cancel_order(resting.id)
+    assert book.version == 2
+    assert book.cancel_order(resting.id) is False
+    assert book.version == 2
+
+
+def test_depth_json_memoized_per_version():
+    book = OrderBook("BTCUSDT")
+    book.match(limit(Side.BUY, 99.0, 1.0))
+
+    first = book.get_depth_json(5)
+    assert book.get_depth_json(5) is first
+    assert json.loads(first)["version"] == 1
+
+    book.match(limit(Side.BUY, 98.0, 1.0))
+    second = book.get_depth_json(5)
+    assert second is not first
+    assert len(json.loads(second)["bids"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_depth_delta_levels_match_snapshot_encoding():
+    from src.api import main
+
+    book = OrderBook("DLTUSDT")
+    book.match(Order(symbol="DLTUSDT", side=Side.BUY, type=OrderType.LIMIT, price=98.0, quantity=1.5))
+    sent = []
+
+    class Client:
+        async def send_text(self, text):
+            sent.append(json.loads(text))
+
+    book.market_clients.append(Client())
+    await main._broadcast_depth_delta(book, {"symbol": "DLTUSDT", "version": 7, "bids": [[98.0, 0.0], [99.0, 1.5]], "asks": []})
+
+    snapshot = json.loads(book.get_depth_json())
+    assert sent[0]["data"]["bids"] == [["98.0", "0.0"], ["99.0", "1.5"]]
+    assert snapshot["bids"] == [["98.0", "1.5"]]
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+from src.services.candles import CandleAggregator
+
+T0 = datetime(2026, 1, 5, 10, 0, tzinfo=timezone.utc)
+
+
+def test_bars_roll_per_interval():
+    agg = CandleAggregator("BTCUSDT")
+    agg.add(100.0, 1.0, T0)
+    agg.add(105.0, 2.0, T0 + timedelta(seconds=10))
+    agg.add(95.0, 1.0, T0 + timedelta(seconds=30))
+    agg.add(101.0, 1.0, T0 + timedelta(minutes=1, seconds=5))
+
+    bars = agg.query("1m")
+    assert len(bars) == 2
+    first = bars[0]
+    assert (first["open"], first["high"], first["low"], first["close"]) == (100.0, 105.0, 95.0, 95.0)
+    assert first["volume"] == 4.0
+    assert first["trades"] == 3
+    assert bars[1]["open"] == 101.0
+
+    assert len(agg.query("1s")) == 4
+    assert len(agg.query("1h")) == 1
+
+
+def test_query_range_and_limit():
+    agg = CandleAggregator("BTCUSDT")
+    for i in range(10):
+        agg.add(100.0 + i, 1.0, T0 + timedelta(minutes=i))
+
+    bars = agg.query("1m", start=T0 + timedelta(minutes=3), end=T0 + timedelta(minutes=6))
+    assert [b["open"] for b in bars] == [103.0, 104.0, 105.0]
+
+    assert [b["open"] for b in agg.query("1m", limit=2)] == [108.0, 109.0]
+
+
+def test_late_trade_updates_existing_bar():
+    agg = CandleAggregator("BTCUSDT")
+    agg.add(100.0, 1.0, T0)
+    agg.add(110.0, 1.0, T0 + timedelta(minutes=2))
+    agg.add(90.0, 1.0, T0 + timedelta(seconds=20))
+
+    bars = agg.query("1m")
+    assert len(bars) == 2
+    assert bars[0]["low"] == 90.0
+    assert bars[0]["volume"] == 2.0
+
+
+def test_retention_is_bounded():
+    agg = CandleAggregator("BTCUSDT", max_bars=5)
+    for i in range(50):
+        agg.add(100.0, 1.0, T0 + timedelta(seconds=i))
+    assert len(agg.series["1s"]._starts) <= 10
+    assert len(agg.query("1s", limit=100)) >= 5
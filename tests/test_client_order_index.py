@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from src.models.order import OrderCreate
+from src.services import db, order_service
+from src.services.client_order_index import ClientOrderIndex, client_orders
+
+
+def body(coid="c1", **kw):
+    return OrderCreate(symbol="BTCUSDT", side="buy", type="limit", price=100.0, quantity=1.0,
+                       client_order_id=coid, **kw)
+
+
+@pytest.fixture
+def placed(monkeypatch):
+    """Count orders that reach the write path; matching resolves with no trades."""
+    calls = []
+
+    async def enqueue_order(order):
+        calls.append(order.id)
+        await asyncio.sleep(0.01)
+        fut = asyncio.get_running_loop().create_future()
+        fut.set_result([])
+        return fut
+
+    monkeypatch.setattr(order_service, "enqueue_order", enqueue_order)
+    client_orders._users.clear()
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_index_is_bounded_per_user():
+    index = ClientOrderIndex(max_per_user=2)
+    a = index.claim("u", "a")
+    index.claim("u", "b")
+    index.get("u", "a")                  # b is now the oldest
+    index.claim("u", "c")
+
+    assert index.get("u", "a") is a
+    assert index.get("u", "b") is None
+    assert index.get("other", "a") is None
+
+
+@pytest.mark.asyncio
+async def test_failed_submission_is_forgotten():
+    index = ClientOrderIndex(max_per_user=10)
+    fut = index.claim("u", "a")
+    index.fail("u", "a", fut, ValueError("rejected"))
+
+    assert index.get("u", "a") is None
+    with pytest.raises(ValueError):
+        fut.result()
+
+
+@pytest.mark.asyncio
+async def test_retries_return_the_original_result(placed):
+    first, retry = await asyncio.gather(
+        order_service.place_order(body(), "u1"),
+        order_service.place_order(body(), "u1"),
+    )
+    later = await order_service.place_order(body(), "u1")
+
+    assert len(placed) == 1
+    assert first[0].id == retry[0].id == later[0].id
+    assert first[0].client_order_id == "c1"
+
+    # Same id, different user: a different order
+    other, _ = await order_service.place_order(body(), "u2")
+    assert other.id != first[0].id and len(placed) == 2
+
+
+@pytest.mark.asyncio
+async def test_client_order_id_requires_a_user(placed):
+    with pytest.raises(HTTPException) as e:
+        await order_service.place_order(body(), None)
+    assert e.value.status_code == 400
+    assert placed == []
+
+
+@pytest.mark.asyncio
+async def test_evicted_id_falls_back_to_the_stored_order(monkeypatch):
+    client_orders._users.clear()
+
+    async def enqueue_order(order):
+        raise db.DuplicateClientOrderId(order.client_order_id)
+
+    async def get_orders_by_client_ids(user_id, coids):
+        return [{
+            "id": "11111111-1111-1111-1111-111111111111", "user_id": user_id, "symbol": "BTCUSDT",
+            "side": "buy", "type": "limit", "price": 100, "quantity": 1, "remaining_qty": 0,
+            "status": "filled", "created_at": datetime(2026, 1, 1), "stop_price": None,
+            "display_qty": None, "time_in_force": "gtc", "expire_at": None, "client_order_id": coids[0],
+        }]
+
+    monkeypatch.setattr(order_service, "enqueue_order", enqueue_order)
+    monkeypatch.setattr(db, "get_orders_by_client_ids", get_orders_by_client_ids)
+
+    order, trades = await order_service.place_order(body(), "u1")
+    assert order.id == "11111111-1111-1111-1111-111111111111"
+    assert (order.status.value, order.remaining_qty, trades) == ("filled", 0.0, [])
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from src.api.routes.orderbook import get_impact
+
+from src.models.order import Order, OrderType, Side
+from src.services import depth_analytics
+from src.services.order_book import OrderBook
+
+
+def make_book():
+    book = OrderBook("BTCUSDT")
+    for price, qty in [(101.0, 1.0), (102.0, 2.0), (104.0, 3.0)]:
+        book.match(Order(symbol="BTCUSDT", side=Side.SELL, type=OrderType.LIMIT, price=price, quantity=qty))
+    book.match(Order(symbol="BTCUSDT", side=Side.BUY, type=OrderType.LIMIT, price=99.0, quantity=5.0))
+    return book
+
+
+def test_depth_arrays_snapshot():
+    book = make_book()
+    snap = book.get_depth_arrays(levels=2)
+    prices, qtys = snap["asks"]
+    assert prices.tolist() == [101.0, 102.0]
+    assert qtys.tolist() == [1.0, 2.0]
+    assert snap["bids"][0].tolist() == [99.0]
+
+
+def test_impact_cost_for_sizes():
+    book = make_book()
+    prices, qtys = book.get_depth_arrays()["asks"]
+    result = depth_analytics.impact_cost(prices, qtys, np.array([0.5, 3.0, 10.0]), "buy")
+
+    assert result[0]["avg_price"] == 101.0
+    assert result[0]["slippage_bps"] == 0.0
+    assert result[1]["avg_price"] == (101.0 + 204.0) / 3.0
+    assert result[1]["levels"] == 2
+    # Book only has 6 units
+    assert result[2]["filled"] == 6.0
+    assert result[2]["cost"] == 101.0 + 204.0 + 312.0
+    assert result[2]["worst_price"] == 104.0
+
+
+def test_impact_cost_empty_side():
+    result = depth_analytics.impact_cost(np.array([]), np.array([]), [1.0], "sell")
+    assert result[0]["avg_price"] is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sizes", ["nan", "inf", "-1", "0", "1,-inf", ","])
+async def test_impact_rejects_non_finite_or_non_positive_sizes(sizes):
+    with pytest.raises(HTTPException) as e:
+        await get_impact("BTCUSDT", sizes=sizes, levels=10)
+    assert e.value.status_code == 400
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from src.services import disconnect_guard, order_service
+from src.utils.config import settings
+
+
+@pytest.fixture
+def sweeps(monkeypatch):
+    swept = []
+
+    async def cancel_all(user_id, symbol=None):
+        swept.append(user_id)
+        return {"cancelled": 2}
+
+    monkeypatch.setattr(order_service, "cancel_all", cancel_all)
+    monkeypatch.setattr(settings, "cod_grace_seconds", 0.05)
+    monkeypatch.setattr(disconnect_guard, "_live", {})
+    monkeypatch.setattr(disconnect_guard, "_pending", {})
+    return swept
+
+
+@pytest.mark.asyncio
+async def test_sweep_runs_after_the_last_session_drops(sweeps):
+    disconnect_guard.session_opened("u1")
+    disconnect_guard.session_opened("u1")
+
+    disconnect_guard.session_closed("u1")
+    assert "u1" not in disconnect_guard._pending       # one session still live
+
+    disconnect_guard.session_closed("u1")
+    assert "u1" in disconnect_guard._pending
+    await asyncio.sleep(0.02)
+    assert sweeps == []                                # still inside the grace period
+
+    await disconnect_guard._pending["u1"]
+    assert sweeps == ["u1"]
+    assert disconnect_guard._pending == {}
+
+
+@pytest.mark.asyncio
+async def test_reconnecting_inside_the_grace_period_cancels_the_sweep(sweeps):
+    disconnect_guard.session_opened("u1")
+    disconnect_guard.session_closed("u1")
+    sweep = disconnect_guard._pending["u1"]
+
+    disconnect_guard.session_opened("u1")
+    await asyncio.sleep(0.1)
+
+    assert sweep.cancelled()
+    assert sweeps == []
+    assert disconnect_guard._live == {"u1": 1}
@@ -0,0 +1,162 @@
+from datetime import datetime
+
+import pytest
+
+from src.models.order import Order, OrderType, Side
+from src.services import db, matching_engine, order_service
+from src.services import ledger as ledger_module
+from src.services.ledger import InsufficientBalance, Ledger, LedgerError, split_symbol
+from src.services.order_book import OrderBook
+from src.utils.config import settings
+
+
+@pytest.fixture(autouse=True)
+def risk_checks(monkeypatch):
+    monkeypatch.setattr(settings, "risk_checks", True)
+
+
+def order(side, price, qty, user_id, type=OrderType.LIMIT):
+    return Order(symbol="BTCUSDT", side=side, type=type, price=price, quantity=qty, user_id=user_id)
+
+
+def funded():
+    ledger = Ledger()
+    ledger.deposit("buyer", "USDT", 1000.0)
+    ledger.deposit("seller", "BTC", 5.0)
+    return ledger
+
+
+def test_orders_bypass_the_ledger_when_checks_are_off(monkeypatch):
+    monkeypatch.setattr(settings, "risk_checks", False)
+    ledger = Ledger()
+    bid = Order(symbol="NOQUOTE", side=Side.BUY, type=OrderType.LIMIT, price=100.0, quantity=1.0, user_id="u")
+    ledger.hold_order(bid)          # unfunded, unknown quote asset: not checked
+    assert ledger.held_for(bid.id) == 0.0
+    assert ledger.snapshot("u") == {}
+
+
+def test_split_symbol():
+    assert split_symbol("BTCUSDT") == ("BTC", "USDT")
+    assert split_symbol("ETHBTC") == ("ETH", "BTC")
+    with pytest.raises(LedgerError):
+        split_symbol("XYZ")
+
+
+def test_hold_rejects_and_reserves():
+    ledger = funded()
+    with pytest.raises(InsufficientBalance):
+        ledger.hold_order(order(Side.BUY, 100.0, 11.0, "buyer"))
+
+    bid = order(Side.BUY, 100.0, 4.0, "buyer")
+    ledger.hold_order(bid)
+    assert ledger.snapshot("buyer")["USDT"] == {"available": 600.0, "held": 400.0}
+
+    ledger.release(bid.id)
+    assert ledger.snapshot("buyer")["USDT"] == {"available": 1000.0, "held": 0.0}
+
+
+def test_fill_moves_assets_and_releases_price_improvement():
+    ledger = funded()
+    book = OrderBook("BTCUSDT")
+    ask = order(Side.SELL, 90.0, 2.0, "seller")
+    bid = order(Side.BUY, 100.0, 1.0, "buyer")
+    ledger.hold_order(ask)
+    ledger.hold_order(bid)
+    book.match(ask)
+
+    trades = book.match(bid)
+    for trade in trades:
+        ledger.apply_trade(trade, "BTC", "USDT")
+    for order_id in (ask.id, bid.id):
+        ledger.sync_entry(order_id, book.get_entry(order_id), "BTCUSDT")
+
+    assert ledger.snapshot("buyer") == {
+        "USDT": {"available": 910.0, "held": 0.0},
+        "BTC": {"available": 1.0, "held": 0.0},
+    }
+    assert ledger.snapshot("seller") == {
+        "BTC": {"available": 3.0, "held": 1.0},
+        "USDT": {"available": 90.0, "held": 0.0},
+    }
+
+
+def test_market_buy_holds_at_collared_reference_price():
+    ledger = funded()
+    market = order(Side.BUY, 0.0, 1.0, "buyer", type=OrderType.MARKET)
+    with pytest.raises(LedgerError):
+        ledger.hold_order(market)
+
+    ledger.hold_order(market, reference_price=100.0)
+    assert ledger.held_for(market.id) == pytest.approx(105.0)
+
+
+def test_dirty_rows_carry_increasing_versions():
+    ledger = funded()
+    first = {(u, a): v for u, a, _, _, v in ledger.drain_dirty()}
+    ledger.deposit("buyer", "USDT", 1.0)
+
+    (row,) = ledger.drain_dirty()
+    assert row[:4] == ("buyer", "USDT", 1001.0, 0.0)
+    assert row[4] > first[("buyer", "USDT")]
+    assert ledger.drain_dirty() == []
+
+
+@pytest.mark.asyncio
+async def test_restart_restores_holds_and_cancel_releases_them(monkeypatch):
+    symbol = "RSTUSDT"
+    ledger = ledger_module.ledger
+    ledger.load([{"user_id": "buyer", "asset": "USDT", "available": 700.0, "held": 300.0, "version": 4}])
+    row = {
+        "id": "22222222-2222-2222-2222-222222222222", "user_id": "buyer", "symbol": symbol,
+        "side": "buy", "type": "limit", "price": 100, "quantity": 3, "remaining_qty": 3,
+        "status": "open", "created_at": datetime(2026, 1, 1), "stop_price": None,
+        "display_qty": None, "time_in_force": "gtc", "expire_at": None, "triggered_at": None,
+    }
+
+    async def get_open_order_symbols():
+        return [symbol]
+
+    async def get_open_orders_for_symbol(s):
+        return [row]
+
+    async def persist_batch(**_):
+        pass
+
+    monkeypatch.setattr(db, "get_open_order_symbols", get_open_order_symbols)
+    monkeypatch.setattr(db, "get_open_orders_for_symbol", get_open_orders_for_symbol)
+    monkeypatch.setattr(db, "persist_batch", persist_batch)
+
+    await matching_engine.restore_books()
+    assert matching_engine.get_book(symbol).has_order(row["id"])
+    assert ledger.held_for(row["id"]) == 300.0
+
+    result = await order_service.cancel_order(row["id"], "buyer")
+    assert result["removed_from_book"]
+    assert ledger.snapshot("buyer")["USDT"] == {"available": 1000.0, "held": 0.0}
+    ledger.load([])
+
+
+@pytest.mark.asyncio
+async def test_hold_is_written_in_the_order_insert(monkeypatch):
+    ledger = ledger_module.ledger
+    ledger.load([{"user_id": "buyer", "asset": "USDT", "available": 1000.0, "held": 0.0, "version": 1}])
+    written = []
+
+    async def insert_order(row, balances=()):
+        written.append((row["id"], list(balances)))
+        if len(written) == 2:
+            raise ConnectionError("lost")
+
+    monkeypatch.setattr(db, "insert_order", insert_order)
+    monkeypatch.setattr(matching_engine, "enqueue_order", lambda order: None)
+
+    first = order(Side.BUY, 100.0, 3.0, "buyer")
+    await order_service.enqueue_order(first)
+    assert written[0] == (first.id, [("buyer", "USDT", 700.0, 300.0, 2)])
+    assert ledger.drain_dirty() == []
+
+    with pytest.raises(ConnectionError):
+        await order_service.enqueue_order(order(Side.BUY, 100.0, 1.0, "buyer"))
+    # The failed write's hold is released and the row is queued for the next write
+    assert ledger.drain_dirty() == [("buyer", "USDT", 700.0, 300.0, 4)]
+    ledger.load([])
@@ -0,0 +1,483 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from src.models.book_entry import OrderBookEntry
+from src.models.order import Order, OrderCreate, OrderStatus, OrderType, SelfTradePrevention, Side, TimeInForce
+from src.services import db, matching_engine
+from src.services.order_book import OrderBook
+
+
+def limit(side, price, qty, user_id=None):
+    return Order(symbol="BTCUSDT", side=side, type=OrderType.LIMIT, price=price, quantity=qty, user_id=user_id)
+
+
+def level(book, side, price):
+    return list((book.bids if side == Side.BUY else book.asks)[price])
+
+
+def test_cancel_removes_entry_and_user_index():
+    book = OrderBook("BTCUSDT")
+    first = limit(Side.BUY, 100.0, 1.0, "u1")
+    second = limit(Side.BUY, 100.0, 2.0, "u1")
+    book.match(first)
+    book.match(second)
+
+    assert book.cancel_order(first.id)
+    assert [e.order_id for e in level(book, Side.BUY, 100.0)] == [second.id]
+    assert [e.order_id for e in book.user_entries("u1")] == [second.id]
+
+    assert book.cancel_order(second.id)
+    assert 100.0 not in book.bids
+    assert book.user_entries("u1") == []
+
+
+def test_cancel_does_not_scan_the_level(monkeypatch):
+    book = OrderBook("BTCUSDT")
+    orders = [limit(Side.BUY, 100.0, 1.0, f"u{i}") for i in range(2000)]
+    for order in orders:
+        book.match(order)
+
+    compares = []
+    monkeypatch.setattr(OrderBookEntry, "__eq__", lambda self, other: compares.append(1) or self is other)
+    assert book.cancel_order(orders[-1].id)
+    assert book.cancel_order(orders[1000].id)
+    assert compares == []
+
+    remaining = level(book, Side.BUY, 100.0)
+    assert len(remaining) == 1998
+    assert remaining[0].order_id == orders[0].id and remaining[-1].order_id == orders[-2].id
+
+
+def test_mass_quote_places_resizes_and_cancels():
+    book = OrderBook("BTCUSDT")
+    book.mass_quote("mm", bids=[(99.0, 1.0), (98.0, 1.0)], asks=[(101.0, 1.0)])
+    other = limit(Side.BUY, 99.0, 1.0, "other")
+    book.match(other)
+
+    result = book.mass_quote("mm", bids=[(99.0, 0.5), (97.0, 2.0)], asks=[(101.0, 3.0)])
+
+    assert len(result["new"]) == 1 and result["new"][0].price == 97.0
+    assert {e.price for e in result["resized"]} == {99.0, 101.0}
+    assert [e.price for e in result["cancelled"]] == [98.0]
+    assert 98.0 not in book.bids
+
+    # Reduction kept priority ahead of the later order at 99
+    assert [(e.user_id, e.quantity) for e in level(book, Side.BUY, 99.0)] == [("mm", 0.5), ("other", 1.0)]
+    assert level(book, Side.SELL, 101.0)[0].quantity == 3.0
+
+
+def test_mass_quote_size_increase_loses_priority():
+    book = OrderBook("BTCUSDT")
+    book.mass_quote("mm", bids=[(99.0, 1.0)], asks=[])
+    book.match(limit(Side.BUY, 99.0, 1.0, "other"))
+
+    book.mass_quote("mm", bids=[(99.0, 5.0)], asks=[])
+    assert [e.user_id for e in level(book, Side.BUY, 99.0)] == ["other", "mm"]
+
+
+def test_mass_quote_empty_cancels_everything():
+    book = OrderBook("BTCUSDT")
+    book.mass_quote("mm", bids=[(99.0, 1.0)], asks=[(101.0, 1.0)])
+    result = book.mass_quote("mm", bids=[], asks=[])
+    assert len(result["cancelled"]) == 2
+    assert not book.bids and not book.asks
+
+
+def test_cancel_user_orders_only_touches_that_user():
+    book = OrderBook("BTCUSDT")
+    book.match(limit(Side.BUY, 99.0, 1.0, "u1"))
+    book.match(limit(Side.SELL, 101.0, 1.0, "u1"))
+    keep = limit(Side.BUY, 99.0, 1.0, "u2")
+    book.match(keep)
+    version = book.version
+
+    cancelled = book.cancel_user_orders("u1")
+
+    assert len(cancelled) == 2
+    assert not book.asks
+    assert [e.order_id for e in level(book, Side.BUY, 99.0)] == [keep.id]
+    assert book.version == version + 1
+    assert book.cancel_user_orders("u1") == []
+
+
+def test_amend_reduction_keeps_priority():
+    book = OrderBook("BTCUSDT")
+    first = limit(Side.SELL, 101.0, 5.0, "u1")
+    book.match(first)
+    book.match(limit(Side.SELL, 101.0, 1.0, "u2"))
+
+    result = book.amend_order(first.id, quantity=2.0)
+
+    assert result["priority_kept"]
+    assert [(e.user_id, e.quantity) for e in level(book, Side.SELL, 101.0)] == [("u1", 2.0), ("u2", 1.0)]
+
+
+def test_amend_increase_or_price_change_requeues():
+    book = OrderBook("BTCUSDT")
+    first = limit(Side.SELL, 101.0, 1.0, "u1")
+    book.match(first)
+    book.match(limit(Side.SELL, 101.0, 1.0, "u2"))
+
+    result = book.amend_order(first.id, quantity=3.0)
+    assert not result["priority_kept"]
+    assert [e.user_id for e in level(book, Side.SELL, 101.0)] == ["u2", "u1"]
+
+    book.amend_order(first.id, price=102.0)
+    assert [e.user_id for e in level(book, Side.SELL, 101.0)] == ["u2"]
+    assert book.get_entry(first.id).price == 102.0
+
+
+def test_amend_requeue_keeps_fills_and_order_fields():
+    book = OrderBook("BTCUSDT")
+    ask = limit(Side.SELL, 100.0, 5.0, "u1")
+    ask.stp = SelfTradePrevention.DECREMENT
+    ask.time_in_force = TimeInForce.GTT
+    ask.expire_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    ask.client_order_id = "c-1"
+    book.match(ask)
+    book.match(limit(Side.BUY, 100.0, 2.0, "u2"))
+
+    order = book.amend_order(ask.id, price=101.0)["order"]
+
+    assert (order.quantity, order.remaining_qty) == (5.0, 3.0)
+    assert matching_engine._final_status(book, order) == OrderStatus.PARTIAL
+    assert (order.stp, order.time_in_force, order.expire_at, order.client_order_id) == (
+        ask.stp, ask.time_in_force, ask.expire_at, "c-1"
+    )
+    assert book.get_entry(ask.id).filled == 2.0
+
+
+def test_amend_price_through_book_trades():
+    book = OrderBook("BTCUSDT")
+    book.match(limit(Side.BUY, 100.0, 1.0, "u2"))
+    ask = limit(Side.SELL, 105.0, 2.0, "u1")
+    book.match(ask)
+
+    result = book.amend_order(ask.id, price=100.0)
+
+    assert len(result["trades"]) == 1
+    assert result["trades"][0].taker_order_id == ask.id
+    assert book.get_entry(ask.id).quantity == 1.0
+    assert not book.bids
+
+
+def test_amend_unknown_order():
+    assert OrderBook("BTCUSDT").amend_order("missing", quantity=1.0) is None
+
+
+def stop(side, stop_price, qty, price=0.0, user_id=None):
+    kind = OrderType.STOP_LIMIT if price else OrderType.STOP
+    return Order(
+        symbol="BTCUSDT", side=side, type=kind, price=price, quantity=qty,
+        stop_price=stop_price, user_id=user_id,
+    )
+
+
+def test_stop_limit_requires_a_limit_price():
+    with pytest.raises(ValidationError, match="price must be positive"):
+        OrderCreate(symbol="BTCUSDT", side="buy", type="stop_limit", stop_price=100.0, quantity=1.0)
+    OrderCreate(symbol="BTCUSDT", side="buy", type="stop_limit", stop_price=100.0, price=101.0, quantity=1.0)
+    OrderCreate(symbol="BTCUSDT", side="sell", type="stop", stop_price=100.0, quantity=1.0)
+
+
+def test_stop_rests_in_trigger_book_until_price_crosses():
+    book = OrderBook("BTCUSDT")
+    book.match(limit(Side.SELL, 100.0, 1.0))
+    book.match(limit(Side.SELL, 105.0, 1.0))
+    buy_stop = stop(Side.BUY, 104.0, 1.0)
+
+    assert book.match(buy_stop) == []
+    assert book.has_order(buy_stop.id) and book.get_entry(buy_stop.id) is None
+    assert book.drain_triggered() == []
+
+    trades = book.match(limit(Side.BUY, 100.0, 1.0))
+    # 100 < 104: not triggered yet
+    assert len(trades) == 1 and not book.drain_triggered()
+
+    book.match(limit(Side.SELL, 104.0, 1.0))
+    trades = book.match(limit(Side.BUY, 104.0, 1.0))
+    assert [t.price for t in trades] == [104.0, 105.0]
+    assert trades[1].taker_order_id == buy_stop.id
+    assert book.drain_triggered() == [buy_stop]
+    assert not book.has_order(buy_stop.id)
+
+
+def test_triggered_stops_cascade_in_one_match():
+    book = OrderBook("BTCUSDT")
+    for price in (99.0, 98.0, 97.0):
+        book.match(limit(Side.BUY, price, 1.0))
+    first = stop(Side.SELL, 99.0, 1.0)
+    second = stop(Side.SELL, 98.0, 1.0)
+    untouched = stop(Side.SELL, 90.0, 1.0)
+    for order in (second, untouched, first):
+        book.match(order)
+
+    trades = book.match(limit(Side.SELL, 99.0, 1.0))
+
+    # 99 fires `first` → trades 98 → fires `second` → trades 97
+    assert [t.price for t in trades] == [99.0, 98.0, 97.0]
+    assert book.drain_triggered() == [first, second]
+    assert book.has_order(untouched.id)
+    assert not book.bids
+
+
+def test_triggered_stop_limit_rests_remainder():
+    book = OrderBook("BTCUSDT")
+    book.match(limit(Side.SELL, 100.0, 1.0))
+    book.match(limit(Side.SELL, 103.0, 5.0))
+    stop_limit = stop(Side.BUY, 100.0, 2.0, price=101.0)
+    book.match(stop_limit)
+    book.match(limit(Side.SELL, 100.0, 1.0))
+
+    book.match(limit(Side.BUY, 100.0, 1.0))
+
+    assert book.drain_triggered() == [stop_limit]
+    assert stop_limit.remaining_qty == 1.0
+    assert [e.order_id for e in level(book, Side.BUY, 101.0)] == [stop_limit.id]
+
+
+@pytest.mark.asyncio
+async def test_stop_crossed_on_arrival_is_persisted_as_triggered(monkeypatch):
+    book = OrderBook("BTCUSDT")
+    book.match(limit(Side.SELL, 100.0, 1.0))
+    book.match(limit(Side.BUY, 100.0, 1.0))          # last trade at 100
+    batches = []
+
+    async def persist_batch(**batch):
+        batches.append(batch)
+
+    monkeypatch.setattr(db, "persist_batch", persist_batch)
+
+    stop_limit = stop(Side.BUY, 99.0, 2.0, price=98.0)
+    assert await matching_engine._process(book, stop_limit) == []
+
+    assert batches[0]["triggered"] == [stop_limit.id]
+    assert [u[:2] for u in batches[0]["updates"]] == [(stop_limit.id, "open")]
+    assert book.get_entry(stop_limit.id) is not None
+
+
+def test_cancel_stop_and_user_orders():
+    book = OrderBook("BTCUSDT")
+    a = stop(Side.BUY, 110.0, 1.0, user_id="u1")
+    b = stop(Side.SELL, 90.0, 1.0, user_id="u1")
+    book.match(a)
+    book.match(b)
+    version = book.version
+
+    assert book.cancel_order(a.id)
+    assert not book.buy_stops and book.version == version
+    assert book.has_user_orders("u1")
+
+    cancelled = book.cancel_user_orders("u1")
+    assert [e.order_id for e in cancelled] == [b.id]
+    assert not book.sell_stops and not book.has_user_orders("u1")
+
+
+def iceberg(side, price, qty, display, user_id=None):
+    return Order(
+        symbol="BTCUSDT", side=side, type=OrderType.LIMIT, price=price, quantity=qty,
+        display_qty=display, user_id=user_id,
+    )
+
+
+def test_iceberg_depth_shows_visible_slice_only():
+    book = OrderBook("BTCUSDT")
+    ice = iceberg(Side.SELL, 100.0, 10.0, 2.0)
+    book.match(ice)
+
+    assert book.get_order_book_depth()["asks"] == [["100.0", "2.0"]]
+    assert book.get_entry(ice.id).remaining == 10.0
+
+
+def test_iceberg_replenishes_to_back_of_level():
+    book = OrderBook("BTCUSDT")
+    ice = iceberg(Side.SELL, 100.0, 5.0, 2.0)
+    plain = limit(Side.SELL, 100.0, 1.0)
+    book.match(ice)
+    book.match(plain)
+
+    trades = book.match(limit(Side.BUY, 100.0, 2.5))
+
+    # slice of 2 fills, refills and queues behind `plain`, which takes the last 0.5
+    assert [(t.maker_order_id, t.quantity) for t in trades] == [(ice.id, 2.0), (plain.id, 0.5)]
+    assert [e.order_id for e in level(book, Side.SELL, 100.0)] == [plain.id, ice.id]
+    entry = book.get_entry(ice.id)
+    assert (entry.quantity, entry.hidden) == (2.0, 1.0)
+
+    # a lone iceberg keeps refilling within one sweep until the reserve is gone
+    trades = book.match(limit(Side.BUY, 100.0, 10.0))
+    assert sum(t.quantity for t in trades if t.maker_order_id == ice.id) == 3.0
+    assert book.get_entry(ice.id) is None
+
+
+def test_fok_counts_hidden_reserve():
+    book = OrderBook("BTCUSDT")
+    book.match(iceberg(Side.SELL, 100.0, 5.0, 1.0))
+    fok = Order(symbol="BTCUSDT", side=Side.BUY, type=OrderType.FOK, price=100.0, quantity=4.0)
+
+    trades = book.match(fok)
+
+    assert sum(t.quantity for t in trades) == 4.0
+
+
+def test_amend_iceberg_reduces_reserve_in_place():
+    book = OrderBook("BTCUSDT")
+    ice = iceberg(Side.BUY, 99.0, 10.0, 2.0)
+    book.match(ice)
+
+    result = book.amend_order(ice.id, quantity=3.0)
+
+    assert result["priority_kept"]
+    assert (result["entry"].quantity, result["entry"].hidden) == (2.0, 1.0)
+
+
+def gtt(side, price, qty, seconds):
+    expire_at = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+    return Order(
+        symbol="BTCUSDT", side=side, type=OrderType.LIMIT, price=price, quantity=qty,
+        time_in_force=TimeInForce.GTT, expire_at=expire_at,
+    )
+
+
+def test_expire_due_removes_in_batches_and_reports_level_delta():
+    book = OrderBook("BTCUSDT")
+    keep = limit(Side.BUY, 99.0, 1.0)
+    book.match(keep)
+    orders = [gtt(Side.BUY, 99.0, 1.0, 10), gtt(Side.BUY, 98.0, 1.0, 20), gtt(Side.SELL, 101.0, 1.0, 30)]
+    for order in orders:
+        book.match(order)
+    later = gtt(Side.SELL, 102.0, 1.0, 3600)
+    book.match(later)
+    now = datetime.now(timezone.utc).timestamp()
+
+    assert book.next_expiry() == orders[0].expire_at.timestamp()
+    assert book.expire_due(now, limit=10) == ([], None)
+
+    expired, delta = book.expire_due(now + 60, limit=2)
+    assert [e.order_id for e in expired] == [orders[0].id, orders[1].id]
+    assert delta["bids"] == [[98.0, 0], [99.0, 1.0]] and delta["asks"] == []
+    assert delta["version"] == book.version
+
+    expired, delta = book.expire_due(now + 60, limit=2)
+    assert [e.order_id for e in expired] == [orders[2].id]
+    assert delta["asks"] == [[101.0, 0]]
+    assert book.get_entry(keep.id) and book.get_entry(later.id)
+
+
+def test_expiry_skips_orders_that_already_left_the_book():
+    book = OrderBook("BTCUSDT")
+    order = gtt(Side.BUY, 99.0, 1.0, 10)
+    book.match(order)
+    book.cancel_order(order.id)
+
+    assert book.expire_due(order.expire_at.timestamp(), limit=10) == ([], None)
+    assert book.next_expiry() is None
+
+
+@pytest.mark.asyncio
+async def test_restored_orders_expire_on_an_idle_symbol(monkeypatch):
+    symbol = "EXPUSDT"
+    rows = [{
+        "id": order_id, "user_id": None, "symbol": symbol, "side": "buy", "type": "limit",
+        "price": 99, "quantity": 1, "remaining_qty": 1, "status": "open",
+        "created_at": datetime(2026, 1, 1), "stop_price": None, "display_qty": None,
+        "time_in_force": "gtt", "expire_at": expire_at, "triggered_at": None,
+    } for order_id, expire_at in (
+        ("44444444-4444-4444-4444-444444444444", datetime(2026, 1, 1)),   # already past due
+        ("55555555-5555-5555-5555-555555555555", datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=0.2)),
+    )]
+    persisted = []
+
+    async def get_open_orders_for_symbol(s):
+        await asyncio.sleep(0)      # a real query yields; the worker is already waiting
+        return rows
+
+    async def persist_batch(**batch):
+        persisted.extend(u[:2] for u in batch["updates"])
+
+    monkeypatch.setattr(db, "get_open_orders_for_symbol", get_open_orders_for_symbol)
+    monkeypatch.setattr(db, "persist_batch", persist_batch)
+
+    await matching_engine.restore_symbol(symbol)
+    await asyncio.sleep(0.05)
+    assert persisted == [(rows[0]["id"], "expired")]
+
+    await asyncio.sleep(0.4)
+    assert persisted == [(rows[0]["id"], "expired"), (rows[1]["id"], "expired")]
+    assert not matching_engine.get_book(symbol).bids
+
+
+def test_self_trade_cancel_newest_keeps_resting_order():
+    book = OrderBook("BTCUSDT")
+    own = limit(Side.SELL, 100.0, 1.0, "u1")
+    book.match(limit(Side.SELL, 99.0, 1.0, "u2"))
+    book.match(own)
+    incoming = limit(Side.BUY, 100.0, 3.0, "u1")
+
+    trades = book.match(incoming)
+
+    assert [t.seller_id for t in trades] == ["u2"]
+    assert incoming.status == OrderStatus.CANCELLED
+    assert book.get_entry(incoming.id) is None and book.get_entry(own.id) is not None
+    assert book.drain_self_trade_prevented() == []
+
+
+def test_self_trade_cancel_oldest_and_both():
+    for mode, rests in ((SelfTradePrevention.CANCEL_OLDEST, True), (SelfTradePrevention.CANCEL_BOTH, False)):
+        book = OrderBook("BTCUSDT", stp_mode=mode)
+        own = limit(Side.SELL, 100.0, 1.0, "u1")
+        book.match(own)
+        incoming = limit(Side.BUY, 100.0, 1.0, "u1")
+
+        assert book.match(incoming) == []
+        assert [e.order_id for e in book.drain_self_trade_prevented()] == [own.id]
+        assert book.get_entry(own.id) is None
+        assert (book.get_entry(incoming.id) is not None) == rests
+
+
+def test_self_trade_decrement_shrinks_both_without_trading():
+    book = OrderBook("BTCUSDT")
+    own = limit(Side.SELL, 100.0, 3.0, "u1")
+    book.match(own)
+    incoming = limit(Side.BUY, 100.0, 1.0, "u1")
+    incoming.stp = SelfTradePrevention.DECREMENT
+
+    assert book.match(incoming) == []
+    assert incoming.remaining_qty == 0 and incoming.status == OrderStatus.CANCELLED
+    assert book.get_entry(own.id).quantity == 2.0
+    assert book.drain_self_trade_prevented() == [book.get_entry(own.id)]
+
+
+def test_self_trade_none_allows_match():
+    book = OrderBook("BTCUSDT", stp_mode=SelfTradePrevention.NONE)
+    book.match(limit(Side.SELL, 100.0, 1.0, "u1"))
+
+    trades = book.match(limit(Side.BUY, 100.0, 1.0, "u1"))
+
+    assert trades[0].buyer_id == trades[0].seller_id == "u1"
+
+
+def test_fok_precheck_follows_self_trade_prevention():
+    def run(mode):
+        book = OrderBook("BTCUSDT", stp_mode=mode)
+        book.match(limit(Side.SELL, 100.0, 1.0, "u2"))
+        book.match(limit(Side.SELL, 101.0, 1.0, "u1"))
+        book.match(limit(Side.SELL, 102.0, 1.0, "u2"))
+        fok = Order(symbol="BTCUSDT", side=Side.BUY, type=OrderType.FOK, price=102.0, quantity=3.0, user_id="u1")
+        return book, fok, book.match(fok)
+
+    # cancel_newest halts at the own ask: killed whole, nothing traded
+    book, fok, trades = run(SelfTradePrevention.CANCEL_NEWEST)
+    assert trades == [] and fok.status == OrderStatus.CANCELLED and fok.remaining_qty == 3.0
+    assert len(book.asks) == 3
+
+    # cancel_oldest pulls the own ask: only 2 left to fill 3 → killed
+    _, fok, trades = run(SelfTradePrevention.CANCEL_OLDEST)
+    assert trades == [] and fok.status == OrderStatus.CANCELLED
+
+    # decrement: the own ask absorbs 1, the other two fill the rest
+    _, fok, trades = run(SelfTradePrevention.DECREMENT)
+    assert [t.price for t in trades] == [100.0, 102.0] and fok.remaining_qty == 0
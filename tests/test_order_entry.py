@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import pytest
+
+from src.api.routes import order_entry
+from src.api.routes.order_entry import OrderSession
+from src.models.order import Order, OrderType, Side
+from src.services import db, matching_engine, order_service
+
+
+def drain(session):
+    out = []
+    while not session.outbox.empty():
+        out.append(session.outbox.get_nowait())
+    return out
+
+
+@pytest.mark.asyncio
+async def test_unexpected_errors_become_rejects(monkeypatch):
+    async def enqueue_order(order):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(order_service, "enqueue_order", enqueue_order)
+    session = OrderSession(websocket=None, user_id="u1")
+
+    await session.submit(json.dumps({"op": "new", "client_order_id": "q1", "symbol": "BTCUSDT",
+                                     "side": "buy", "type": "limit", "price": 100, "quantity": 1}))
+    await session.submit("not json")
+    await session.submit(json.dumps({"op": "nope", "client_order_id": "x"}))
+    await asyncio.gather(*session.tasks)
+
+    replies = {m["client_order_id"]: m for m in drain(session)}
+    assert replies["q1"] == {"type": "reject", "client_order_id": "q1", "detail": "Internal error"}
+    assert replies["x"]["type"] == "reject" and replies[None]["type"] == "reject"
+
+
+@pytest.mark.asyncio
+async def test_ops_run_concurrently_but_cancel_by_client_id_waits_for_the_ack(monkeypatch):
+    release = asyncio.Event()
+    cancelled = []
+
+    async def enqueue_order(order):
+        await release.wait()            # a slow insert
+        return asyncio.get_running_loop().create_future()
+
+    async def cancel_order(order_id, user_id):
+        cancelled.append(order_id)
+        return {"cancelled": True, "order_id": order_id}
+
+    monkeypatch.setattr(order_service, "enqueue_order", enqueue_order)
+    monkeypatch.setattr(order_service, "cancel_order", cancel_order)
+    session = OrderSession(websocket=None, user_id="u1")
+
+    await session.submit(json.dumps({"op": "new", "client_order_id": "q1", "symbol": "BTCUSDT",
+                                     "side": "buy", "type": "limit", "price": 100, "quantity": 1}))
+    await session.submit(json.dumps({"op": "cancel", "client_order_id": "c1", "orig_client_order_id": "q1"}))
+    await session.submit(json.dumps({"op": "cancel", "client_order_id": "c2", "order_id": "other"}))
+    await asyncio.sleep(0.01)
+
+    # The cancel by order id did not queue behind the slow insert
+    assert cancelled == ["other"]
+
+    release.set()
+    await asyncio.gather(*session.tasks)
+    ack, = [m for m in drain(session) if m["type"] == "ack"]
+    assert cancelled == ["other", ack["order_id"]]
+
+
+@pytest.mark.asyncio
+async def test_resting_order_reports_later_maker_fills_then_done(monkeypatch):
+    async def insert_order(row, balances=()):
+        pass
+
+    async def persist_batch(**batch):
+        pass
+
+    monkeypatch.setattr(db, "insert_order", insert_order)
+    monkeypatch.setattr(db, "persist_batch", persist_batch)
+    monkeypatch.setattr(matching_engine, "_user_event_cb", order_entry.publish)
+    session = OrderSession(websocket=None, user_id="maker")
+    monkeypatch.setattr(order_entry, "_sessions", {"maker": {session}})
+
+    await session.submit(json.dumps({"op": "new", "client_order_id": "q1", "symbol": "OEUSDT",
+                                     "side": "sell", "type": "limit", "price": 100, "quantity": 2}))
+    await asyncio.gather(*session.tasks)
+    for qty in (0.5, 1.5):
+        await matching_engine.submit_order(
+            Order(symbol="OEUSDT", side=Side.BUY, type=OrderType.LIMIT, price=100.0, quantity=qty, user_id="taker")
+        )
+
+    replies = [(m["type"], m.get("status"), m.get("quantity"), m.get("liquidity")) for m in drain(session)]
+    assert replies == [
+        ("ack", None, None, None),
+        ("order", "open", None, None),
+        ("fill", None, 0.5, "maker"),
+        ("order", "partial", None, None),
+        ("fill", None, 1.5, "maker"),
+        ("done", "filled", None, None),
+    ]
+    assert session.open_orders == {}
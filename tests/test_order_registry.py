@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta, timezone
+
+from src.services.order_registry import OrderRegistry
+
+
+def row(order_id, qty=2.0, status="open"):
+    return {
+        "id": order_id, "user_id": None, "symbol": "BTCUSDT", "side": "buy", "type": "limit",
+        "price": 100.0, "quantity": qty, "remaining_qty": qty, "status": status,
+        "timestamp": datetime(2026, 1, 1, 12, tzinfo=timezone(timedelta(hours=2))),
+        "stop_price": None, "display_qty": None, "time_in_force": "gtc", "expire_at": None,
+    }
+
+
+def test_add_matches_db_row_shape():
+    reg = OrderRegistry(10)
+    reg.add(row("a"))
+
+    got = reg.get("a")
+    assert "timestamp" not in got
+    assert got["created_at"] == datetime(2026, 1, 1, 10)
+    assert got["triggered_at"] is None
+
+
+def test_get_returns_a_copy():
+    reg = OrderRegistry(10)
+    reg.add(row("a"))
+    reg.get("a")["status"] = "filled"
+    assert reg.get("a")["status"] == "open"
+    assert reg.get("missing") is None
+
+
+def test_evicts_least_recently_used():
+    reg = OrderRegistry(2)
+    reg.add(row("a"))
+    reg.add(row("b"))
+    reg.get("a")                 # b is now the oldest
+    reg.add(row("c"))
+
+    assert len(reg) == 2
+    assert reg.get("b") is None
+    assert reg.get("a") is not None and reg.get("c") is not None
+
+
+def test_apply_follows_persist_batch_semantics():
+    reg = OrderRegistry(10)
+    reg.add(row("a", qty=5.0))
+    reg.add(row("b"))
+
+    reg.apply(
+        new_orders=[row("c")],
+        resized=[("a", 1.0, 101.0)],
+        updates=[("b", "filled", 0.0), ("unknown", "filled", 0.0)],
+        triggered=["c"],
+        trades=[],
+    )
+
+    a = reg.get("a")
+    assert (a["quantity"], a["remaining_qty"], a["price"]) == (1.0, 1.0, 101.0)
+    assert (reg.get("b")["status"], reg.get("b")["remaining_qty"]) == ("filled", 0.0)
+    assert reg.get("c")["triggered_at"] is not None
+    assert reg.get("unknown") is None
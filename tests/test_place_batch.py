@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from src.models.order import OrderCreate
+from src.services import db, matching_engine, order_service
+from src.services.client_order_index import client_orders
+from src.services.ledger import ledger
+from src.utils.config import settings
+
+
+def body(symbol="BTCUSDT", qty=1.0, coid=None):
+    return OrderCreate(symbol=symbol, side="buy", type="limit", price=100.0, quantity=qty, client_order_id=coid)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """Record inserts and enqueues; matching resolves with no trades, or fails for qty 13."""
+    calls = {"inserted": [], "enqueued": []}
+
+    async def insert_orders(rows, balances=()):
+        calls["inserted"].append([r["id"] for r in rows])
+
+    def enqueue_order(order):
+        calls["enqueued"].append(order.symbol)
+        fut = asyncio.get_running_loop().create_future()
+        if order.quantity == 13:
+            fut.set_exception(RuntimeError("worker failed"))
+        else:
+            fut.set_result([])
+        return fut
+
+    monkeypatch.setattr(db, "insert_orders", insert_orders)
+    monkeypatch.setattr(matching_engine, "enqueue_order", enqueue_order)
+    client_orders._users.clear()
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_results_follow_request_order_with_per_order_errors(engine, monkeypatch):
+    monkeypatch.setattr(settings, "risk_checks", True)
+    ledger.load([{"user_id": "u1", "asset": "USDT", "available": 10_000.0, "held": 0.0, "version": 1}])
+    bodies = [
+        body("BTCUSDT"),
+        body("ETHUSDT", qty=13),          # fails in the worker
+        body("BTCUSDT", qty=500),         # fails the balance check, never written
+        body("ETHUSDT"),
+    ]
+
+    results = await order_service.place_batch(bodies, "u1")
+    ledger.load([])
+
+    assert [r.get("error") for r in results] == [None, "worker failed", results[2]["error"], None]
+    assert "Insufficient USDT" in results[2]["error"]
+    assert len(engine["inserted"]) == 1 and len(engine["inserted"][0]) == 3
+    assert results[2]["order_id"] not in engine["inserted"][0]
+    # Grouped by symbol, submission order kept within a symbol
+    assert engine["enqueued"] == ["BTCUSDT", "ETHUSDT", "ETHUSDT"]
+
+
+@pytest.mark.asyncio
+async def test_client_order_id_already_in_db_returns_the_stored_order(engine, monkeypatch):
+    stored_id = "33333333-3333-3333-3333-333333333333"
+    attempts = []
+    insert_orders = db.insert_orders
+
+    async def insert_once_conflicting(rows, balances=()):
+        if not rows:
+            return
+        attempts.append([r["client_order_id"] for r in rows])
+        if len(attempts) == 1:
+            raise db.DuplicateClientOrderId("dup")
+        await insert_orders(rows, balances)
+
+    async def get_orders_by_client_ids(user_id, coids):
+        assert set(coids) == {"dup", "fresh"}
+        return [{
+            "id": stored_id, "user_id": user_id, "symbol": "BTCUSDT", "side": "buy", "type": "limit",
+            "price": 100, "quantity": 1, "remaining_qty": 1, "status": "open",
+            "created_at": datetime(2026, 1, 1), "client_order_id": "dup",
+        }]
+
+    monkeypatch.setattr(db, "insert_orders", insert_once_conflicting)
+    monkeypatch.setattr(db, "get_orders_by_client_ids", get_orders_by_client_ids)
+
+    results = await order_service.place_batch(
+        [body(coid="dup"), body(coid="fresh"), body(coid="dup")], "u1"
+    )
+
+    assert attempts == [["dup", "fresh"], ["fresh"]]
+    assert results[0]["order_id"] == results[2]["order_id"] == stored_id
+    assert results[1]["order_id"] != stored_id and results[1]["client_order_id"] == "fresh"
+    assert engine["enqueued"] == ["BTCUSDT"]           # the stored order is not matched again
+    # Later retries are answered from the index
+    again = await order_service.place_batch([body(coid="dup")], "u1")
+    assert again[0]["order_id"] == stored_id and len(attempts) == 2
@@ -0,0 +1,94 @@
+from datetime import date, datetime
+
+import pytest
+
+from src.models.trade import Trade
+from src.services import db, matching_engine, trade_archive
+from src.services import positions as positions_module
+from src.services.positions import Position, PositionBook
+from src.utils.config import settings
+
+
+def trade(price, qty, buyer="a", seller="b"):
+    return Trade(
+        symbol="BTCUSDT", price=price, quantity=qty, buyer_id=buyer, seller_id=seller,
+        maker_order_id="m", taker_order_id="t", aggressor_side="buy",
+    )
+
+
+def test_adding_averages_entry_price():
+    pos = Position()
+    pos.apply(1.0, 100.0)
+    pos.apply(3.0, 120.0)
+
+    assert pos.quantity == 4.0
+    assert pos.avg_price == pytest.approx(115.0)
+    assert pos.realized_pnl == 0.0
+
+
+def test_reducing_realizes_and_flipping_reopens():
+    pos = Position()
+    pos.apply(-2.0, 100.0)      # short 2 @ 100
+    pos.apply(1.0, 90.0)        # cover 1: +10
+    assert pos.realized_pnl == pytest.approx(10.0)
+    assert pos.avg_price == 100.0
+
+    pos.apply(3.0, 80.0)        # cover 1 more (+20), then long 2 @ 80
+    assert pos.realized_pnl == pytest.approx(30.0)
+    assert (pos.quantity, pos.avg_price) == (2.0, 80.0)
+
+    pos.apply(-2.0, 85.0)
+    assert pos.quantity == 0 and pos.avg_price == 0.0
+    assert pos.realized_pnl == pytest.approx(40.0)
+
+
+def test_unrealized_marks_longs_at_bid_shorts_at_ask():
+    book = PositionBook()
+    assert book.on_trade(trade(100.0, 2.0)) == ["a", "b"]
+    bbo = {"bid": 104.0, "ask": 106.0}
+
+    long = book.get("a", "BTCUSDT").to_dict("BTCUSDT", bbo)
+    short = book.get("b", "BTCUSDT").to_dict("BTCUSDT", bbo)
+
+    assert long["unrealized_pnl"] == pytest.approx(8.0)
+    assert short["unrealized_pnl"] == pytest.approx(-12.0)
+    # No book quotes: fall back to the last trade price
+    assert book.get("a", "BTCUSDT").to_dict("BTCUSDT", {"bid": None, "ask": None}, 101.0)["mark_price"] == 101.0
+
+
+def test_anonymous_side_is_skipped():
+    book = PositionBook()
+    assert book.on_trade(trade(100.0, 1.0, buyer=None)) == ["b"]
+    assert book.for_user("b")["BTCUSDT"].quantity == -1.0
+
+
+@pytest.mark.asyncio
+async def test_restart_replays_archived_then_stored_trades(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "archive_dir", str(tmp_path))
+    archived = [
+        {"id": "t1", "price": 100.0, "quantity": 2.0, "buyer_id": "a", "seller_id": "b",
+         "timestamp": datetime(2026, 1, 1, 10)},
+    ]
+    trade_archive.write_day("BTCUSDT", date(2026, 1, 1), archived)
+    stored = [
+        archived[0],        # archived but not yet deleted: must not count twice
+        {"id": "t2", "price": 110.0, "quantity": 1.0, "buyer_id": "b", "seller_id": "a",
+         "timestamp": datetime(2026, 1, 2, 10)},
+    ]
+
+    async def get_trade_symbols(since):
+        return ["BTCUSDT"]
+
+    async def stream_trades(symbol, start=None, end=None):
+        for row in stored:
+            yield row
+
+    monkeypatch.setattr(db, "get_trade_symbols", get_trade_symbols)
+    monkeypatch.setattr(db, "stream_trades", stream_trades)
+    monkeypatch.setattr(positions_module.positions, "_positions", {})
+
+    await matching_engine.restore_positions()
+
+    a = positions_module.positions.get("a", "BTCUSDT")
+    assert (a.quantity, a.avg_price, a.realized_pnl) == (1.0, 100.0, pytest.approx(10.0))
+    assert positions_module.positions.get("b", "BTCUSDT").quantity == -1.0
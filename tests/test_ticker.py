@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta, timezone
+
+from src.services.ticker import RollingTicker
+
+T0 = datetime(2026, 1, 5, 0, 0, tzinfo=timezone.utc)
+
+
+def test_rolling_stats():
+    t = RollingTicker("BTCUSDT")
+    t.add(100.0, 1.0, T0)
+    t.add(120.0, 1.0, T0 + timedelta(hours=1))
+    t.add(90.0, 2.0, T0 + timedelta(hours=2))
+
+    snap = t.snapshot(now=(T0 + timedelta(hours=3)).timestamp())
+    assert snap["last_price"] == 90.0
+    assert snap["open"] == 100.0
+    assert snap["high"] == 120.0
+    assert snap["low"] == 90.0
+    assert snap["volume"] == 4.0
+    assert snap["vwap"] == (100.0 + 120.0 + 180.0) / 4.0
+    assert snap["trades"] == 3
+
+
+def test_old_buckets_expire():
+    t = RollingTicker("BTCUSDT")
+    t.add(200.0, 5.0, T0)
+    t.add(100.0, 1.0, T0 + timedelta(hours=12))
+    t.add(110.0, 1.0, T0 + timedelta(hours=25))
+
+    snap = t.snapshot(now=(T0 + timedelta(hours=25)).timestamp())
+    assert snap["high"] == 110.0
+    assert snap["low"] == 100.0
+    assert snap["volume"] == 2.0
+    assert snap["open"] == 100.0
+
+    empty = t.snapshot(now=(T0 + timedelta(days=3)).timestamp())
+    assert empty["volume"] == 0.0
+    assert empty["high"] is None
+    assert empty["last_price"] == 110.0
@@ -0,0 +1,46 @@
+from datetime import date, datetime
+
+from src.services import trade_archive
+
+
+def make_rows():
+    return [
+        {"id": "00000000-0000-0000-0000-000000000001", "timestamp": datetime(2026, 1, 5, 10, 0),
+         "price": 100.0, "quantity": 1.0, "buyer_id": None, "seller_id": None},
+        {"id": "00000000-0000-0000-0000-000000000002", "timestamp": datetime(2026, 1, 5, 11, 0),
+         "price": 110.0, "quantity": 3.0, "buyer_id": None, "seller_id": None},
+        {"id": "00000000-0000-0000-0000-000000000003", "timestamp": datetime(2026, 1, 5, 12, 0),
+         "price": 90.0, "quantity": 2.0, "buyer_id": None, "seller_id": None},
+    ]
+
+
+def test_write_and_query_history(tmp_path):
+    trade_archive.write_day("BTCUSDT", date(2026, 1, 5), make_rows(), root=str(tmp_path))
+
+    rows = trade_archive.query_history(
+        "BTCUSDT", datetime(2026, 1, 5, 10, 30), datetime(2026, 1, 6), root=str(tmp_path)
+    )
+    assert [r["price"] for r in rows] == [110.0, 90.0]
+    assert rows[0]["timestamp"] == datetime(2026, 1, 5, 11, 0)
+
+
+def test_stats_vwap_and_volume(tmp_path):
+    trade_archive.write_day("BTCUSDT", date(2026, 1, 5), make_rows(), root=str(tmp_path))
+
+    stats = trade_archive.query_stats(
+        "BTCUSDT", datetime(2026, 1, 5), datetime(2026, 1, 6), root=str(tmp_path)
+    )
+    assert stats["trades"] == 3
+    assert stats["volume"] == 6.0
+    assert stats["vwap"] == (100.0 + 330.0 + 180.0) / 6.0
+    assert stats["high"] == 110.0
+    assert stats["low"] == 90.0
+
+
+def test_rewrite_same_day_deduplicates(tmp_path):
+    rows = make_rows()
+    trade_archive.write_day("BTCUSDT", date(2026, 1, 5), rows[:2], root=str(tmp_path))
+    trade_archive.write_day("BTCUSDT", date(2026, 1, 5), rows[1:], root=str(tmp_path))
+
+    cols = trade_archive.load_day("BTCUSDT", date(2026, 1, 5), root=str(tmp_path))
+    assert len(cols["id"]) == 3
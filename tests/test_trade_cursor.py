@@ -0,0 +1,20 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.routes.trades import _decode_cursor, _encode_cursor
+
+TRADE_ID = "66666666-6666-6666-6666-666666666666"
+
+
+def test_cursor_round_trips():
+    row = {"timestamp": datetime(2026, 1, 1, 12, 30), "id": TRADE_ID}
+    assert _decode_cursor(_encode_cursor(row)) == (row["timestamp"], TRADE_ID)
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "2026-01-01T12:30:00_not-a-uuid", f"yesterday_{TRADE_ID}"])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as e:
+        _decode_cursor(cursor)
+    assert (e.value.status_code, e.value.detail) == (400, "Invalid cursor")
@@ -0,0 +1,47 @@
+import time
+
+from src.api.routes import user_stream
+from src.api.routes.user_stream import UserStream
+from src.utils.config import settings
+
+
+def test_publish_sequences_and_replays_missed_messages():
+    stream = UserStream()
+    start = stream.seq
+    for i in range(3):
+        stream.publish({"type": "order", "data": {"n": i}})
+
+    assert [m["seq"] - start for m in stream.replay] == [1, 2, 3]
+    assert [m["data"]["n"] for m in stream.missed(start + 1)] == [1, 2]
+    assert stream.missed(start + 3) == []
+
+
+def test_resume_past_the_buffer_or_after_restart_needs_reset():
+    stream = UserStream()
+    start = stream.seq
+    for i in range(settings.user_stream_replay + 5):
+        stream.publish({"type": "fill", "data": {}})
+
+    assert stream.missed(start + 3) is None
+    assert stream.missed(start + 5)[0]["seq"] == start + 6
+    # A new stream (eviction or restart) never replays an old stream's seqs
+    assert UserStream().missed(stream.seq) is None
+
+
+def test_only_connected_users_are_buffered_and_idle_streams_expire(monkeypatch):
+    monkeypatch.setattr(user_stream, "_streams", {})
+    monkeypatch.setattr(user_stream, "_last_sweep", 0.0)
+
+    user_stream.publish("nobody", {"type": "order", "data": {}})
+    assert user_stream._streams == {}
+
+    now = time.monotonic() + user_stream.SWEEP_INTERVAL_SECONDS
+    live, dropped = UserStream(), UserStream()
+    live.sessions.add(object())
+    dropped.idle_since = now
+    user_stream._streams.update(live=live, dropped=dropped)
+
+    user_stream._evict_idle(now + settings.user_stream_idle_seconds - 1)
+    assert set(user_stream._streams) == {"live", "dropped"}
+    user_stream._evict_idle(now + settings.user_stream_idle_seconds + 10)
+    assert set(user_stream._streams) == {"live"}